@@ -0,0 +1,102 @@
+"""
+Shared test fixtures: throwaway databases created from schema.sql and filled
+with synthetic market breadth days
+"""
+
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+SCHEMA_PATH = Path(__file__).parent / "src" / "database" / "schema.sql"
+
+def trading_days(start: str, count: int):
+    """ISO dates of count weekdays from start"""
+    day = date.fromisoformat(start)
+    days = []
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+def breadth_rows(start: str, count: int, seed: int = 11):
+    """
+    Synthetic market_breadth_daily rows
+
+    Every fifth close, high and T2108 value is a whole number, as CSV imports
+    produce them; SQLite's DECIMAL affinity stores those as INTEGER.
+    """
+    rng = np.random.default_rng(seed)
+    close = 4000 * np.cumprod(1 + rng.normal(0.0003, 0.01, count))
+    rows = []
+    for i, day in enumerate(trading_days(start, count)):
+        day_close = round(float(close[i]), 2)
+        high = round(day_close * (1 + abs(rng.normal(0, 0.006))), 2)
+        low = round(day_close * (1 - abs(rng.normal(0, 0.006))), 2)
+        t2108 = round(float(rng.uniform(10, 90)), 2)
+        if i % 5 == 0:
+            day_close, high, t2108 = float(round(day_close)), float(round(high) + 1), float(round(t2108))
+        rows.append({
+            "date": day,
+            "daily_high": high,
+            "daily_low": min(low, day_close),
+            "daily_close": day_close,
+            "stocks_up_4pct_daily": int(rng.integers(50, 600)),
+            "stocks_down_4pct_daily": int(rng.integers(50, 600)),
+            "stocks_up_25pct_quarterly": int(rng.integers(500, 2000)),
+            "stocks_down_25pct_quarterly": int(rng.integers(500, 2000)),
+            "t2108": t2108,
+            "sp_reference": day_close
+        })
+    return rows
+
+def insert_breadth_rows(db_path: Path, rows):
+    """Insert rows with a plain sqlite3 connection (bypassing the query classes)"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        columns = list(rows[0])
+        conn.executemany(
+            f"INSERT INTO market_breadth_daily ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [tuple(row[column] for column in columns) for row in rows]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+def create_database(db_path: Path) -> Path:
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.executescript(SCHEMA_PATH.read_text())
+    finally:
+        conn.close()
+    return db_path
+
+@pytest.fixture
+def empty_db_path(tmp_path) -> Path:
+    """Path of a new database with the full schema and no data"""
+    return create_database(tmp_path / "trading.db")
+
+@pytest.fixture
+def breadth_db_path(empty_db_path) -> Path:
+    """Database with 400 synthetic days (2022-01-03 onward) and derived metrics filled"""
+    from src.database.derived_metrics import recompute_derived_metrics
+
+    insert_breadth_rows(empty_db_path, breadth_rows("2022-01-03", 400))
+    conn = sqlite3.connect(str(empty_db_path))
+    try:
+        recompute_derived_metrics(conn)
+    finally:
+        conn.close()
+    return empty_db_path
+
+@pytest.fixture
+def db(breadth_db_path):
+    """DatabaseConnection on the synthetic breadth database"""
+    from src.database.connection import DatabaseConnection
+
+    connection = DatabaseConnection(str(breadth_db_path))
+    yield connection
+    connection.close()
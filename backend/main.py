@@ -3,16 +3,20 @@ BIDBACK Trading Tool - FastAPI Backend Server
 Main server application running on port 3001 for Electron frontend integration
 """
 
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any
 import uvicorn
 import logging
 import traceback
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import json
+import csv
+import io
+import asyncio
 from pathlib import Path
 
 # Import our risk management system
@@ -22,9 +26,17 @@ from risk_management import (
     MarketState,
     RegimeType
 )
+from risk_management.backtest_jobs import BacktestJobManager, JobQueueFullError, JOB_COMPLETED, TERMINAL_STATES
+from risk_management.chart_service import ChartService, ChartUnavailableError
+from risk_management.sweep_store import SweepResultStore
+from risk_management.shadow_strategies import ShadowBook, ShadowStrategy
 
 # Import database connection
-from src.database.connection import DatabaseConnection
+from src.database.connection import DatabaseConnection, MarketBreadthQueries
+from src.database.async_queries import AsyncDatabase, AsyncMarketBreadthQueries, QueryTimeoutError
+from src.database.atr_index import AtrPercentileIndex
+from src.database.breadth_mirror import BreadthMirror, BreadthSnapshot
+from src.database.result_cache import QueryResultCache
 
 # Configure logging
 logging.basicConfig(
@@ -49,11 +61,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset cursors of /breadth/historical, readable by the renderer
+    expose_headers=["X-Next-Before-Date", "X-Next-After-Date"],
 )
 
 # Global risk manager instance
 risk_manager: Optional[UltimateRiskManager] = None
 db_manager: Optional[DatabaseConnection] = None
+async_db: Optional[AsyncDatabase] = None
+breadth_mirror: Optional[BreadthMirror] = None
+query_cache: Optional[QueryResultCache] = None
+breadth_queries: Optional[AsyncMarketBreadthQueries] = None
+backtest_manager: Optional[BacktestJobManager] = None
+sweep_store: Optional[SweepResultStore] = None
+chart_service: Optional[ChartService] = None
 
 # Pydantic models for API requests/responses
 class MarketData(BaseModel):
@@ -112,6 +133,7 @@ class PositionUpdateResponse(BaseModel):
     remaining_position: Optional[float] = None
     days_held: int
     final_pnl: Optional[float] = None
+    shadow_positions: Optional[Dict[str, Dict[str, Any]]] = None
 
 class PerformanceResponse(BaseModel):
     """Portfolio performance metrics"""
@@ -159,6 +181,72 @@ class MarketBreadthSummary(BaseModel):
     has_data_percentage: Dict[str, float]
     latest_data: Optional[MarketBreadthData] = None
 
+class BacktestRequest(BaseModel):
+    """Backtest job submission"""
+    historical_data: List[Dict[str, Any]] = Field(..., min_items=1, description="Historical trades with daily prices")
+    config_overrides: Optional[Dict[str, Any]] = None
+    chunk_size: int = Field(250, ge=1, le=10000, description="Trades per progress update")
+    memory_limit_mb: Optional[int] = Field(None, ge=256, description="Address space limit for the worker process")
+
+class BacktestJobResponse(BaseModel):
+    """Backtest job status"""
+    job_id: str
+    status: str
+    total_trades: int
+    completed_trades: int
+    chunk_size: int
+    memory_limit_mb: Optional[int] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    partial_metrics: Optional[Dict[str, Any]] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+class SweepResponse(BaseModel):
+    """Registered parameter sweep"""
+    sweep_id: str
+    description: Optional[str] = None
+    parameters: Dict[str, Any]
+    total_trades: Optional[int] = None
+    result_count: int
+    created_at: str
+    updated_at: str
+
+class SweepResultResponse(BaseModel):
+    """Evaluated sweep configuration and its metrics"""
+    id: int
+    config_hash: str
+    configuration: Dict[str, Any]
+    status: str
+    trades_evaluated: int
+    total_return: Optional[float] = None
+    avg_return_per_trade: Optional[float] = None
+    win_rate: Optional[float] = None
+    sharpe_ratio: Optional[float] = None
+    max_drawdown: Optional[float] = None
+    created_at: str
+
+class ShadowStrategyRequest(BaseModel):
+    """Alternative rule set to track in shadow mode (e.g. a sweep frontier configuration)"""
+    name: str = Field(..., min_length=1, max_length=50, description="Unique strategy name")
+    configuration: Dict[str, Any] = Field(default_factory=dict, description="Sweep configuration (adjustments, vix_thresholds)")
+    use_stops: bool = True
+    use_profit_targets: bool = True
+    max_hold_days: int = Field(5, ge=1, le=30, description="Time exit after this many days")
+
+class ShadowStrategyResponse(BaseModel):
+    """Shadow strategy and its tracked performance"""
+    name: str
+    use_stops: bool
+    use_profit_targets: bool
+    max_hold_days: int
+    stop_adjustment: float
+    profit_adjustment: float
+    volatility_factor: float
+    vix_thresholds: Optional[List[float]] = None
+    performance: PerformanceResponse
+
 # Dependency to get risk manager
 def get_risk_manager() -> UltimateRiskManager:
     """Dependency to ensure risk manager is initialized"""
@@ -169,6 +257,16 @@ def get_risk_manager() -> UltimateRiskManager:
         )
     return risk_manager
 
+# Dependency to get the shadow strategy book
+def get_shadow_book(rm: UltimateRiskManager = Depends(get_risk_manager)) -> ShadowBook:
+    """Dependency to ensure shadow strategies are enabled"""
+    if rm.shadow_book is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Shadow strategies not enabled"
+        )
+    return rm.shadow_book
+
 # Dependency to get database manager
 def get_db_manager() -> DatabaseConnection:
     """Dependency to ensure database manager is initialized"""
@@ -179,6 +277,94 @@ def get_db_manager() -> DatabaseConnection:
         )
     return db_manager
 
+def get_async_db() -> AsyncDatabase:
+    """Dependency to ensure the async database layer is initialized"""
+    if async_db is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Database system not initialized"
+        )
+    return async_db
+
+async def get_breadth_snapshot(adb: AsyncDatabase = Depends(get_async_db)) -> BreadthSnapshot:
+    """
+    Dependency returning the current breadth mirror
+    
+    The persistent data version check and reloads after writes (here or by an
+    importer) run on the query pool, so the event loop never waits for SQLite.
+    """
+    if breadth_mirror is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Market breadth mirror not initialized"
+        )
+    if not breadth_mirror.stale and not breadth_mirror.db.external_check_due:
+        return breadth_mirror.snapshot(check_external=False)
+    try:
+        return await adb.run(breadth_mirror.snapshot)
+    except QueryTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+
+async def cached_result(name: str, params: Dict[str, Any], compute):
+    """
+    Result of compute from the query result cache (uncached before startup)
+    
+    A due check of the persistent data version runs on the query pool, so the
+    event loop never waits for a pooled connection.
+    """
+    if query_cache is None:
+        return compute()
+    if query_cache.db.external_check_due:
+        try:
+            await async_db.run(query_cache.db.check_external_writes)
+        except QueryTimeoutError as e:
+            raise HTTPException(status_code=504, detail=str(e))
+    return query_cache.get(name, params, compute, check_external=False)
+
+# Dependency to get backtest job manager
+def get_backtest_manager() -> BacktestJobManager:
+    """Dependency to ensure backtest job manager is initialized"""
+    if backtest_manager is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Backtest job manager not initialized"
+        )
+    return backtest_manager
+
+# Dependency to get chart service
+def get_chart_service() -> ChartService:
+    """Dependency to ensure the chart service is initialized"""
+    if chart_service is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Chart service not initialized"
+        )
+    return chart_service
+
+# Dependency to get sweep result store
+def get_sweep_store() -> SweepResultStore:
+    """Dependency to ensure the sweep result store is initialized"""
+    if sweep_store is None:
+        raise HTTPException(
+            status_code=500,
+            detail="Sweep result store not initialized"
+        )
+    return sweep_store
+
+def sweep_constraints(
+    min_total_return: Optional[float] = None,
+    min_win_rate: Optional[float] = None,
+    min_sharpe_ratio: Optional[float] = None,
+    max_drawdown_tolerance: Optional[float] = None
+) -> Dict[str, Optional[float]]:
+    """Query parameters shared by the sweep endpoints (drawdown tolerance in %)"""
+    return {
+        "min_total_return": min_total_return,
+        "min_win_rate": min_win_rate,
+        "min_sharpe_ratio": min_sharpe_ratio,
+        "min_max_drawdown": -max_drawdown_tolerance / 100 if max_drawdown_tolerance is not None else None
+    }
+
 # API Endpoints
 
 @app.get("/", response_model=Dict[str, str])
@@ -200,6 +386,10 @@ async def health_check():
             "timestamp": datetime.now().isoformat(),
             "risk_manager_initialized": risk_manager is not None,
             "active_positions": len(risk_manager.active_positions) if risk_manager else 0,
+            "database_pool": db_manager.pool.status() if db_manager else None,
+            "database_queries": async_db.status() if async_db else None,
+            "breadth_mirror": breadth_mirror.status() if breadth_mirror else None,
+            "result_cache": query_cache.stats() if query_cache else None,
             "backend_version": "1.0.0"
         }
     except Exception as e:
@@ -210,6 +400,16 @@ async def health_check():
             "timestamp": datetime.now().isoformat()
         }
 
+@app.get("/database/query-stats", response_model=Dict[str, Any])
+async def get_query_stats(db: DatabaseConnection = Depends(get_db_manager)):
+    """Per-query call counts and latency of the named query registry"""
+    return {
+        "queries": db.registry.stats(),
+        "pool": db.pool.status(),
+        "result_cache": query_cache.stats() if query_cache else None,
+        "timestamp": datetime.now().isoformat()
+    }
+
 @app.post("/positions/open", response_model=PositionOpenResponse)
 async def open_position(
     request: OpenPositionRequest,
@@ -383,183 +583,411 @@ async def export_performance_report(
         logger.error(f"Error exporting report: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+# Backtest Job Endpoints
+
+@app.post("/backtests", response_model=BacktestJobResponse, status_code=202)
+async def submit_backtest(
+    request: BacktestRequest,
+    bm: BacktestJobManager = Depends(get_backtest_manager)
+):
+    """Submit a backtest job to the worker process pool"""
+    try:
+        job = bm.submit(
+            request.historical_data,
+            request.config_overrides,
+            chunk_size=request.chunk_size,
+            memory_limit_mb=request.memory_limit_mb
+        )
+        return BacktestJobResponse(**job.to_dict())
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error submitting backtest: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.get("/backtests", response_model=List[BacktestJobResponse])
+async def list_backtests(bm: BacktestJobManager = Depends(get_backtest_manager)):
+    """List retained backtest jobs without their results"""
+    return [BacktestJobResponse(**job.to_dict(include_result=False)) for job in bm.list_jobs()]
+
+@app.get("/backtests/{job_id}", response_model=BacktestJobResponse)
+async def get_backtest(job_id: str, bm: BacktestJobManager = Depends(get_backtest_manager)):
+    """Get status, partial metrics and final result of a backtest job"""
+    job = bm.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Backtest job {job_id} not found")
+    return BacktestJobResponse(**job.to_dict())
+
+@app.get("/backtests/{job_id}/events")
+async def stream_backtest_events(
+    job_id: str,
+    poll_interval: float = 0.5,
+    bm: BacktestJobManager = Depends(get_backtest_manager)
+):
+    """Stream backtest progress as Server-Sent Events until the job finishes"""
+    if bm.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Backtest job {job_id} not found")
+
+    poll_interval = min(max(poll_interval, 0.1), 5.0)
+
+    async def event_stream():
+        sent = 0
+        last_status = None
+        while True:
+            job = bm.get_job(job_id)
+            if job is None:
+                break
+
+            # Snapshot first so a chunk finishing in between is not lost
+            progress = list(job.progress)
+            status = job.status
+
+            if status != last_status:
+                last_status = status
+                yield f"event: status\ndata: {json.dumps({'job_id': job_id, 'status': status})}\n\n"
+
+            for metrics in progress[sent:]:
+                yield f"event: progress\ndata: {json.dumps(metrics)}\n\n"
+            sent = len(progress)
+
+            if status in TERMINAL_STATES:
+                payload = job.to_dict(include_result=False)
+                yield f"event: done\ndata: {json.dumps(payload)}\n\n"
+                break
+
+            await asyncio.sleep(poll_interval)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/backtests/{job_id}/chart")
+async def get_backtest_chart(
+    job_id: str,
+    bm: BacktestJobManager = Depends(get_backtest_manager),
+    charts: ChartService = Depends(get_chart_service)
+):
+    """PNG chart (equity curve, return distribution, regime returns) of a completed backtest"""
+    job = bm.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Backtest job {job_id} not found")
+    if job.status != JOB_COMPLETED:
+        raise HTTPException(status_code=409, detail=f"Backtest job {job_id} is {job.status}")
+    try:
+        image = await asyncio.get_running_loop().run_in_executor(None, charts.backtest_result, job.result)
+        return Response(content=image, media_type="image/png", headers={"Cache-Control": "max-age=3600"})
+    except ChartUnavailableError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error rendering chart for backtest {job_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.delete("/backtests/{job_id}", response_model=BacktestJobResponse)
+async def cancel_backtest(job_id: str, bm: BacktestJobManager = Depends(get_backtest_manager)):
+    """Cancel a queued or running backtest job"""
+    job = bm.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Backtest job {job_id} not found")
+    return BacktestJobResponse(**job.to_dict(include_result=False))
+
+# Shadow Strategy Endpoints
+
+def shadow_strategy_response(strategy: ShadowStrategy, performance: Dict) -> ShadowStrategyResponse:
+    """Response model of a shadow strategy"""
+    return ShadowStrategyResponse(
+        name=strategy.name,
+        use_stops=strategy.use_stops,
+        use_profit_targets=strategy.use_profit_targets,
+        max_hold_days=strategy.max_hold_days,
+        stop_adjustment=strategy.stop_adjustment,
+        profit_adjustment=strategy.profit_adjustment,
+        volatility_factor=strategy.volatility_factor,
+        vix_thresholds=list(strategy.vix_thresholds) if strategy.vix_thresholds is not None else None,
+        performance=PerformanceResponse(**performance)
+    )
+
+@app.get("/shadow-strategies", response_model=List[ShadowStrategyResponse])
+async def list_shadow_strategies(book: ShadowBook = Depends(get_shadow_book)):
+    """Performance of every shadow strategy on the live feed"""
+    try:
+        performance = book.performance()
+        return [shadow_strategy_response(strategy, performance[strategy.name]) for strategy in book.strategies]
+    except Exception as e:
+        logger.error(f"Error getting shadow strategies: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+@app.post("/shadow-strategies", response_model=ShadowStrategyResponse)
+async def add_shadow_strategy(
+    request: ShadowStrategyRequest,
+    book: ShadowBook = Depends(get_shadow_book)
+):
+    """Track a candidate rule set from the next entry on"""
+    try:
+        strategy = ShadowStrategy.from_configuration(request.name, request.configuration,
+                                                     max_hold_days=request.max_hold_days)
+        strategy.use_stops = request.use_stops
+        strategy.use_profit_targets = request.use_profit_targets
+        book.add_strategy(strategy)
+        logger.info(f"Shadow strategy {request.name} added")
+        return shadow_strategy_response(strategy, book.performance()[strategy.name])
+    except ValueError as e:
+        logger.error(f"Invalid shadow strategy: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error adding shadow strategy: {e}")
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+# Sweep Result Endpoints
+
+@app.get("/sweeps", response_model=List[SweepResponse])
+async def list_sweeps(store: SweepResultStore = Depends(get_sweep_store)):
+    """List stored parameter sweeps"""
+    try:
+        sweeps = await asyncio.get_running_loop().run_in_executor(None, store.list_sweeps)
+        return [SweepResponse(**sweep) for sweep in sweeps]
+    except Exception as e:
+        logger.error(f"Error listing sweeps: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/sweeps/{sweep_id}/frontier", response_model=List[SweepResultResponse])
+async def get_sweep_frontier(
+    sweep_id: str,
+    include_pruned: bool = False,
+    constraints: Dict[str, Optional[float]] = Depends(sweep_constraints),
+    store: SweepResultStore = Depends(get_sweep_store)
+):
+    """Pareto frontier of total return vs. max drawdown among configurations meeting the constraints"""
+    try:
+        frontier = await asyncio.get_running_loop().run_in_executor(
+            None, store.frontier, sweep_id, constraints, include_pruned
+        )
+        return [SweepResultResponse(**result) for result in frontier]
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found")
+    except Exception as e:
+        logger.error(f"Error computing frontier for sweep {sweep_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/sweeps/{sweep_id}/results", response_model=List[SweepResultResponse])
+async def get_sweep_results(
+    sweep_id: str,
+    order_by: str = "total_return",
+    descending: bool = True,
+    include_pruned: bool = False,
+    limit: int = 100,
+    offset: int = 0,
+    constraints: Dict[str, Optional[float]] = Depends(sweep_constraints),
+    store: SweepResultStore = Depends(get_sweep_store)
+):
+    """Filter and sort evaluated configurations of a sweep"""
+    loop = asyncio.get_running_loop()
+    try:
+        sweep = await loop.run_in_executor(None, store.get_sweep, sweep_id)
+        if sweep is None:
+            raise HTTPException(status_code=404, detail=f"Sweep {sweep_id} not found")
+        results = await loop.run_in_executor(None, lambda: store.query_results(
+            sweep_id, constraints, include_pruned=include_pruned, order_by=order_by,
+            descending=descending, limit=min(max(limit, 1), 1000), offset=max(offset, 0)
+        ))
+        return [SweepResultResponse(**result) for result in results]
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error querying results of sweep {sweep_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
 # Market Breadth Data Endpoints
 
+# MarketBreadthData fields and their column positions in market_breadth_daily
+BREADTH_ROW_FIELDS = (
+    ("date", 1),
+    ("stocks_up_4pct_daily", 9),
+    ("stocks_down_4pct_daily", 10),
+    ("ratio_5day", 15),
+    ("ratio_10day", 16),
+    ("stocks_up_25pct_quarterly", 11),
+    ("stocks_down_25pct_quarterly", 12),
+    ("stocks_up_25pct_monthly", 17),
+    ("stocks_down_25pct_monthly", 18),
+    ("stocks_up_50pct_monthly", 19),
+    ("stocks_down_50pct_monthly", 20),
+    ("t2108", 25),
+    ("sp_reference", 27),
+    ("daily_high", 2),
+    ("daily_low", 3),
+    ("daily_close", 4),
+    ("true_range", 6),
+    ("average_true_range_14", 7)
+)
+
+def breadth_row_to_dict(row) -> Dict[str, Any]:
+    """Fields of MarketBreadthData from a market_breadth_daily row (column positions of the schema)"""
+    return {name: row[position] for name, position in BREADTH_ROW_FIELDS}
+
+def breadth_row_to_model(row) -> MarketBreadthData:
+    """MarketBreadthData from a market_breadth_daily row"""
+    return MarketBreadthData(**breadth_row_to_dict(row))
+
+# Columns reported in the breadth summary coverage
+BREADTH_COVERAGE_COLUMNS = ("stocks_up_4pct_daily", "stocks_down_4pct_daily", "t2108", "sp_reference", "true_range")
+
+def build_breadth_summary(snapshot: BreadthSnapshot) -> MarketBreadthSummary:
+    """Coverage statistics and latest row of the breadth table"""
+    coverage = snapshot.coverage("2007-01-01", "2025-12-31", BREADTH_COVERAGE_COLUMNS)
+    latest_rows = snapshot.select("2020-01-01", "2025-12-31", newest_first=True, limit=1)
+    
+    has_data_percentage = {
+        name: round(percentage, 1) if percentage is not None else None
+        for name, percentage in coverage["has_data_percentage"].items()
+    }
+    
+    return MarketBreadthSummary(
+        total_records=coverage["total_records"],
+        date_range_start=coverage["date_range_start"],
+        date_range_end=coverage["date_range_end"],
+        has_data_percentage=has_data_percentage,
+        latest_data=breadth_row_to_model(latest_rows[0]) if latest_rows else None
+    )
+
 @app.get("/breadth/summary", response_model=MarketBreadthSummary)
-async def get_breadth_summary(db: DatabaseConnection = Depends(get_db_manager)):
+async def get_breadth_summary(snapshot: BreadthSnapshot = Depends(get_breadth_snapshot)):
     """Get market breadth data summary and statistics"""
     try:
-        with db.get_connection() as conn:
-            # Get summary statistics
-            summary_query = """
-                SELECT 
-                    COUNT(*) as total_records,
-                    MIN(date) as date_range_start,
-                    MAX(date) as date_range_end,
-                    COUNT(stocks_up_4pct_daily) * 100.0 / COUNT(*) as pct_has_up_4pct,
-                    COUNT(stocks_down_4pct_daily) * 100.0 / COUNT(*) as pct_has_down_4pct,
-                    COUNT(t2108) * 100.0 / COUNT(*) as pct_has_t2108,
-                    COUNT(sp_reference) * 100.0 / COUNT(*) as pct_has_sp_ref,
-                    COUNT(true_range) * 100.0 / COUNT(*) as pct_has_true_range
-                FROM market_breadth_daily
-                WHERE date >= '2007-01-01' AND date <= '2025-12-31'
-            """
-            
-            cursor = conn.execute(summary_query)
-            summary_row = cursor.fetchone()
-            
-            # Get latest data
-            latest_query = """
-                SELECT * FROM market_breadth_daily 
-                WHERE date >= '2020-01-01' AND date <= '2025-12-31'
-                ORDER BY date DESC 
-                LIMIT 1
-            """
-            
-            cursor = conn.execute(latest_query)
-            latest_row = cursor.fetchone()
-            
-            # Build response
-            has_data_percentage = {
-                "stocks_up_4pct_daily": round(summary_row[3], 1),
-                "stocks_down_4pct_daily": round(summary_row[4], 1),
-                "t2108": round(summary_row[5], 1),
-                "sp_reference": round(summary_row[6], 1),
-                "true_range": round(summary_row[7], 1)
-            }
-            
-            latest_data = None
-            if latest_row:
-                latest_data = MarketBreadthData(
-                    date=latest_row[1],  # date field
-                    stocks_up_4pct_daily=latest_row[9],  # stocks_up_4pct_daily
-                    stocks_down_4pct_daily=latest_row[10],  # stocks_down_4pct_daily
-                    ratio_5day=latest_row[15],  # ratio_5day
-                    ratio_10day=latest_row[16],  # ratio_10day
-                    t2108=latest_row[25],  # t2108
-                    sp_reference=latest_row[27],  # sp_reference
-                    daily_high=latest_row[2],  # daily_high
-                    daily_low=latest_row[3],  # daily_low
-                    true_range=latest_row[6],  # true_range
-                    average_true_range_14=latest_row[7],  # average_true_range_14
-                )
-            
-            return MarketBreadthSummary(
-                total_records=summary_row[0],
-                date_range_start=summary_row[1],
-                date_range_end=summary_row[2],
-                has_data_percentage=has_data_percentage,
-                latest_data=latest_data
-            )
-            
+        # Keyed on the snapshot, so a summary is never cached for a newer data version than its rows
+        return await cached_result("breadth_summary", {"snapshot_version": snapshot.version},
+                                   lambda: build_breadth_summary(snapshot))
+        
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting breadth summary: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.get("/breadth/latest", response_model=MarketBreadthData)
-async def get_latest_breadth(db: DatabaseConnection = Depends(get_db_manager)):
+async def get_latest_breadth(snapshot: BreadthSnapshot = Depends(get_breadth_snapshot)):
     """Get the most recent market breadth data"""
     try:
-        with db.get_connection() as conn:
-            query = """
-                SELECT * FROM market_breadth_daily 
-                WHERE date >= '2020-01-01' 
-                AND stocks_up_4pct_daily IS NOT NULL
-                ORDER BY date DESC 
-                LIMIT 1
-            """
-            
-            cursor = conn.execute(query)
-            row = cursor.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail="No market breadth data found")
-            
-            return MarketBreadthData(
-                date=row[1],
-                stocks_up_4pct_daily=row[9],
-                stocks_down_4pct_daily=row[10],
-                ratio_5day=row[15],
-                ratio_10day=row[16],
-                stocks_up_25pct_quarterly=row[11],
-                stocks_down_25pct_quarterly=row[12],
-                stocks_up_25pct_monthly=row[17],
-                stocks_down_25pct_monthly=row[18],
-                stocks_up_50pct_monthly=row[19],
-                stocks_down_50pct_monthly=row[20],
-                t2108=row[25],
-                sp_reference=row[27],
-                daily_high=row[2],
-                daily_low=row[3],
-                daily_close=row[4],
-                true_range=row[6],
-                average_true_range_14=row[7]
-            )
-            
+        rows = snapshot.select("2020-01-01", require="stocks_up_4pct_daily", newest_first=True, limit=1)
+        if not rows:
+            raise HTTPException(status_code=404, detail="No market breadth data found")
+        return breadth_row_to_model(rows[0])
+        
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting latest breadth: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+# Rows per chunk of a streamed /breadth/historical response
+BREADTH_STREAM_CHUNK_ROWS = 500
+
+BREADTH_STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+def breadth_keyset_bounds(start_date: Optional[str], end_date: Optional[str],
+                          after_date: Optional[str], before_date: Optional[str]):
+    """Inclusive date bounds from the date filters and the exclusive keyset cursors"""
+    def parse(value: str):
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    
+    start = parse(start_date) if start_date else None
+    end = parse(end_date) if end_date else None
+    if after_date:
+        after = parse(after_date) + timedelta(days=1)
+        start = max(start, after) if start else after
+    if before_date:
+        before = parse(before_date) - timedelta(days=1)
+        end = min(end, before) if end else before
+    return start, end
+
+def stream_breadth_rows(snapshot: BreadthSnapshot, positions, output_format: str):
+    """NDJSON lines or CSV records of the rows at positions, in chunks"""
+    header = [name for name, _ in BREADTH_ROW_FIELDS]
+    for chunk_start in range(0, len(positions), BREADTH_STREAM_CHUNK_ROWS):
+        chunk = positions[chunk_start:chunk_start + BREADTH_STREAM_CHUNK_ROWS]
+        if output_format == "ndjson":
+            yield "".join(json.dumps(breadth_row_to_dict(snapshot.rows[i])) + "\n" for i in chunk)
+            continue
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        if chunk_start == 0:
+            writer.writerow(header)
+        for i in chunk:
+            writer.writerow(breadth_row_to_dict(snapshot.rows[i]).values())
+        yield buffer.getvalue()
+    if not len(positions) and output_format == "csv":
+        yield ",".join(header) + "\n"
+
 @app.get("/breadth/historical", response_model=List[MarketBreadthData])
 async def get_historical_breadth(
+    response: Response,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
-    limit: Optional[int] = 100,
-    db: DatabaseConnection = Depends(get_db_manager)
+    limit: Optional[int] = None,
+    before_date: Optional[str] = None,
+    after_date: Optional[str] = None,
+    order: str = "desc",
+    output_format: str = Query("json", alias="format"),
+    snapshot: BreadthSnapshot = Depends(get_breadth_snapshot)
 ):
-    """Get historical market breadth data with optional date filtering"""
+    """
+    Get historical market breadth data with optional date filtering
+    
+    Pages are continued with the keyset cursors: before_date (exclusive) for
+    newest-first pages, after_date (exclusive) for oldest-first pages. The
+    X-Next-Before-Date / X-Next-After-Date header carries the cursor of the next
+    page. format=ndjson or csv streams all matching rows (full history unless
+    bounded) from one snapshot of the table.
+    """
     try:
-        # Default date range if not specified
-        if not start_date:
-            start_date = "2024-01-01"
-        if not end_date:
-            end_date = "2025-12-31"
-        
-        # Validate limit
-        if limit and (limit < 1 or limit > 1000):
-            raise HTTPException(status_code=400, detail="Limit must be between 1 and 1000")
-        
-        with db.get_connection() as conn:
-            query = """
-                SELECT * FROM market_breadth_daily 
-                WHERE date >= ? AND date <= ?
-                AND stocks_up_4pct_daily IS NOT NULL
-                ORDER BY date DESC
-                LIMIT ?
-            """
-            
-            cursor = conn.execute(query, (start_date, end_date, limit or 100))
-            rows = cursor.fetchall()
-            
-            results = []
-            for row in rows:
-                results.append(MarketBreadthData(
-                    date=row[1],
-                    stocks_up_4pct_daily=row[9],
-                    stocks_down_4pct_daily=row[10],
-                    ratio_5day=row[15],
-                    ratio_10day=row[16],
-                    stocks_up_25pct_quarterly=row[11],
-                    stocks_down_25pct_quarterly=row[12],
-                    stocks_up_25pct_monthly=row[17],
-                    stocks_down_25pct_monthly=row[18],
-                    stocks_up_50pct_monthly=row[19],
-                    stocks_down_50pct_monthly=row[20],
-                    t2108=row[25],
-                    sp_reference=row[27],
-                    daily_high=row[2],
-                    daily_low=row[3],
-                    daily_close=row[4],
-                    true_range=row[6],
-                    average_true_range_14=row[7]
-                ))
-            
-            return results
-            
+        if order not in ("asc", "desc"):
+            raise HTTPException(status_code=400, detail="Order must be 'asc' or 'desc'")
+        if output_format != "json" and output_format not in BREADTH_STREAM_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail="Format must be 'json', 'ndjson' or 'csv'")
+        
+        if output_format == "json":
+            # Default date range and page size if not specified
+            if not start_date and not after_date:
+                start_date = "2024-01-01"
+            if not end_date and not before_date:
+                end_date = "2025-12-31"
+            if not limit:
+                limit = 100
+            if limit < 1 or limit > 1000:
+                raise HTTPException(status_code=400, detail="Limit must be between 1 and 1000")
+        elif limit is not None and limit < 1:
+            raise HTTPException(status_code=400, detail="Limit must be at least 1")
+        
+        start, end = breadth_keyset_bounds(start_date, end_date, after_date, before_date)
+        newest_first = order == "desc"
+        
+        if output_format != "json":
+            positions = snapshot.positions(start, end, require="stocks_up_4pct_daily",
+                                           newest_first=newest_first, limit=limit)
+            return StreamingResponse(
+                stream_breadth_rows(snapshot, positions, output_format),
+                media_type=BREADTH_STREAM_MEDIA_TYPES[output_format]
+            )
+        
+        # One row past the page tells whether a next page exists
+        positions = snapshot.positions(start, end, require="stocks_up_4pct_daily",
+                                       newest_first=newest_first, limit=limit + 1)
+        rows = [snapshot.rows[i] for i in positions[:limit]]
+        if len(positions) > limit:
+            cursor_header = "X-Next-Before-Date" if newest_first else "X-Next-After-Date"
+            response.headers[cursor_header] = rows[-1][1]
+        return [breadth_row_to_model(row) for row in rows]
+        
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {str(e)}")
     except Exception as e:
         logger.error(f"Error getting historical breadth: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -567,70 +995,77 @@ async def get_historical_breadth(
 @app.get("/breadth/date/{date}", response_model=MarketBreadthData)
 async def get_breadth_by_date(
     date: str,
-    db: DatabaseConnection = Depends(get_db_manager)
+    snapshot: BreadthSnapshot = Depends(get_breadth_snapshot)
 ):
     """Get market breadth data for a specific date"""
     try:
-        with db.get_connection() as conn:
-            query = """
-                SELECT * FROM market_breadth_daily 
-                WHERE date = ?
-            """
-            
-            cursor = conn.execute(query, (date,))
-            row = cursor.fetchone()
-            
-            if not row:
-                raise HTTPException(status_code=404, detail=f"No data found for date {date}")
-            
-            return MarketBreadthData(
-                date=row[1],
-                stocks_up_4pct_daily=row[9],
-                stocks_down_4pct_daily=row[10],
-                ratio_5day=row[15],
-                ratio_10day=row[16],
-                stocks_up_25pct_quarterly=row[11],
-                stocks_down_25pct_quarterly=row[12],
-                stocks_up_25pct_monthly=row[17],
-                stocks_down_25pct_monthly=row[18],
-                stocks_up_50pct_monthly=row[19],
-                stocks_down_50pct_monthly=row[20],
-                t2108=row[25],
-                sp_reference=row[27],
-                daily_high=row[2],
-                daily_low=row[3],
-                daily_close=row[4],
-                true_range=row[6],
-                average_true_range_14=row[7]
-            )
-            
+        try:
+            row = snapshot.row(date)
+        except ValueError:
+            row = None
+        if not row:
+            raise HTTPException(status_code=404, detail=f"No data found for date {date}")
+        return breadth_row_to_model(row)
+        
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error getting breadth for date {date}: {e}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-# Startup and shutdown events
 @app.on_event("startup")
 async def startup_event():
     """Initialize the risk management system on startup"""
-    global risk_manager, db_manager
+    global risk_manager, db_manager, async_db, breadth_mirror, query_cache, breadth_queries, backtest_manager, sweep_store, chart_service
     try:
         logger.info("Starting BIDBACK Trading Tool API...")
         
         # Initialize database manager
         db_path = "src/database/trading.db"
         db_manager = DatabaseConnection(db_path)
+        
+        # Breadth queries run on their own thread pool with a per-call timeout
+        query_timeout = os.environ.get("DB_QUERY_TIMEOUT")
+        async_db = AsyncDatabase(db_manager, default_timeout=float(query_timeout) if query_timeout else 5.0)
+        
+        # In-memory copy of market_breadth_daily for the /breadth endpoints
+        breadth_mirror = BreadthMirror(db_manager)
+        breadth_mirror.snapshot()
+        
+        # Query results cached until the next data write (here or by an importer)
+        query_cache_size = os.environ.get("QUERY_CACHE_SIZE")
+        query_cache = QueryResultCache(db_manager, max_entries=int(query_cache_size) if query_cache_size else 256)
+        
+        # Awaitable breadth queries sharing the mirror and cache, plus the ATR percentile index
+        breadth_queries = AsyncMarketBreadthQueries(async_db, MarketBreadthQueries(
+            db_manager, mirror=breadth_mirror, atr_index=AtrPercentileIndex(db_manager), cache=query_cache
+        ))
         logger.info("Database manager initialized successfully")
         
         # Initialize risk manager
         risk_manager = UltimateRiskManager()
+        risk_manager.enable_shadow_strategies()
         logger.info("Risk management system initialized successfully")
         
+        # Initialize backtest worker pool (processes are spawned on first job)
+        backtest_workers = os.environ.get("BACKTEST_WORKERS")
+        backtest_memory_limit = os.environ.get("BACKTEST_MEMORY_LIMIT_MB")
+        backtest_manager = BacktestJobManager(
+            max_workers=int(backtest_workers) if backtest_workers else None,
+            default_memory_limit_mb=int(backtest_memory_limit) if backtest_memory_limit else None
+        )
+        
         # Create necessary directories
         os.makedirs("reports", exist_ok=True)
         os.makedirs("logs", exist_ok=True)
         
+        # Initialize sweep result store (separate SQLite file, grows with every sweep)
+        sweep_store = SweepResultStore(os.environ.get("SWEEP_RESULTS_DB", "reports/sweep_results.db"))
+        logger.info("Sweep result store initialized successfully")
+        
+        # Chart rendering (matplotlib is loaded on the first chart request)
+        chart_service = ChartService(os.environ.get("CHART_CACHE_DIR", "reports/charts"))
+        
         logger.info("BIDBACK Trading Tool API started successfully on port 3001")
         
     except Exception as e:
@@ -641,10 +1076,25 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up on shutdown"""
-    global risk_manager
+    global risk_manager, backtest_manager, db_manager, async_db, breadth_mirror, query_cache, breadth_queries
     try:
         logger.info("Shutting down BIDBACK Trading Tool API...")
         
+        if backtest_manager:
+            backtest_manager.shutdown()
+            backtest_manager = None
+        
+        if async_db:
+            async_db.shutdown()
+            async_db = None
+        
+        breadth_mirror = None
+        query_cache = None
+        breadth_queries = None
+        if db_manager:
+            db_manager.close()
+            db_manager = None
+        
         # Export final performance report if there are any trades
         if risk_manager and (risk_manager.trade_history or risk_manager.active_positions):
             final_report_path = f"reports/shutdown_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
@@ -14,7 +14,22 @@ from .dynamic_regime_system import (
 from .integrated_overlay_system import IntegratedRiskOverlay
 from .stop_loss_matrix import RegimeStopLossManager
 from .profit_taking_system import RegimeProfitTakingManager
-from .multilayer_backtesting import MultiLayerBacktester
+from .multilayer_backtesting import MultiLayerBacktester, BacktestCancelled
+from .backtest_jobs import BacktestJobManager, BacktestJob
+from .incremental_backtesting import IncrementalMultiLayerBacktester, LayerStatistics
+from .columnar_store import ColumnarResultWriter, ColumnarResultReader
+from .prepared_dataset import PreparedTradeDataset
+from .vix_sweep import VixThresholdSweep
+from .exit_kernel import run_exit_kernel, compute_exit_levels
+from .synthetic_trades import SyntheticTradeGenerator
+from .parameter_sweep import ParameterSweep, PruningRules
+from .sweep_store import SweepResultStore
+from .sweep_queue import SweepQueue, SweepWorker
+from .regime_simulator import RegimeMarkovModel
+from .rule_spec import CompiledRules, RegimeRule, RuleSpec
+from .sensitivity import SensitivityAnalysis
+from .shadow_strategies import ShadowBook, ShadowStrategy
+from .chart_service import ChartService
 
 __all__ = [
     'UltimateRiskManager',
@@ -27,5 +42,30 @@ __all__ = [
     'IntegratedRiskOverlay',
     'RegimeStopLossManager',
     'RegimeProfitTakingManager',
-    'MultiLayerBacktester'
+    'MultiLayerBacktester',
+    'BacktestCancelled',
+    'BacktestJobManager',
+    'BacktestJob',
+    'IncrementalMultiLayerBacktester',
+    'LayerStatistics',
+    'ColumnarResultWriter',
+    'ColumnarResultReader',
+    'PreparedTradeDataset',
+    'VixThresholdSweep',
+    'run_exit_kernel',
+    'compute_exit_levels',
+    'SyntheticTradeGenerator',
+    'ParameterSweep',
+    'PruningRules',
+    'SweepResultStore',
+    'SweepQueue',
+    'SweepWorker',
+    'RegimeMarkovModel',
+    'RuleSpec',
+    'RegimeRule',
+    'CompiledRules',
+    'SensitivityAnalysis',
+    'ShadowBook',
+    'ShadowStrategy',
+    'ChartService'
 ]
\ No newline at end of file
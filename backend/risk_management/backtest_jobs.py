@@ -0,0 +1,324 @@
+"""
+BIDBACK Trading Tool - Backtest Job Manager
+Runs CPU-bound backtests in a bounded worker process pool so the API event loop
+keeps serving position updates while long optimizations are running
+"""
+
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows has no resource module - memory limits are skipped
+    resource = None
+
+from .multilayer_backtesting import BacktestCancelled, MultiLayerBacktester
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+TERMINAL_STATES = (JOB_COMPLETED, JOB_FAILED, JOB_CANCELLED)
+
+class JobQueueFullError(Exception):
+    """Raised when the maximum number of pending backtest jobs is reached"""
+
+@dataclass
+class BacktestJob:
+    """State of a single submitted backtest job"""
+    job_id: str
+    total_trades: int
+    chunk_size: int
+    memory_limit_mb: Optional[int] = None
+    status: str = JOB_QUEUED
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    progress: List[Dict[str, Any]] = field(default_factory=list)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+    # Process pool handles (never serialized)
+    future: Optional[Future] = field(default=None, repr=False)
+    cancel_event: Any = field(default=None, repr=False)
+
+    @property
+    def completed_trades(self) -> int:
+        return self.progress[-1]["completed_trades"] if self.progress else 0
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total_trades": self.total_trades,
+            "completed_trades": self.completed_trades,
+            "chunk_size": self.chunk_size,
+            "memory_limit_mb": self.memory_limit_mb,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "partial_metrics": self.progress[-1] if self.progress else None,
+            "result": self.result if include_result else None,
+            "error": self.error
+        }
+
+def _apply_memory_limit(memory_limit_mb: Optional[int]) -> Optional[tuple]:
+    """Lower the soft address-space limit of the worker; returns the previous limits"""
+    if resource is None or not memory_limit_mb:
+        return None
+
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    limit_bytes = int(memory_limit_mb) * 1024 * 1024
+    hard = previous[1]
+    if hard != resource.RLIM_INFINITY:
+        limit_bytes = min(limit_bytes, hard)
+
+    # Only the soft limit is changed so the (reused) worker can restore it afterwards
+    resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, hard))
+    return previous
+
+def _run_backtest_job(job_id: str,
+                      historical_data: List[Dict],
+                      config_overrides: Optional[Dict],
+                      chunk_size: int,
+                      memory_limit_mb: Optional[int],
+                      progress_queue,
+                      cancel_event) -> Dict:
+    """Worker process entry point - runs one backtest and streams chunk progress"""
+    previous_limit = _apply_memory_limit(memory_limit_mb)
+    try:
+        progress_queue.put({"job_id": job_id, "event": "started", "timestamp": datetime.now().isoformat()})
+
+        def report_progress(metrics: Dict):
+            if cancel_event.is_set():
+                raise BacktestCancelled(f"Backtest job {job_id} cancelled")
+            progress_queue.put({
+                "job_id": job_id,
+                "event": "progress",
+                "timestamp": datetime.now().isoformat(),
+                "metrics": metrics
+            })
+
+        if cancel_event.is_set():
+            raise BacktestCancelled(f"Backtest job {job_id} cancelled")
+
+        backtester = MultiLayerBacktester()
+        return backtester.run_comprehensive_backtest(
+            historical_data,
+            config_overrides or {},
+            progress_callback=report_progress,
+            chunk_size=chunk_size
+        )
+    finally:
+        if previous_limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS, previous_limit)
+
+class BacktestJobManager:
+    """
+    Submits backtests to a bounded process pool and tracks their status
+
+    Progress messages from the workers are collected by a background thread, so
+    status and streaming endpoints only ever read in-memory job state.
+    """
+
+    def __init__(self,
+                 max_workers: Optional[int] = None,
+                 max_pending_jobs: int = 16,
+                 max_retained_jobs: int = 100,
+                 default_memory_limit_mb: Optional[int] = None):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.max_pending_jobs = max_pending_jobs
+        self.max_retained_jobs = max_retained_jobs
+        self.default_memory_limit_mb = default_memory_limit_mb
+
+        self.jobs: "OrderedDict[str, BacktestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Pool, manager and progress drain thread are started lazily on first submit
+        self._context = mp.get_context("spawn")
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress_queue = None
+        self._progress_thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+        logger.info(f"BacktestJobManager initialized with {self.max_workers} worker processes")
+
+    def _ensure_started(self):
+        """Start worker pool, shared manager and progress thread"""
+        if self._executor is not None:
+            return
+
+        self._manager = self._context.Manager()
+        self._progress_queue = self._manager.Queue()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context)
+
+        self._progress_thread = threading.Thread(
+            target=self._drain_progress, name="backtest-progress", daemon=True
+        )
+        self._progress_thread.start()
+
+    def submit(self,
+               historical_data: List[Dict],
+               config_overrides: Optional[Dict] = None,
+               chunk_size: int = 250,
+               memory_limit_mb: Optional[int] = None) -> BacktestJob:
+        """
+        Submit a backtest job to the worker pool
+
+        Args:
+            historical_data: List of historical trade data
+            config_overrides: Optional configuration overrides
+            chunk_size: Number of trades between progress reports
+            memory_limit_mb: Optional per-job address space limit for the worker
+
+        Returns:
+            The queued BacktestJob
+        """
+        with self._lock:
+            pending = sum(1 for job in self.jobs.values() if job.status not in TERMINAL_STATES)
+            if pending >= self.max_pending_jobs:
+                raise JobQueueFullError(f"Maximum of {self.max_pending_jobs} pending backtest jobs reached")
+
+            self._ensure_started()
+
+            job = BacktestJob(
+                job_id=uuid.uuid4().hex,
+                total_trades=len(historical_data),
+                chunk_size=chunk_size,
+                memory_limit_mb=memory_limit_mb or self.default_memory_limit_mb,
+                cancel_event=self._manager.Event()
+            )
+
+            job.future = self._executor.submit(
+                _run_backtest_job,
+                job.job_id,
+                historical_data,
+                config_overrides,
+                chunk_size,
+                job.memory_limit_mb,
+                self._progress_queue,
+                job.cancel_event
+            )
+            self.jobs[job.job_id] = job
+            self._evict_finished_jobs()
+
+        job.future.add_done_callback(lambda future, job_id=job.job_id: self._on_job_done(job_id, future))
+        logger.info(f"Backtest job {job.job_id} submitted ({job.total_trades} trades)")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BacktestJob]:
+        """Get a job by ID"""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[BacktestJob]:
+        """Get all retained jobs, oldest first"""
+        with self._lock:
+            return list(self.jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[BacktestJob]:
+        """
+        Cancel a queued or running job
+
+        Queued jobs are removed from the pool queue; running jobs stop at the next chunk boundary.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status in TERMINAL_STATES:
+                return job
+
+            job.cancel_event.set()
+
+        # Future.cancel() runs _on_job_done (which takes the lock) before returning
+        job.future.cancel()
+
+        logger.info(f"Cancellation requested for backtest job {job_id}")
+        return job
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop the worker pool"""
+        self._stopping.set()
+        for job in self.list_jobs():
+            if job.status not in TERMINAL_STATES:
+                self.cancel(job.job_id)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._progress_thread is not None:
+            self._progress_thread.join(timeout=2.0)
+            self._progress_thread = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+        logger.info("BacktestJobManager shut down")
+
+    def _drain_progress(self):
+        """Background thread: move worker progress messages into job state"""
+        while not self._stopping.is_set():
+            try:
+                message = self._progress_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError, BrokenPipeError):
+                break  # Manager shut down
+
+            with self._lock:
+                job = self.jobs.get(message.get("job_id"))
+                if job is None:
+                    continue
+
+                if message["event"] == "started" and job.status == JOB_QUEUED:
+                    job.status = JOB_RUNNING
+                    job.started_at = datetime.fromisoformat(message["timestamp"])
+                elif message["event"] == "progress":
+                    job.progress.append(message["metrics"])
+
+    def _on_job_done(self, job_id: str, future: Future):
+        """Record the final state of a finished job"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+
+            job.finished_at = datetime.now()
+            if future.cancelled():
+                job.status = JOB_CANCELLED
+                return
+
+            error = future.exception()
+            if error is None:
+                job.result = future.result()
+                job.status = JOB_FAILED if "error" in job.result else JOB_COMPLETED
+                job.error = job.result.get("error")
+            elif isinstance(error, BacktestCancelled):
+                job.status = JOB_CANCELLED
+            elif isinstance(error, MemoryError):
+                job.status = JOB_FAILED
+                job.error = f"Memory limit of {job.memory_limit_mb} MB exceeded"
+            else:
+                job.status = JOB_FAILED
+                job.error = str(error)
+
+        logger.info(f"Backtest job {job_id} finished with status {job.status}")
+
+    def _evict_finished_jobs(self):
+        """Drop the oldest finished jobs beyond the retention limit (caller holds lock)"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status in TERMINAL_STATES]
+        for job_id in finished[:max(0, len(self.jobs) - self.max_retained_jobs)]:
+            del self.jobs[job_id]
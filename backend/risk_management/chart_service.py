@@ -0,0 +1,178 @@
+"""
+BIDBACK Trading Tool - Chart Service
+Headless PNG rendering of backtest results. matplotlib is imported on the first
+render only, so backtest workers and sweep processes never pay the plotting import
+cost; rendered images are cached by a hash of the charted result
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .columnar_store import REGIME_CATEGORIES, ColumnarResultReader
+
+logger = logging.getLogger(__name__)
+
+class ChartUnavailableError(RuntimeError):
+    """Raised when matplotlib is not installed"""
+
+class ChartService:
+    """
+    Renders and caches backtest charts
+
+    Figures are built with matplotlib.figure.Figure on the Agg canvas (pyplot is
+    never imported), so no GUI backend is loaded and renders do not share global
+    figure state. Images are kept in an in-memory LRU and, with cache_dir, on disk.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 64, dpi: int = 100):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.dpi = dpi
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Keys being rendered -> event set when the image is ready (or the render failed)
+        self._in_flight: Dict[str, threading.Event] = {}
+        self._figure_class = None
+        self.renders = 0
+        self.cache_hits = 0
+
+    def _figure(self, figsize: Tuple[float, float]):
+        """New headless figure (imports matplotlib on first use)"""
+        if self._figure_class is None:
+            try:
+                from matplotlib.figure import Figure
+            except ImportError as e:
+                raise ChartUnavailableError("matplotlib is not installed") from e
+            self._figure_class = Figure
+            logger.info("matplotlib loaded for chart rendering")
+        return self._figure_class(figsize=figsize)
+
+    def _to_png(self, figure) -> bytes:
+        buffer = io.BytesIO()
+        figure.tight_layout()
+        figure.savefig(buffer, format="png", dpi=self.dpi)
+        return buffer.getvalue()
+
+    def _cached(self, key: str, render) -> bytes:
+        """
+        PNG for key from memory, disk or a new render
+
+        Renders run outside the lock, so cache hits and other charts are never
+        blocked by a slow render; concurrent requests for the same key wait for
+        the one render in flight.
+        """
+        while True:
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    self.cache_hits += 1
+                    return self._cache[key]
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    done = self._in_flight[key] = threading.Event()
+                    break
+            # Another thread renders this key; take its image from the cache (or retry if it failed)
+            pending.wait()
+
+        try:
+            path = self.cache_dir / f"{key}.png" if self.cache_dir else None
+            rendered = path is None or not path.exists()
+            if rendered:
+                image = render()
+                if path is not None:
+                    self._write_atomic(path, image)
+            else:
+                image = path.read_bytes()
+
+            with self._lock:
+                if rendered:
+                    self.renders += 1
+                else:
+                    self.cache_hits += 1
+                self._cache[key] = image
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+            return image
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            done.set()
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes):
+        """Write to a unique temp file next to the target and rename it into place"""
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def backtest_result(self, result: Dict) -> bytes:
+        """
+        Equity curve, return distribution and per-regime returns of a backtest
+        result (run_comprehensive_backtest output, inline or columnar trade results)
+        """
+        returns, regimes = self._trade_returns(result)
+
+        def render() -> bytes:
+            figure = self._figure((12, 9))
+            equity_ax, histogram_ax, regime_ax = figure.subplots(3, 1)
+
+            equity_ax.plot(np.cumsum(returns), color="blue")
+            equity_ax.set_title("Cumulative Return (%)")
+            equity_ax.set_xlabel("Trade")
+
+            histogram_ax.hist(returns, bins=50, color="green")
+            histogram_ax.set_title("Return per Trade (%)")
+
+            labels, totals = self._regime_totals(returns, regimes)
+            regime_ax.bar(labels, totals, color="purple")
+            regime_ax.set_title("Total Return by Regime (%)")
+            return self._to_png(figure)
+
+        # The chart depends only on the trade arrays, so they are the cache key
+        digest = hashlib.sha256(b"backtest_result")
+        digest.update(np.ascontiguousarray(returns).tobytes())
+        digest.update(np.ascontiguousarray(regimes).tobytes())
+        return self._cached(digest.hexdigest()[:32], render)
+
+    def _trade_returns(self, result: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-trade return_pct and regime codes of a backtest result"""
+        store = result.get("trade_results_store")
+        if store:
+            reader = ColumnarResultReader(store)
+            return np.asarray(reader["return_pct"], dtype=np.float64), np.asarray(reader["regime"])
+
+        trades: List[Dict] = result.get("trade_results", [])
+        returns = np.array([trade.get("return_pct", 0.0) for trade in trades], dtype=np.float64)
+        regimes = np.array([REGIME_CATEGORIES.index(trade.get("regime"))
+                            if trade.get("regime") in REGIME_CATEGORIES else len(REGIME_CATEGORIES) - 1
+                            for trade in trades], dtype=np.int8)
+        return returns, regimes
+
+    def _regime_totals(self, returns: np.ndarray, regimes: np.ndarray) -> Tuple[List[str], List[float]]:
+        totals = np.bincount(regimes.astype(np.int64), weights=returns, minlength=len(REGIME_CATEGORIES))
+        counts = np.bincount(regimes.astype(np.int64), minlength=len(REGIME_CATEGORIES))
+        labels = [regime for regime, count in zip(REGIME_CATEGORIES, counts) if count]
+        return labels, [float(total) for total, count in zip(totals, counts) if count]
+
+    def stats(self) -> Dict:
+        return {
+            "cached_images": len(self._cache),
+            "renders": self.renders,
+            "cache_hits": self.cache_hits,
+            "matplotlib_loaded": self._figure_class is not None
+        }
@@ -0,0 +1,246 @@
+"""
+BIDBACK Trading Tool - Columnar Backtest Result Store
+Stores per-trade backtest results as one .npy file per field plus a JSON manifest.
+Columns are appended in chunks while a backtest runs and read back memory-mapped,
+so millions of trade rows never have to exist as Python dicts
+"""
+
+import json
+import logging
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+# Fixed .npy header size - reserved up front and rewritten with the final row count
+NPY_HEADER_SIZE = 128
+
+REGIME_CATEGORIES = ["bull_normal", "crisis_opportunity", "high_vol_stress", "low_vol_complacency", "unknown"]
+
+TRADE_RESULT_DTYPE = np.dtype([
+    ("trade_id", np.int64),
+    ("symbol", "U16"),
+    ("entry_price", np.float64),
+    ("exit_price", np.float64),
+    ("return_pct", np.float64),
+    ("regime", np.int8)  # Code into REGIME_CATEGORIES
+])
+
+TRADE_RESULT_CATEGORIES = {"regime": REGIME_CATEGORIES}
+
+def _npy_header(dtype: np.dtype, rows: int) -> bytes:
+    """Build a version 1.0 .npy header padded to exactly NPY_HEADER_SIZE bytes"""
+    shape = (rows,)
+    if dtype.subdtype is not None:
+        # Sub-array fields like ("high", "f8", (5,)) become 2-D columns
+        dtype, item_shape = dtype.subdtype
+        shape = shape + item_shape
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (
+        np.lib.format.dtype_to_descr(dtype), shape
+    )
+    prefix_size = len(np.lib.format.magic(1, 0)) + 2
+    padding = NPY_HEADER_SIZE - prefix_size - len(header) - 1
+    if padding < 0:
+        raise ValueError(f"Column dtype {dtype} does not fit into a {NPY_HEADER_SIZE} byte header")
+    header = header + " " * padding + "\n"
+    return np.lib.format.magic(1, 0) + struct.pack("<H", len(header)) + header.encode("latin1")
+
+def encode_categories(values: Iterable[str], categories: List[str]) -> np.ndarray:
+    """Map strings to int8 codes; unseen values map to the last category"""
+    lookup = {name: code for code, name in enumerate(categories)}
+    fallback = len(categories) - 1
+    return np.fromiter((lookup.get(value, fallback) for value in values), dtype=np.int8)
+
+def trade_results_to_array(trade_results: Sequence[Dict], start_id: int = 0) -> np.ndarray:
+    """Convert the trade_results list of run_comprehensive_backtest into a structured array"""
+    array = np.zeros(len(trade_results), dtype=TRADE_RESULT_DTYPE)
+    if not len(trade_results):
+        return array
+
+    array["trade_id"] = [trade.get("trade_id", start_id + i) for i, trade in enumerate(trade_results)]
+    array["symbol"] = [trade.get("symbol", "") for trade in trade_results]
+    array["entry_price"] = [trade.get("entry_price", np.nan) for trade in trade_results]
+    array["exit_price"] = [trade.get("exit_price", np.nan) for trade in trade_results]
+    array["return_pct"] = [trade.get("return_pct", np.nan) for trade in trade_results]
+    array["regime"] = encode_categories((trade.get("regime", "unknown") for trade in trade_results),
+                                        REGIME_CATEGORIES)
+    return array
+
+class ColumnarResultWriter:
+    """
+    Streaming writer for a columnar result directory
+
+    Each field of the structured dtype goes to its own .npy file. Data is appended
+    behind a reserved header, and close() writes the final shape and the manifest.
+    """
+
+    def __init__(self, path: str, dtype: np.dtype = TRADE_RESULT_DTYPE,
+                 categories: Optional[Dict[str, List[str]]] = None,
+                 metadata: Optional[Dict] = None):
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.categories = categories if categories is not None else (
+            TRADE_RESULT_CATEGORIES if self.dtype == TRADE_RESULT_DTYPE else {}
+        )
+        self.metadata = metadata or {}
+        self.rows = 0
+        self.closed = False
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        # Manifest is removed first so a half-written store is never mistaken for a complete one
+        manifest_path = self.path / MANIFEST_FILE
+        if manifest_path.exists():
+            manifest_path.unlink()
+
+        self._files = {}
+        for name in self.dtype.names:
+            column_file = open(self.path / f"{name}.npy", "wb")
+            column_file.write(b"\0" * NPY_HEADER_SIZE)
+            self._files[name] = column_file
+
+    def append(self, chunk: np.ndarray):
+        """Append a structured array chunk"""
+        if self.closed:
+            raise ValueError("Writer already closed")
+        if chunk.dtype != self.dtype:
+            raise ValueError(f"Chunk dtype {chunk.dtype} does not match store dtype {self.dtype}")
+
+        for name, column_file in self._files.items():
+            column_file.write(np.ascontiguousarray(chunk[name]).tobytes())
+        self.rows += len(chunk)
+
+    def append_records(self, trade_results: Sequence[Dict]):
+        """Append trade result dicts (TRADE_RESULT_DTYPE stores only)"""
+        self.append(trade_results_to_array(trade_results, start_id=self.rows))
+
+    def close(self) -> Dict:
+        """Finalize column headers and write the manifest"""
+        if self.closed:
+            return self.manifest()
+
+        for name, column_file in self._files.items():
+            column_file.seek(0)
+            column_file.write(_npy_header(self.dtype[name], self.rows))
+            column_file.close()
+        self.closed = True
+
+        manifest = self.manifest()
+        tmp_path = self.path / (MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.path / MANIFEST_FILE)
+
+        logger.info(f"Columnar result store written: {self.path} ({self.rows} rows)")
+        return manifest
+
+    def abort(self):
+        """Close the column files and remove the incomplete store"""
+        if self.closed:
+            return
+        for column_file in self._files.values():
+            column_file.close()
+        self.closed = True
+
+        for name in self.dtype.names:
+            (self.path / f"{name}.npy").unlink(missing_ok=True)
+        try:
+            self.path.rmdir()  # Only if nothing else lives in the directory
+        except OSError:
+            pass
+        logger.info(f"Incomplete columnar result store removed: {self.path}")
+
+    def manifest(self) -> Dict:
+        return {
+            "version": STORE_VERSION,
+            "rows": self.rows,
+            "columns": {
+                name: {
+                    "file": f"{name}.npy",
+                    "dtype": np.lib.format.dtype_to_descr(self.dtype[name].base),
+                    "item_shape": list(self.dtype[name].shape)
+                }
+                for name in self.dtype.names
+            },
+            "categories": self.categories,
+            "metadata": self.metadata,
+            "created_at": datetime.now().isoformat()
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class ColumnarResultReader:
+    """Memory-mapped access to a columnar result directory"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path / MANIFEST_FILE, "r") as f:
+            self.manifest = json.load(f)
+        if self.manifest.get("version") != STORE_VERSION:
+            raise ValueError(f"Unsupported result store version: {self.manifest.get('version')}")
+
+        self.categories: Dict[str, List[str]] = self.manifest.get("categories", {})
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.manifest["rows"]
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.manifest["columns"])
+
+    @property
+    def metadata(self) -> Dict:
+        return self.manifest.get("metadata", {})
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only memory-mapped column (no data is read until it is accessed)"""
+        if name not in self._columns:
+            if name not in self.manifest["columns"]:
+                raise KeyError(f"Unknown column: {name}")
+            column_file = self.path / self.manifest["columns"][name]["file"]
+            self._columns[name] = np.load(column_file, mmap_mode="r")
+        return self._columns[name]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    def slice(self, start: int = 0, stop: Optional[int] = None,
+              columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy views of a row range"""
+        return {name: self.column(name)[start:stop] for name in (columns or self.columns)}
+
+    def to_structured(self, start: int = 0, stop: Optional[int] = None) -> np.ndarray:
+        """Copy a row range into a structured array"""
+        views = self.slice(start, stop)
+        dtype = np.dtype([(name, view.dtype, view.shape[1:]) for name, view in views.items()])
+        rows = len(next(iter(views.values()))) if views else 0
+        array = np.empty(rows, dtype=dtype)
+        for name, view in views.items():
+            array[name] = view
+        return array
+
+    def decode(self, name: str, codes: Optional[np.ndarray] = None) -> np.ndarray:
+        """Translate category codes back to labels"""
+        labels = np.asarray(self.categories[name], dtype=object)
+        return labels[self.column(name) if codes is None else codes]
+
+def write_trade_results(path: str, trade_results: Sequence[Dict], metadata: Optional[Dict] = None) -> Dict:
+    """Write a trade_results list in one go; returns the manifest"""
+    writer = ColumnarResultWriter(path, metadata=metadata)
+    writer.append_records(trade_results)
+    return writer.close()
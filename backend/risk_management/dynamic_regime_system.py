@@ -309,6 +309,23 @@ class AdaptiveStopManager:
         self.regime_manager = regime_manager
         self.rolling_true_ranges = {}  # Track per symbol
     
+    def update_volatility_factor(self, symbol: str, current_true_range: float) -> float:
+        """Updated Rolling True Range und liefert aktuellen / geglätteten True Range"""
+        
+        # Update Rolling True Range
+        if symbol not in self.rolling_true_ranges:
+            self.rolling_true_ranges[symbol] = []
+        
+        self.rolling_true_ranges[symbol].append(current_true_range)
+        
+        # Keep only last 5 days for rolling calculation
+        if len(self.rolling_true_ranges[symbol]) > 5:
+            self.rolling_true_ranges[symbol] = self.rolling_true_ranges[symbol][-5:]
+        
+        # Calculate adaptive True Range (smoothed)
+        rolling_tr = np.mean(self.rolling_true_ranges[symbol])
+        return current_true_range / rolling_tr if rolling_tr > 0 else 1.0
+    
     def calculate_adaptive_stop(self, 
                               symbol: str,
                               entry_price: float,
@@ -326,19 +343,7 @@ class AdaptiveStopManager:
         # Apply Dynamic Adjustments
         adjusted_rules = self.regime_manager.apply_dynamic_adjustments(base_rules, adjustment)
         
-        # Update Rolling True Range
-        if symbol not in self.rolling_true_ranges:
-            self.rolling_true_ranges[symbol] = []
-        
-        self.rolling_true_ranges[symbol].append(current_true_range)
-        
-        # Keep only last 5 days for rolling calculation
-        if len(self.rolling_true_ranges[symbol]) > 5:
-            self.rolling_true_ranges[symbol] = self.rolling_true_ranges[symbol][-5:]
-        
-        # Calculate adaptive True Range (smoothed)
-        rolling_tr = np.mean(self.rolling_true_ranges[symbol])
-        volatility_factor = current_true_range / rolling_tr if rolling_tr > 0 else 1.0
+        volatility_factor = self.update_volatility_factor(symbol, current_true_range)
         
         # Base Stop Calculation
         base_stop_pct = adjusted_rules.get("stop_loss_pct", -8.0)
@@ -0,0 +1,498 @@
+"""
+BIDBACK Trading Tool - Exit Kernel
+Runs the UltimateRiskManager.update_position exit state machine (stop-loss,
+staged profit-taking, stop adjustments, time exit) over a trades x days price
+tensor. Uses Numba when installed and a day-by-day vectorized NumPy loop otherwise
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .columnar_store import REGIME_CATEGORIES
+from .integrated_overlay_system import IntegratedRiskOverlay
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    njit = None
+    NUMBA_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Intraday ordering assumptions (a daily bar does not say whether high or low came first)
+ORDER_STOP_FIRST = 0       # Reference engine: stop is checked before profit levels
+ORDER_PROFIT_FIRST = 1     # Optimistic: profit levels first, stop on the remainder
+ORDER_CLOSE_DIRECTION = 2  # Up day (close >= previous close) -> low first, down day -> high first
+
+ORDERINGS = {
+    "stop_first": ORDER_STOP_FIRST,
+    "profit_first": ORDER_PROFIT_FIRST,
+    "close_direction": ORDER_CLOSE_DIRECTION
+}
+
+EXIT_OPEN = 0
+EXIT_STOP = 1
+EXIT_PROFIT = 2
+EXIT_TIME = 3
+
+EXIT_REASONS = {EXIT_OPEN: "open", EXIT_STOP: "stop_loss", EXIT_PROFIT: "profit_taking_complete", EXIT_TIME: "time_exit"}
+
+@dataclass
+class ExitState:
+    """Per-trade state of the exit state machine (all arrays have one entry per trade)"""
+    entry: np.ndarray
+    stop: np.ndarray
+    profit_levels: np.ndarray     # (trades, levels), +inf pads unused levels
+    close_pct: np.ndarray         # (trades, levels) position % closed per level
+    level_pnl: np.ndarray         # (trades, levels) realized return contribution per level
+    remaining: np.ndarray
+    realized: np.ndarray
+    levels_hit: np.ndarray        # (trades, levels) bool
+    is_open: np.ndarray
+    days_held: np.ndarray
+    exit_day: np.ndarray
+    exit_reason: np.ndarray
+    prev_close: np.ndarray
+
+    @classmethod
+    def create(cls, entry: np.ndarray, stop: np.ndarray, profit_levels: np.ndarray,
+               close_pct: np.ndarray) -> "ExitState":
+        n = len(entry)
+        entry = np.asarray(entry, dtype=np.float64)
+        profit_levels = np.asarray(profit_levels, dtype=np.float64)
+        close_pct = np.asarray(close_pct, dtype=np.float64)
+        with np.errstate(invalid="ignore"):
+            level_pnl = ((profit_levels - entry[:, None]) / entry[:, None]) * (close_pct / 100)
+        return cls(
+            entry=entry,
+            stop=np.array(stop, dtype=np.float64),
+            profit_levels=profit_levels,
+            close_pct=close_pct,
+            level_pnl=level_pnl,
+            remaining=np.full(n, 100.0),
+            realized=np.zeros(n),
+            levels_hit=np.zeros(profit_levels.shape, dtype=bool),
+            is_open=np.ones(n, dtype=bool),
+            days_held=np.zeros(n, dtype=np.int64),
+            exit_day=np.full(n, -1, dtype=np.int64),
+            exit_reason=np.zeros(n, dtype=np.int8),
+            prev_close=entry.copy()
+        )
+
+    def close_out(self, mask: np.ndarray, reason: int, day: int):
+        self.is_open &= ~mask
+        self.exit_reason[mask] = reason
+        self.exit_day[mask] = day
+
+def _check_stop(state: ExitState, low: np.ndarray, day: int, mask: np.ndarray):
+    hit = mask & state.is_open & (low <= state.stop) & (state.remaining > 0)
+    if hit.any():
+        stop_pnl = ((state.stop - state.entry) / state.entry) * (state.remaining / 100)
+        np.add(state.realized, stop_pnl, out=state.realized, where=hit)
+        state.remaining[hit] = 0.0
+        state.close_out(hit, EXIT_STOP, day)
+
+def _check_profits(state: ExitState, high: np.ndarray, day: int, mask: np.ndarray, max_levels_per_day: int):
+    taken_today = np.zeros(len(high), dtype=np.int64) if max_levels_per_day > 0 else None
+    for level in range(state.profit_levels.shape[1]):
+        hit = mask & state.is_open & (high >= state.profit_levels[:, level])
+        hit &= ~state.levels_hit[:, level]
+        hit &= state.remaining > 0
+        if taken_today is not None:
+            hit &= taken_today < max_levels_per_day
+        if not hit.any():
+            continue
+
+        np.add(state.realized, state.level_pnl[:, level], out=state.realized, where=hit)
+        np.subtract(state.remaining, state.close_pct[:, level], out=state.remaining, where=hit)
+        state.levels_hit[:, level] |= hit
+        if taken_today is not None:
+            taken_today += hit
+
+        state.close_out(hit & (state.remaining <= 0), EXIT_PROFIT, day)
+
+def check_exits(state: ExitState, high: np.ndarray, low: np.ndarray, close: np.ndarray, day: int,
+                ordering: int = ORDER_STOP_FIRST, max_levels_per_day: int = 0) -> np.ndarray:
+    """
+    First half of a day: count the day, then stop-loss and profit levels
+
+    Returns:
+        Mask of trades that had a bar on this day (pass it to close_day)
+    """
+    active = state.is_open & (close == close)  # NaN close = no bar
+    if not active.any():
+        return active
+    state.days_held += active
+
+    if ordering == ORDER_STOP_FIRST:
+        _check_stop(state, low, day, active)
+        _check_profits(state, high, day, active, max_levels_per_day)
+    else:
+        stop_first = active & (close >= state.prev_close) if ordering == ORDER_CLOSE_DIRECTION \
+            else np.zeros_like(active)
+        _check_stop(state, low, day, stop_first)
+        _check_profits(state, high, day, active, max_levels_per_day)
+        _check_stop(state, low, day, active & ~stop_first)
+    return active
+
+def close_day(state: ExitState, close: np.ndarray, day: int, active: np.ndarray,
+              max_hold_days=5, stop_multiplier: Optional[np.ndarray] = None):
+    """Second half of a day: regime stop adjustment, time exit at the close"""
+    if not active.any():
+        return
+    if stop_multiplier is not None:
+        adjust = active & state.is_open & (stop_multiplier != 1.0)
+        if adjust.any():
+            distance = np.abs(state.stop[adjust] - state.entry[adjust])
+            state.stop[adjust] = state.entry[adjust] - distance * stop_multiplier[adjust]
+
+    max_hold_days = np.asarray(max_hold_days)
+    if max_hold_days.any():
+        expire = active & state.is_open & (max_hold_days > 0) & (state.days_held >= max_hold_days)
+        expire &= state.remaining > 0
+        if expire.any():
+            time_exit_pnl = ((close - state.entry) / state.entry) * (state.remaining / 100)
+            np.add(state.realized, time_exit_pnl, out=state.realized, where=expire)
+            state.remaining[expire] = 0.0
+            state.close_out(expire, EXIT_TIME, day)
+
+    np.copyto(state.prev_close, close, where=active & state.is_open)
+
+def step_day(state: ExitState, high: np.ndarray, low: np.ndarray, close: np.ndarray, day: int,
+             ordering: int = ORDER_STOP_FIRST, max_levels_per_day: int = 0, max_hold_days=5,
+             stop_multiplier: Optional[np.ndarray] = None):
+    """
+    Advance all open trades by one daily bar (vectorized over trades)
+
+    Trades with a NaN close on this day have no bar and are left untouched. Callers
+    that decide the stop adjustment after seeing the exits (the live manager) run
+    check_exits and close_day separately.
+
+    Args:
+        state: ExitState, updated in place
+        high, low, close: Bar of this day per trade
+        day: Day index (0-based), recorded as exit_day
+        ordering: ORDER_STOP_FIRST, ORDER_PROFIT_FIRST or ORDER_CLOSE_DIRECTION
+        max_levels_per_day: Profit levels that may be taken per day (0 = unlimited like
+            update_position, 1 = like IntegratedRiskOverlay.process_daily_prices)
+        max_hold_days: Time exit at the close once days_held reaches this (0 = never);
+            a scalar or one limit per trade
+        stop_multiplier: Optional per-trade regime adjustment of the stop distance for
+            this day (1.0 = none), applied after profit-taking like update_position
+    """
+    active = check_exits(state, high, low, close, day, ordering, max_levels_per_day)
+    close_day(state, close, day, active, max_hold_days, stop_multiplier)
+
+def _run_exit_kernel_loops(entry, stop, profit_levels, close_pct, high, low, close, stop_multipliers,
+                           ordering, max_levels_per_day, max_hold_days,
+                           realized, remaining, levels_hit_count, exit_day, exit_reason, last_close):
+    """Scalar trade-by-trade version of step_day (compiled with Numba when available)"""
+    n_trades, n_days = close.shape
+    n_levels = profit_levels.shape[1]
+    hit = np.zeros(n_levels, dtype=np.bool_)
+
+    for t in range(n_trades):
+        entry_price = entry[t]
+        stop_level = stop[t]
+        rest = 100.0
+        pnl = 0.0
+        days_held = 0
+        reason = EXIT_OPEN
+        day_of_exit = -1
+        prev_close = entry_price
+        for level in range(n_levels):
+            hit[level] = False
+        hits = 0
+
+        for d in range(n_days):
+            c = close[t, d]
+            if np.isnan(c):
+                continue
+            h = high[t, d]
+            lo = low[t, d]
+            days_held += 1
+
+            if ordering == ORDER_STOP_FIRST:
+                stop_first = True
+            elif ordering == ORDER_PROFIT_FIRST:
+                stop_first = False
+            else:
+                stop_first = c >= prev_close
+
+            if stop_first and lo <= stop_level and rest > 0:
+                pnl += ((stop_level - entry_price) / entry_price) * (rest / 100)
+                rest = 0.0
+                reason = EXIT_STOP
+                day_of_exit = d
+                break
+
+            taken = 0
+            for level in range(n_levels):
+                if max_levels_per_day > 0 and taken >= max_levels_per_day:
+                    break
+                target = profit_levels[t, level]
+                if h >= target and not hit[level] and rest > 0:
+                    position_to_close = close_pct[t, level]
+                    pnl += ((target - entry_price) / entry_price) * (position_to_close / 100)
+                    rest -= position_to_close
+                    hit[level] = True
+                    hits += 1
+                    taken += 1
+                    if rest <= 0:
+                        reason = EXIT_PROFIT
+                        day_of_exit = d
+                        break
+            if reason != EXIT_OPEN:
+                break
+
+            if not stop_first and lo <= stop_level and rest > 0:
+                pnl += ((stop_level - entry_price) / entry_price) * (rest / 100)
+                rest = 0.0
+                reason = EXIT_STOP
+                day_of_exit = d
+                break
+
+            multiplier = stop_multipliers[t, d]
+            if multiplier != 1.0:
+                stop_level = entry_price - abs(stop_level - entry_price) * multiplier
+
+            if max_hold_days[t] > 0 and days_held >= max_hold_days[t] and rest > 0:
+                pnl += ((c - entry_price) / entry_price) * (rest / 100)
+                rest = 0.0
+                reason = EXIT_TIME
+                day_of_exit = d
+                break
+
+            prev_close = c
+
+        realized[t] = pnl
+        remaining[t] = rest
+        levels_hit_count[t] = hits
+        exit_day[t] = day_of_exit
+        exit_reason[t] = reason
+        last_close[t] = prev_close if reason == EXIT_OPEN else np.nan
+
+if NUMBA_AVAILABLE:
+    _run_exit_kernel_compiled = njit(cache=True, nogil=True)(_run_exit_kernel_loops)
+else:
+    _run_exit_kernel_compiled = None
+
+def run_exit_kernel(entry: np.ndarray, stop: np.ndarray, profit_levels: np.ndarray, close_pct: np.ndarray,
+                    high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                    ordering="stop_first", max_levels_per_day: int = 0, max_hold_days=5,
+                    stop_multipliers: Optional[np.ndarray] = None,
+                    use_numba: Optional[bool] = None) -> Dict[str, np.ndarray]:
+    """
+    Run the exit state machine over a trades x days price tensor
+
+    The defaults reproduce UltimateRiskManager.update_position: stop before profit,
+    any number of profit levels per day, time exit after 5 days.
+
+    Args:
+        entry, stop: (trades,) entry prices and initial stop levels
+        profit_levels, close_pct: (trades, levels) target prices (+inf = unused) and
+            position % closed at each level
+        high, low, close: (trades, days) bars; NaN close marks a missing day
+        ordering: "stop_first", "profit_first", "close_direction" or ORDER_* code
+        max_levels_per_day: 0 = unlimited, 1 = one level per day
+        max_hold_days: Time exit threshold (0 = no time exit), scalar or (trades,)
+        stop_multipliers: Optional (trades, days) stop distance adjustments (1.0 = none)
+        use_numba: Force (True) or disable (False) the compiled path; default uses it if installed
+
+    Returns:
+        Dict of per-trade arrays: total_return (realized, plus open remainder marked at
+        its last close), realized_return, remaining_position, levels_hit, exit_day,
+        exit_reason
+    """
+    ordering = ORDERINGS[ordering] if isinstance(ordering, str) else int(ordering)
+    entry = np.ascontiguousarray(entry, dtype=np.float64)
+    high = np.ascontiguousarray(high, dtype=np.float64)
+    low = np.ascontiguousarray(low, dtype=np.float64)
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    n_trades, n_days = close.shape
+
+    if use_numba is None:
+        use_numba = NUMBA_AVAILABLE
+    if use_numba and not NUMBA_AVAILABLE:
+        raise RuntimeError("Numba is not installed")
+
+    if use_numba:
+        if stop_multipliers is None:
+            stop_multipliers = np.ones((n_trades, n_days))
+        realized = np.zeros(n_trades)
+        remaining = np.zeros(n_trades)
+        levels_hit = np.zeros(n_trades, dtype=np.int64)
+        exit_day = np.zeros(n_trades, dtype=np.int64)
+        exit_reason = np.zeros(n_trades, dtype=np.int8)
+        last_close = np.zeros(n_trades)
+        _run_exit_kernel_compiled(
+            entry, np.ascontiguousarray(stop, dtype=np.float64),
+            np.ascontiguousarray(profit_levels, dtype=np.float64),
+            np.ascontiguousarray(close_pct, dtype=np.float64),
+            high, low, close, np.ascontiguousarray(stop_multipliers, dtype=np.float64),
+            ordering, max_levels_per_day,
+            np.ascontiguousarray(np.broadcast_to(max_hold_days, n_trades), dtype=np.int64),
+            realized, remaining, levels_hit, exit_day, exit_reason, last_close
+        )
+    else:
+        state = ExitState.create(entry, stop, profit_levels, close_pct)
+        for day in range(n_days):
+            step_day(state, high[:, day], low[:, day], close[:, day], day, ordering,
+                     max_levels_per_day, max_hold_days,
+                     None if stop_multipliers is None else stop_multipliers[:, day])
+        realized, remaining = state.realized, state.remaining
+        levels_hit = state.levels_hit.sum(axis=1)
+        exit_day, exit_reason = state.exit_day, state.exit_reason
+        last_close = np.where(state.is_open, state.prev_close, np.nan)
+
+    open_pnl = np.where(exit_reason == EXIT_OPEN, (last_close - entry) / entry * (remaining / 100), 0.0)
+    return {
+        "total_return": realized + open_pnl,
+        "realized_return": realized,
+        "remaining_position": remaining,
+        "levels_hit": levels_hit,
+        "exit_day": exit_day,
+        "exit_reason": exit_reason
+    }
+
+def regime_tables(regime_configurations: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """Regime rule tables indexed by REGIME_CATEGORIES code ("unknown" uses bull_normal)"""
+    if regime_configurations is None:
+        regime_configurations = IntegratedRiskOverlay().regime_configurations
+
+    n_levels = max(len(config["profit_levels"]) for config in regime_configurations.values())
+    n_regimes = len(REGIME_CATEGORIES)
+    tables = {
+        "stop_loss_pct": np.zeros(n_regimes),
+        "tr_stop_multiplier": np.zeros(n_regimes),
+        "profit_levels": np.full((n_regimes, n_levels), np.inf),
+        "tr_profit_multipliers": np.zeros((n_regimes, n_levels)),
+        "close_pct": np.zeros((n_regimes, n_levels))
+    }
+    for code, regime in enumerate(REGIME_CATEGORIES):
+        config = regime_configurations.get(regime, regime_configurations["bull_normal"])
+        levels = len(config["profit_levels"])
+        scaling = np.asarray(config["position_scaling"][:levels], dtype=np.float64)
+        tables["stop_loss_pct"][code] = config["stop_loss_pct"]
+        tables["tr_stop_multiplier"][code] = config["tr_stop_multiplier"]
+        tables["profit_levels"][code, :levels] = config["profit_levels"]
+        tables["tr_profit_multipliers"][code, :levels] = config["tr_profit_multipliers"]
+        tables["close_pct"][code, :levels] = np.diff(scaling, prepend=0.0)
+    return tables
+
+def compute_exit_levels(entry: np.ndarray, true_range: np.ndarray, regime: np.ndarray,
+                        regime_configurations: Optional[Dict] = None,
+                        stop_adjustment=1.0, profit_adjustment=1.0,
+                        volatility_factor=1.0, tables: Optional[Dict] = None,
+                        stop_bounds: Tuple[float, float] = (-25.0, -2.0)) -> Dict[str, np.ndarray]:
+    """
+    Vectorized entry levels as set by UltimateRiskManager.open_position
+
+    Stop follows AdaptiveStopManager.calculate_adaptive_stop (more conservative of
+    percent and true range stop, bounded to stop_bounds, -25%..-2%); profit targets follow
+    IntegratedRiskOverlay.calculate_dynamic_profits. Adjustments scale the rules like
+    DynamicRegimeManager.apply_dynamic_adjustments. Callers that compute levels
+    repeatedly for the same rules can pass their regime_tables as tables.
+
+    Returns:
+        Dict with stop (trades,), profit_levels and close_pct (trades, levels)
+    """
+    if tables is None:
+        tables = regime_tables(regime_configurations)
+    regime = np.asarray(regime, dtype=np.int64)
+    entry = np.asarray(entry, dtype=np.float64)
+    true_range = np.asarray(true_range, dtype=np.float64)
+    stop_adjustment = np.asarray(stop_adjustment, dtype=np.float64)
+    profit_adjustment = np.asarray(profit_adjustment, dtype=np.float64)
+
+    base_stop_pct = tables["stop_loss_pct"][regime] * stop_adjustment
+    tr_multiplier = tables["tr_stop_multiplier"][regime] * stop_adjustment
+    tr_stop_pct = -((true_range * (tr_multiplier * volatility_factor)) / entry) * 100
+    final_stop_pct = np.minimum(np.minimum(base_stop_pct, tr_stop_pct), stop_bounds[1])
+    final_stop_pct = np.maximum(final_stop_pct, stop_bounds[0])
+    stop = entry * (1 + final_stop_pct / 100)
+
+    profit_adjustment = profit_adjustment[..., None] if profit_adjustment.ndim else profit_adjustment
+    base_pct = tables["profit_levels"][regime] * profit_adjustment
+    base_target = entry[:, None] * (1 + base_pct / 100)
+    tr_target = entry[:, None] + true_range[:, None] * (tables["tr_profit_multipliers"][regime] * profit_adjustment)
+    profit_levels = np.where(np.isinf(base_pct), np.inf, np.maximum(base_target, tr_target))
+
+    return {
+        "stop": stop,
+        "profit_levels": profit_levels,
+        "close_pct": tables["close_pct"][regime]
+    }
+
+def transition_adjustments(vix: np.ndarray, t2108: Optional[np.ndarray] = None,
+                           momentum_ratio: Optional[np.ndarray] = None,
+                           transition_thresholds: Optional[Dict] = None,
+                           emergency_rules: Optional[Dict] = None) -> Dict[str, np.ndarray]:
+    """
+    Vectorized DynamicRegimeManager rule adjustments for a sequence of entries
+
+    Each entry is compared with the market state of the previous entry, like
+    consecutive UltimateRiskManager.open_position calls (the first entry has no
+    previous state and is not adjusted). NaN T2108/momentum counts as unknown.
+
+    Returns:
+        Dict with stop_multiplier and profit_multiplier (trades,). open_position
+        applies the stop multiplier twice (rules and AdaptiveStopManager), so use
+        stop_multiplier ** 2 and profit_multiplier as compute_exit_levels adjustments
+    """
+    if transition_thresholds is None or emergency_rules is None:
+        from .dynamic_regime_system import DynamicRegimeManager
+        manager = DynamicRegimeManager()
+        transition_thresholds = transition_thresholds or manager.transition_thresholds
+        emergency_rules = emergency_rules or manager.emergency_rules
+
+    vix = np.asarray(vix, dtype=np.float64)
+    n = len(vix)
+    t2108 = np.full(n, np.nan) if t2108 is None else np.asarray(t2108, dtype=np.float64)
+    momentum = np.full(n, np.nan) if momentum_ratio is None else np.asarray(momentum_ratio, dtype=np.float64)
+    stop_multiplier = np.ones(n)
+    profit_multiplier = np.ones(n)
+    if n < 2:
+        return {"stop_multiplier": stop_multiplier, "profit_multiplier": profit_multiplier}
+
+    current = slice(1, None)
+    stop, profit = stop_multiplier[current], profit_multiplier[current]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vix_change = np.diff(vix)
+        t2108_change = np.diff(t2108)
+        momentum_change = momentum[1:] / momentum[:-1]
+
+        major = np.abs(vix_change) > transition_thresholds["vix_major_change"]
+        rising = major & (vix_change > 0)
+        falling = major & ~(vix_change > 0)
+        stop[rising] = 1.2 + vix_change[rising] / 50
+        profit[rising] = 1.1 + vix_change[rising] / 100
+        stop[falling] = 0.9 + vix_change[falling] / 100
+        profit[falling] = 0.95 + vix_change[falling] / 200
+
+        collapse = t2108_change < transition_thresholds["t2108_collapse"]
+        surge = ~collapse & (t2108_change > transition_thresholds["t2108_explosion"])
+        stop[collapse] *= 0.7
+        profit[collapse] *= 0.8
+        profit[surge] *= 1.3
+
+        momentum_known = np.isfinite(momentum[1:]) & np.isfinite(momentum[:-1])
+        stop[momentum_known & (momentum_change < 0.5)] *= 0.8
+        profit[momentum_known & (momentum_change > 2.0)] *= 1.2
+
+        # Emergency protocols - the first matching one is combined multiplicatively
+        breadth = t2108_change < -30
+        volatility = ~breadth & (vix[1:] > 60) & (vix_change > 20)
+        momentum_crash = ~breadth & ~volatility & (momentum[1:] < 0.1) & (momentum[:-1] > 1.0)
+    for mask, rules, stop_key, profit_key in (
+            (breadth, emergency_rules["breadth_collapse"], "stop_tightening", "profit_reduction"),
+            (volatility, emergency_rules["volatility_explosion"], "stop_widening", "profit_extension"),
+            (momentum_crash, emergency_rules["momentum_collapse"], "stop_tightening", "profit_reduction")):
+        stop[mask] *= rules[stop_key]
+        profit[mask] *= rules[profit_key]
+
+    return {"stop_multiplier": stop_multiplier, "profit_multiplier": profit_multiplier}
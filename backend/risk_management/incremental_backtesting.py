@@ -0,0 +1,321 @@
+"""
+BIDBACK Trading Tool - Incremental Multi-Layer Backtesting
+Evaluates the deep-dive trade CSV layer by layer (baseline, stop-only, profit-only,
+combined) and keeps sufficient statistics per layer, so appended trades are
+merged into the stored aggregates instead of re-running the whole history
+"""
+
+import hashlib
+import json
+import logging
+import math
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .integrated_overlay_system import IntegratedRiskOverlay
+from .prepared_dataset import PreparedTradeDataset, calculate_trade_true_range, hash_prefix, read_header_line
+
+logger = logging.getLogger(__name__)
+
+LAYERS = ("baseline", "stop_only", "profit_only", "combined")
+
+STATE_VERSION = 3
+
+def evaluate_trade_layers(trade: Dict, overlay: IntegratedRiskOverlay) -> Dict[str, Tuple[float, Dict[str, int]]]:
+    """
+    Evaluate one trade in all layers
+
+    Layer outcomes only depend on the trade itself, which is what makes the
+    incremental merge exact. Precomputed "true_range" and "regime" entries of a
+    prepared dataset trade are used when present.
+
+    Returns:
+        Dict layer -> (trade return as fraction, trigger counts)
+    """
+    entry = trade["entry_price"]
+    daily_prices = trade["daily_prices"]
+    baseline_return = trade["move_2_day"]
+
+    regime = trade.get("regime") or overlay.classify_regime(trade["vix"])
+    config = overlay.regime_configurations[regime]
+    true_range = trade.get("true_range")
+    if true_range is None:
+        true_range = calculate_trade_true_range(daily_prices)
+
+    # Levels are computed once and shared by all layers
+    stop_data = overlay.calculate_dynamic_stop(entry, config, true_range)
+    profit_levels = overlay.calculate_dynamic_profits(entry, config, true_range)
+
+    # Layer 1: Stop-Loss only - stopped trades exit at the stop, others at the original exit
+    stop_level = stop_data["price"]
+    stop_return = baseline_return
+    stop_triggers = 0
+    for day_prices in daily_prices:
+        if day_prices["low"] <= stop_level:
+            stop_return = (stop_level - entry) / entry
+            stop_triggers = 1
+            break
+
+    # Layer 2: Profit-Taking only - each level is taken once, remainder at the original exit
+    profit_return = 0.0
+    remaining_position = 100
+    levels_hit = set()
+    for day_prices in daily_prices:
+        for i, profit_target in enumerate(profit_levels):
+            if i in levels_hit or day_prices["high"] < profit_target["price"]:
+                continue
+            position_to_close = min(profit_target["position_to_close"], remaining_position)
+            profit_return += (profit_target["price"] - entry) / entry * (position_to_close / 100)
+            remaining_position -= position_to_close
+            levels_hit.add(i)
+            if remaining_position <= 0:
+                break
+        if remaining_position <= 0:
+            break
+    if remaining_position > 0:
+        profit_return += baseline_return * (remaining_position / 100)
+
+    # Layer 3: Combined overlay - same daily loop as execute_integrated_overlay with the shared levels
+    combined = {
+        "entry_price": entry,
+        "stop_triggered": False,
+        "profit_levels_hit": [],
+        "remaining_position": 100,
+        "total_return": 0,
+        "exit_reason": "original_system",
+        "execution_log": []
+    }
+    for day, price_data in enumerate(daily_prices):
+        combined.update(overlay.process_daily_prices(day, price_data, combined, stop_data, profit_levels, config))
+        if combined["stop_triggered"] or combined["remaining_position"] == 0:
+            break
+    combined_return = overlay.calculate_final_performance(combined, daily_prices[-1])["total_return_pct"] / 100
+
+    return {
+        "baseline": (baseline_return, {}),
+        "stop_only": (stop_return, {"stop_triggers": stop_triggers}),
+        "profit_only": (profit_return, {"profit_triggers": len(levels_hit)}),
+        "combined": (combined_return, {
+            "stop_triggers": int(combined["stop_triggered"]),
+            "profit_triggers": len(combined["profit_levels_hit"])
+        })
+    }
+
+@dataclass
+class LayerStatistics:
+    """
+    Sufficient statistics of a return series
+
+    Everything in the layer summary can be derived from these values, and they can
+    be updated one trade at a time in file order (drawdown depends on the order).
+    """
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+    wins: int = 0
+    max_win: Optional[float] = None
+    max_loss: Optional[float] = None
+    equity: float = 1.0
+    peak: float = 0.0
+    max_drawdown: float = 0.0
+    triggers: Dict[str, int] = field(default_factory=dict)
+
+    def update(self, trade_return: float, triggers: Optional[Dict[str, int]] = None):
+        """Add one trade return"""
+        self.count += 1
+        self.total += trade_return
+        self.total_sq += trade_return * trade_return
+        if trade_return > 0:
+            self.wins += 1
+        self.max_win = trade_return if self.max_win is None else max(self.max_win, trade_return)
+        self.max_loss = trade_return if self.max_loss is None else min(self.max_loss, trade_return)
+
+        # Compounded equity curve; the peak starts at the first equity value
+        self.equity *= (1 + trade_return)
+        self.peak = max(self.peak, self.equity)
+        if self.peak > 0:
+            self.max_drawdown = min(self.max_drawdown, (self.equity - self.peak) / self.peak)
+
+        for name, value in (triggers or {}).items():
+            self.triggers[name] = self.triggers.get(name, 0) + value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation (same as np.std)"""
+        if self.count == 0:
+            return 0.0
+        variance = self.total_sq / self.count - self.mean ** 2
+        return math.sqrt(max(variance, 0.0))
+
+    def sharpe_ratio(self, risk_free_rate: float = 0.02) -> float:
+        """Annualized Sharpe ratio - shifting by the risk-free rate leaves the std unchanged"""
+        std = self.std
+        if std == 0:
+            return 0.0
+        return (self.mean - risk_free_rate / 252) / std * math.sqrt(252)
+
+    def summary(self) -> Dict:
+        """Layer results in the format of the multi-layer backtest report"""
+        if self.count == 0:
+            return {"total_trades": 0}
+
+        results = {
+            "total_trades": self.count,
+            "total_return": self.total,
+            "avg_return_per_trade": self.mean,
+            "win_rate": self.wins / self.count,
+            "max_win": self.max_win,
+            "max_loss": self.max_loss,
+            "sharpe_ratio": self.sharpe_ratio(),
+            "max_drawdown": self.max_drawdown
+        }
+        if "stop_triggers" in self.triggers:
+            results["stop_triggers"] = self.triggers["stop_triggers"]
+            results["stop_trigger_rate"] = self.triggers["stop_triggers"] / self.count
+        if "profit_triggers" in self.triggers:
+            results["profit_triggers"] = self.triggers["profit_triggers"]
+            results["avg_profit_levels_per_trade"] = self.triggers["profit_triggers"] / self.count
+        return results
+
+class IncrementalMultiLayerBacktester:
+    """
+    Multi-layer backtest over the deep-dive CSV with persisted per-layer state
+
+    Trades come from the PreparedTradeDataset cache of the CSV. The state file stores
+    the number of evaluated settled trades, the byte offset they end at and the layer
+    statistics; a refresh only evaluates trades behind that point. Open trades and
+    the rows behind them are never persisted: they are evaluated on a copy of the
+    statistics in every run, until they settle. If the already evaluated part of the
+    file changed, it falls back to a full run.
+    """
+
+    def __init__(self, trade_data_file: str, state_file: Optional[str] = None):
+        self.trade_data_file = Path(trade_data_file)
+        self.state_file = Path(state_file) if state_file else self.trade_data_file.with_name(
+            self.trade_data_file.name + ".backtest_state.json"
+        )
+        self.overlay_system = IntegratedRiskOverlay()
+
+        self.offset = 0
+        self.rows_evaluated = 0
+        self.rows_skipped = 0
+        self.header_hash: Optional[str] = None
+        self.prefix_hash: Optional[str] = None
+        self.layers: Dict[str, LayerStatistics] = {layer: LayerStatistics() for layer in LAYERS}
+
+    def run(self, full: bool = False) -> Dict:
+        """
+        Bring the layer statistics up to date with the CSV and persist them
+
+        Args:
+            full: Ignore stored state and re-evaluate the whole file
+
+        Returns:
+            Dict with per-layer results and refresh details
+        """
+        started = datetime.now()
+        dataset = PreparedTradeDataset.load(str(self.trade_data_file))
+
+        mode = "incremental"
+        if full or not self.load_state() or not self._state_matches_file(dataset.source["settled_trades"]):
+            mode = "full"
+            self.reset()
+
+        settled_trades = dataset.source["settled_trades"]
+        new_trades = len(dataset) - self.rows_evaluated
+        self._evaluate(dataset, self.rows_evaluated, settled_trades, self.layers)
+
+        self.rows_evaluated = settled_trades
+        self.rows_skipped = dataset.source["settled_skipped_rows"]
+        self.offset = dataset.source["offset"]
+        self.header_hash = dataset.source["header_hash"]
+        self.prefix_hash = dataset.source["prefix_hash"]
+        self.save_state()
+
+        # Pending trades count in this result only and are re-read next time
+        layers = {layer: LayerStatistics(**asdict(stats)) for layer, stats in self.layers.items()}
+        self._evaluate(dataset, settled_trades, len(dataset), layers)
+
+        logger.info(f"{mode.capitalize()} backtest refresh: {new_trades} new trades, "
+                    f"{len(dataset)} total ({len(dataset) - settled_trades} pending) "
+                    f"in {(datetime.now() - started).total_seconds():.3f}s")
+
+        return {
+            "mode": mode,
+            "new_trades": new_trades,
+            "total_trades": len(dataset),
+            "pending_trades": len(dataset) - settled_trades,
+            "skipped_rows": dataset.source["skipped_rows"],
+            "layers": {layer: stats.summary() for layer, stats in layers.items()}
+        }
+
+    def _evaluate(self, dataset: PreparedTradeDataset, start: int, stop: int,
+                  layers: Dict[str, LayerStatistics]):
+        """Add the trades start..stop-1 of the dataset to the layer statistics"""
+        for index in range(start, stop):
+            trade = dataset.trade(index)
+            for layer, (trade_return, triggers) in evaluate_trade_layers(trade, self.overlay_system).items():
+                layers[layer].update(trade_return, triggers)
+
+    def reset(self):
+        """Forget all evaluated rows"""
+        self.offset = 0
+        self.rows_evaluated = 0
+        self.rows_skipped = 0
+        self.prefix_hash = None
+        self.layers = {layer: LayerStatistics() for layer in LAYERS}
+
+    def load_state(self) -> bool:
+        """Load persisted statistics; returns False if there is no usable state"""
+        if not self.state_file.exists():
+            return False
+        try:
+            with open(self.state_file, "r") as f:
+                state = json.load(f)
+            if state.get("version") != STATE_VERSION:
+                return False
+
+            self.offset = state["offset"]
+            self.rows_evaluated = state["rows_evaluated"]
+            self.rows_skipped = state["rows_skipped"]
+            self.header_hash = state["header_hash"]
+            self.prefix_hash = state["prefix_hash"]
+            self.layers = {layer: LayerStatistics(**state["layers"][layer]) for layer in LAYERS}
+            return True
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable backtest state {self.state_file}: {e}")
+            return False
+
+    def save_state(self):
+        """Persist statistics atomically next to the CSV"""
+        state = {
+            "version": STATE_VERSION,
+            "source_file": str(self.trade_data_file),
+            "updated_at": datetime.now().isoformat(),
+            "offset": self.offset,
+            "rows_evaluated": self.rows_evaluated,
+            "rows_skipped": self.rows_skipped,
+            "header_hash": self.header_hash,
+            "prefix_hash": self.prefix_hash,
+            "layers": {layer: asdict(stats) for layer, stats in self.layers.items()}
+        }
+        tmp_file = self.state_file.with_name(self.state_file.name + ".tmp")
+        with open(tmp_file, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def _state_matches_file(self, dataset_settled_trades: int) -> bool:
+        """The evaluated part of the file must be unchanged for an incremental refresh"""
+        header_hash = hashlib.sha1(read_header_line(self.trade_data_file)).hexdigest()
+        if self.header_hash != header_hash or self.rows_evaluated > dataset_settled_trades:
+            return False
+        if self.offset > self.trade_data_file.stat().st_size:
+            return False
+        return hash_prefix(self.trade_data_file, self.offset) == self.prefix_hash
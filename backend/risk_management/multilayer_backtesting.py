@@ -3,13 +3,87 @@ Simplified Multilayer Backtesting System for FastAPI Backend
 Provides basic backtesting functionality for the risk management system
 """
 
+import math
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import logging
 
+from .columnar_store import ColumnarResultWriter
+
 logger = logging.getLogger(__name__)
 
+# Trade results buffered in memory before they are flushed to a columnar result store
+STORE_FLUSH_ROWS = 10000
+
+# Summary metrics of an empty return series
+EMPTY_SUMMARY_METRICS = {
+    "total_return_pct": 0.0,
+    "avg_return_per_trade": 0.0,
+    "volatility": 0.0,
+    "win_rate": 0.0,
+    "max_win": 0.0,
+    "max_loss": 0.0,
+    "sharpe_ratio": 0.0,
+    "max_drawdown": 0.0
+}
+
+class BacktestCancelled(Exception):
+    """Raised by a progress callback to abort a running backtest"""
+
+class RunningSummary:
+    """
+    Summary metrics of a growing return series, updated in O(1) per trade
+
+    Produces the same values as MultiLayerBacktester.calculate_summary_metrics
+    on the returns added so far (up to float rounding), so chunk progress does
+    not rescan the whole series.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0  # Sum of squared deviations (Welford)
+        self.wins = 0
+        self.max_return = -math.inf
+        self.min_return = math.inf
+        self._equity = 1.0
+        self._peak = 1.0
+        self.max_drawdown = 0.0
+    
+    def add(self, trade_return: float):
+        self.count += 1
+        self.total += trade_return
+        delta = trade_return - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (trade_return - self.mean)
+        if trade_return > 0:
+            self.wins += 1
+        self.max_return = max(self.max_return, trade_return)
+        self.min_return = min(self.min_return, trade_return)
+        
+        self._equity *= 1 + trade_return
+        if self.count == 1:
+            self._peak = self._equity
+        self._peak = max(self._peak, self._equity)
+        self.max_drawdown = min(self.max_drawdown, (self._equity - self._peak) / self._peak)
+    
+    def metrics(self) -> Dict:
+        if self.count == 0:
+            return dict(EMPTY_SUMMARY_METRICS)
+        std = math.sqrt(self._m2 / self.count)
+        return {
+            "total_return_pct": self.total * 100,
+            "avg_return_per_trade": self.mean * 100,
+            "volatility": std * 100,
+            "win_rate": self.wins / self.count,
+            "max_win": self.max_return * 100,
+            "max_loss": self.min_return * 100,
+            "sharpe_ratio": self.mean / std if std > 0 else 0,
+            "max_drawdown": self.max_drawdown * 100
+        }
+
 class MultiLayerBacktester:
     """
     Simplified backtest engine for the FastAPI backend
@@ -21,13 +95,21 @@ class MultiLayerBacktester:
         self.backtest_results = {}
         logger.info("MultiLayerBacktester initialized")
     
-    def run_comprehensive_backtest(self, historical_data: List[Dict], config_overrides: Dict = None) -> Dict:
+    def run_comprehensive_backtest(self, historical_data: List[Dict], config_overrides: Dict = None,
+                                   progress_callback: Optional[Callable[[Dict], None]] = None,
+                                   chunk_size: Optional[int] = None,
+                                   result_store: Optional[str] = None) -> Dict:
         """
         Run a comprehensive backtest on historical data
         
         Args:
             historical_data: List of historical trade data
             config_overrides: Optional configuration overrides
+            progress_callback: Optional callable receiving partial metrics after each chunk.
+                Raising BacktestCancelled from the callback aborts the backtest.
+            chunk_size: Number of trades per progress chunk (default: all trades in one chunk)
+            result_store: Optional directory for a columnar result store. Trade results are
+                streamed there instead of being returned in "trade_results".
             
         Returns:
             Dict containing backtest results
@@ -62,54 +144,82 @@ class MultiLayerBacktester:
             }
             
             # Simple backtest implementation
-            total_return = 0.0
             wins = 0
             returns = []
+            running = RunningSummary()
+            chunk_size = chunk_size or max(len(historical_data), 1)
+            writer = ColumnarResultWriter(result_store, metadata={"config_overrides": config_overrides or {}}) \
+                if result_store else None
             
-            for i, trade_data in enumerate(historical_data):
-                # Simulate trade execution
-                entry_price = trade_data.get("entry_price", 100.0)
-                exit_price = trade_data.get("exit_price", entry_price * (1 + np.random.normal(0.02, 0.05)))
-                
-                trade_return = (exit_price - entry_price) / entry_price
-                returns.append(trade_return)
-                total_return += trade_return
+            try:
+                for i, trade_data in enumerate(historical_data):
+                    # Simulate trade execution
+                    entry_price = trade_data.get("entry_price", 100.0)
+                    exit_price = trade_data.get("exit_price", entry_price * (1 + np.random.normal(0.02, 0.05)))
+                    
+                    trade_return = (exit_price - entry_price) / entry_price
+                    returns.append(trade_return)
+                    running.add(trade_return)
+                    
+                    if trade_return > 0:
+                        wins += 1
+                    
+                    # Store trade result
+                    trade_result = {
+                        "trade_id": i,
+                        "symbol": trade_data.get("symbol", f"TRADE_{i}"),
+                        "entry_price": entry_price,
+                        "exit_price": exit_price,
+                        "return_pct": trade_return * 100,
+                        "regime": trade_data.get("regime", "bull_normal")
+                    }
+                    results["trade_results"].append(trade_result)
+                    if writer and len(results["trade_results"]) >= STORE_FLUSH_ROWS:
+                        writer.append_records(results["trade_results"])
+                        results["trade_results"] = []
+                    
+                    # Report partial metrics once a chunk is finished
+                    if progress_callback and ((i + 1) % chunk_size == 0 or i + 1 == len(historical_data)):
+                        progress_callback({
+                            "completed_trades": i + 1,
+                            "total_trades": len(historical_data),
+                            **running.metrics()
+                        })
                 
-                if trade_return > 0:
-                    wins += 1
-                
-                # Store trade result
-                trade_result = {
-                    "trade_id": i,
-                    "symbol": trade_data.get("symbol", f"TRADE_{i}"),
-                    "entry_price": entry_price,
-                    "exit_price": exit_price,
-                    "return_pct": trade_return * 100,
-                    "regime": trade_data.get("regime", "bull_normal")
-                }
-                results["trade_results"].append(trade_result)
+                if writer:
+                    writer.append_records(results["trade_results"])
+                    results["trade_results"] = []
+                    writer.close()
+                    results["trade_results_store"] = str(result_store)
+            finally:
+                # A cancelled or failed run must not leave open files or a half-written store
+                if writer and not writer.closed:
+                    writer.abort()
             
             # Calculate summary metrics
             if len(returns) > 0:
-                results["backtest_summary"]["total_return"] = total_return * 100
-                results["backtest_summary"]["win_rate"] = wins / len(returns)
-                results["backtest_summary"]["sharpe_ratio"] = np.mean(returns) / np.std(returns) if np.std(returns) > 0 else 0
-                
-                results["performance_metrics"]["total_return_pct"] = total_return * 100
-                results["performance_metrics"]["avg_return_per_trade"] = np.mean(returns) * 100
-                results["performance_metrics"]["volatility"] = np.std(returns) * 100
-                results["performance_metrics"]["max_win"] = max(returns) * 100 if returns else 0
-                results["performance_metrics"]["max_loss"] = min(returns) * 100 if returns else 0
+                metrics = self.calculate_summary_metrics(returns)
+                results["backtest_summary"]["total_return"] = metrics["total_return_pct"]
+                results["backtest_summary"]["win_rate"] = metrics["win_rate"]
+                results["backtest_summary"]["sharpe_ratio"] = metrics["sharpe_ratio"]
+                results["backtest_summary"]["max_drawdown"] = metrics["max_drawdown"]
                 
-                # Calculate max drawdown (simplified)
-                cumulative_returns = np.cumprod([1 + r for r in returns])
-                running_max = np.maximum.accumulate(cumulative_returns)
-                drawdowns = (cumulative_returns - running_max) / running_max
-                results["backtest_summary"]["max_drawdown"] = min(drawdowns) * 100 if len(drawdowns) > 0 else 0
+                results["performance_metrics"]["total_return_pct"] = metrics["total_return_pct"]
+                results["performance_metrics"]["avg_return_per_trade"] = metrics["avg_return_per_trade"]
+                results["performance_metrics"]["volatility"] = metrics["volatility"]
+                results["performance_metrics"]["max_win"] = metrics["max_win"]
+                results["performance_metrics"]["max_loss"] = metrics["max_loss"]
             
             logger.info(f"Backtest completed: {wins}/{len(historical_data)} winning trades")
             return results
             
+        except BacktestCancelled:
+            logger.info("Backtest cancelled by progress callback")
+            raise
+        except MemoryError:
+            # Reported by the job manager as an exceeded memory limit
+            logger.error("Backtest ran out of memory")
+            raise
         except Exception as e:
             logger.error(f"Error in backtest: {e}")
             return {
@@ -121,6 +231,30 @@ class MultiLayerBacktester:
                 "regime_analysis": {}
             }
     
+    def calculate_summary_metrics(self, returns: List[float]) -> Dict:
+        """Calculate aggregate metrics (in percent) for a list of per-trade returns"""
+        if len(returns) == 0:
+            return dict(EMPTY_SUMMARY_METRICS)
+        
+        returns_array = np.asarray(returns, dtype=float)
+        std = np.std(returns_array)
+        
+        # Calculate max drawdown (simplified)
+        cumulative_returns = np.cumprod(1 + returns_array)
+        running_max = np.maximum.accumulate(cumulative_returns)
+        drawdowns = (cumulative_returns - running_max) / running_max
+        
+        return {
+            "total_return_pct": float(np.sum(returns_array)) * 100,
+            "avg_return_per_trade": float(np.mean(returns_array)) * 100,
+            "volatility": float(std) * 100,
+            "win_rate": float(np.sum(returns_array > 0)) / len(returns_array),
+            "max_win": float(np.max(returns_array)) * 100,
+            "max_loss": float(np.min(returns_array)) * 100,
+            "sharpe_ratio": float(np.mean(returns_array) / std) if std > 0 else 0,
+            "max_drawdown": float(np.min(drawdowns)) * 100
+        }
+    
     def analyze_regime_performance(self, backtest_results: Dict) -> Dict:
         """Analyze performance by regime"""
         try:
@@ -0,0 +1,281 @@
+"""
+BIDBACK Trading Tool - Parameter Sweep
+Evaluates grids of rule adjustments with the exit kernel over a prepared dataset in
+chronological chunks, and abandons configurations as soon as they can no longer
+meet the performance targets (drawdown tolerance, minimum win rate)
+"""
+
+import itertools
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .exit_kernel import compute_exit_levels, run_exit_kernel, transition_adjustments
+from .prepared_dataset import PreparedTradeDataset, classify_regimes
+from .vix_sweep import thresholds_to_regime_configurations
+
+logger = logging.getLogger(__name__)
+
+STATUS_COMPLETE = "complete"
+STATUS_PRUNED_DRAWDOWN = "pruned_drawdown"
+STATUS_PRUNED_WIN_RATE = "pruned_win_rate"
+
+@dataclass
+class PruningRules:
+    """
+    Targets a configuration has to be able to reach to keep being evaluated
+
+    Both checks are exact: max drawdown never recovers, and the win rate bound
+    assumes every remaining trade wins, so a pruned configuration would have
+    missed the target after the full run as well.
+    """
+    max_drawdown_tolerance: Optional[float] = 15.0  # % of peak equity, None = off
+    min_win_rate: Optional[float] = 0.6              # Fraction, None = off
+
+    @classmethod
+    def from_performance_targets(cls, performance_targets: Dict) -> "PruningRules":
+        """Rules from the performance_targets section of the UltimateRiskManager config"""
+        return cls(
+            max_drawdown_tolerance=performance_targets.get("max_drawdown_tolerance"),
+            min_win_rate=performance_targets.get("min_win_rate")
+        )
+
+def adjustment_grid(stop_adjustments: Sequence[float] = (1.0,),
+                    profit_adjustments: Sequence[float] = (1.0,),
+                    volatility_factors: Sequence[float] = (1.0,),
+                    vix_thresholds: Sequence[Optional[Tuple[float, float, float, float]]] = (None,)) -> List[Dict]:
+    """Cartesian product of rule adjustments as sweep configurations"""
+    return [
+        {
+            "stop_adjustment": stop,
+            "profit_adjustment": profit,
+            "volatility_factor": volatility,
+            "vix_thresholds": thresholds
+        }
+        for stop, profit, volatility, thresholds in itertools.product(
+            stop_adjustments, profit_adjustments, volatility_factors, vix_thresholds)
+    ]
+
+class ParameterSweep:
+    """
+    Chunked evaluation of sweep configurations with early pruning
+
+    All configurations still alive are evaluated together: the trades of one chunk
+    are tiled once per configuration and run through a single exit kernel call.
+    Running equity, drawdown and win counts are carried across chunks in the
+    dataset's trade order (file order, chronological for the deep-dive CSV).
+    """
+
+    def __init__(self, dataset: PreparedTradeDataset,
+                 configurations: Sequence[Dict],
+                 regime_configurations: Optional[Dict] = None,
+                 pruning: Optional[PruningRules] = None,
+                 chunk_size: int = 500,
+                 ordering: str = "stop_first",
+                 max_levels_per_day: int = 0,
+                 max_hold_days: int = 5):
+        """
+        Args:
+            dataset: Trades in chronological order
+            configurations: Dicts with optional stop_adjustment, profit_adjustment,
+                volatility_factor and vix_thresholds (see adjustment_grid), plus
+                regime_configurations (replaces the base rules) and
+                transition_thresholds (applies DynamicRegimeManager entry adjustments)
+            regime_configurations: Base regime rules (default: IntegratedRiskOverlay)
+            pruning: PruningRules; default from UltimateRiskManager performance_targets.
+                Pass PruningRules(None, None) to evaluate every configuration fully
+            chunk_size: Trades per chunk between pruning checks
+            ordering, max_levels_per_day, max_hold_days: Exit kernel semantics
+        """
+        self.dataset = dataset
+        self.configurations = list(configurations)
+        self.regime_configurations = regime_configurations
+        if pruning is None:
+            from .ultimate_implementation import UltimateRiskManager
+            pruning = PruningRules.from_performance_targets(UltimateRiskManager().config["performance_targets"])
+        self.pruning = pruning
+        self.chunk_size = max(1, int(chunk_size))
+        self.ordering = ordering
+        self.max_levels_per_day = max_levels_per_day
+        self.max_hold_days = max_hold_days
+
+        self._regime_cache: Dict[Tuple, np.ndarray] = {}
+        self._adjustment_cache: Dict[Tuple, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _regimes(self, vix_thresholds: Optional[Sequence[float]],
+                 regime_configurations: Optional[Dict] = None) -> np.ndarray:
+        """Regime codes of all trades for a threshold tuple and rule set (None = dataset regimes)"""
+        configurations = regime_configurations if regime_configurations is not None else self.regime_configurations
+        ranges = None if configurations is None else \
+            tuple(sorted((regime, tuple(config["vix_range"])) for regime, config in configurations.items()))
+        thresholds = None if vix_thresholds is None else tuple(float(t) for t in vix_thresholds)
+        key = (thresholds, ranges)
+        if key not in self._regime_cache:
+            if key == (None, None):
+                self._regime_cache[key] = self.dataset.regime
+            else:
+                if configurations is None:
+                    from .integrated_overlay_system import IntegratedRiskOverlay
+                    configurations = IntegratedRiskOverlay().regime_configurations
+                if thresholds is not None:
+                    configurations = thresholds_to_regime_configurations(thresholds, configurations)
+                self._regime_cache[key] = classify_regimes(self.dataset.vix, configurations)
+        return self._regime_cache[key]
+
+    def _transition_adjustments(self, transition_thresholds: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Stop and profit adjustments of all trades as applied by open_position"""
+        key = tuple(sorted(transition_thresholds.items()))
+        if key not in self._adjustment_cache:
+            adjustments = transition_adjustments(self.dataset.vix, self.dataset.t2108,
+                                                 self.dataset.momentum_ratio, transition_thresholds)
+            self._adjustment_cache[key] = (adjustments["stop_multiplier"] ** 2, adjustments["profit_multiplier"])
+        return self._adjustment_cache[key]
+
+    def _chunk_returns(self, config_indices: np.ndarray, start: int, stop: int) -> np.ndarray:
+        """Trade returns (configurations x trades) of one chunk"""
+        dataset = self.dataset
+        chunk = slice(start, stop)
+        stops, profit_levels, close_pct = [], [], []
+        for index in config_indices:
+            configuration = self.configurations[index]
+            regime_configurations = configuration.get("regime_configurations", self.regime_configurations)
+            stop_adjustment = configuration.get("stop_adjustment", 1.0)
+            profit_adjustment = configuration.get("profit_adjustment", 1.0)
+            if configuration.get("transition_thresholds") is not None:
+                stop_multiplier, profit_multiplier = self._transition_adjustments(
+                    configuration["transition_thresholds"])
+                stop_adjustment = stop_adjustment * stop_multiplier[chunk]
+                profit_adjustment = profit_adjustment * profit_multiplier[chunk]
+            levels = compute_exit_levels(
+                dataset.entry[chunk], dataset.true_range[chunk],
+                self._regimes(configuration.get("vix_thresholds"), regime_configurations)[chunk],
+                regime_configurations,
+                stop_adjustment=stop_adjustment,
+                profit_adjustment=profit_adjustment,
+                volatility_factor=configuration.get("volatility_factor", 1.0)
+            )
+            stops.append(levels["stop"])
+            profit_levels.append(levels["profit_levels"])
+            close_pct.append(levels["close_pct"])
+
+        repeats = (len(config_indices), 1)
+        outcome = run_exit_kernel(
+            np.tile(dataset.entry[chunk], len(config_indices)),
+            np.concatenate(stops), np.concatenate(profit_levels), np.concatenate(close_pct),
+            np.tile(dataset.high[chunk], repeats), np.tile(dataset.low[chunk], repeats),
+            np.tile(dataset.close[chunk], repeats),
+            ordering=self.ordering, max_levels_per_day=self.max_levels_per_day,
+            max_hold_days=self.max_hold_days
+        )
+        return outcome["total_return"].reshape(len(config_indices), stop - start)
+
+    def run(self, risk_free_rate: float = 0.02, result_store=None, sweep_id: Optional[str] = None) -> Dict:
+        """
+        Evaluate all configurations
+
+        Args:
+            risk_free_rate: Annual risk-free rate for the Sharpe ratio
+            result_store: Optional SweepResultStore that receives every result
+            sweep_id: Sweep the results are stored under (created if missing)
+
+        Returns:
+            Dict with one result per configuration (input order) and pruning totals
+        """
+        started = datetime.now()
+        n_configs, n_trades = len(self.configurations), len(self.dataset)
+
+        count = np.zeros(n_configs, dtype=np.int64)
+        wins = np.zeros(n_configs, dtype=np.int64)
+        total = np.zeros(n_configs)
+        total_sq = np.zeros(n_configs)
+        # Equity is compounded in log space - long synthetic workloads overflow float64 otherwise
+        log_equity = np.zeros(n_configs)
+        log_peak = np.full(n_configs, -np.inf)  # Starts at the first equity value like LayerStatistics
+        max_drawdown = np.zeros(n_configs)
+        status = np.full(n_configs, STATUS_COMPLETE, dtype=object)
+
+        drawdown_limit = None if self.pruning.max_drawdown_tolerance is None \
+            else -self.pruning.max_drawdown_tolerance / 100
+        alive = np.arange(n_configs)
+
+        for start in range(0, n_trades, self.chunk_size):
+            if not len(alive):
+                break
+            stop = min(start + self.chunk_size, n_trades)
+            returns = self._chunk_returns(alive, start, stop)
+
+            count[alive] += returns.shape[1]
+            wins[alive] += np.sum(returns > 0, axis=1)
+            total[alive] += returns.sum(axis=1)
+            total_sq[alive] += np.sum(returns * returns, axis=1)
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                path = log_equity[alive, None] + np.cumsum(np.log1p(returns), axis=1)
+                running_peak = np.maximum(np.maximum.accumulate(path, axis=1), log_peak[alive, None])
+                drawdown = np.nan_to_num(np.expm1(path - running_peak), nan=-1.0)
+            max_drawdown[alive] = np.minimum(max_drawdown[alive], drawdown.min(axis=1))
+            log_equity[alive] = path[:, -1]
+            log_peak[alive] = running_peak[:, -1]
+
+            keep = np.ones(len(alive), dtype=bool)
+            if drawdown_limit is not None:
+                breached = max_drawdown[alive] < drawdown_limit
+                status[alive[breached]] = STATUS_PRUNED_DRAWDOWN
+                keep &= ~breached
+            if self.pruning.min_win_rate is not None and n_trades:
+                best_case = (wins[alive] + (n_trades - count[alive])) / n_trades
+                hopeless = keep & (best_case < self.pruning.min_win_rate)
+                status[alive[hopeless]] = STATUS_PRUNED_WIN_RATE
+                keep &= ~hopeless
+            alive = alive[keep]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(count > 0, total / np.maximum(count, 1), 0.0)
+            std = np.sqrt(np.maximum(total_sq / np.maximum(count, 1) - mean ** 2, 0.0))
+            sharpe = np.where(std > 0, (mean - risk_free_rate / 252) / std * np.sqrt(252), 0.0)
+            win_rate = np.where(count > 0, wins / np.maximum(count, 1), 0.0)
+
+        results = []
+        for index, configuration in enumerate(self.configurations):
+            results.append({
+                "configuration": configuration,
+                "status": status[index],
+                "trades_evaluated": int(count[index]),
+                "total_return": float(total[index]),
+                "avg_return_per_trade": float(mean[index]),
+                "win_rate": float(win_rate[index]),
+                "sharpe_ratio": float(sharpe[index]),
+                "max_drawdown": float(max_drawdown[index])
+            })
+
+        evaluations = int(count.sum())
+        pruned = int(np.sum(status != STATUS_COMPLETE))
+        logger.info(f"Parameter sweep: {n_configs} configurations, {pruned} pruned, "
+                    f"{evaluations}/{n_configs * n_trades} trade evaluations in "
+                    f"{(datetime.now() - started).total_seconds():.3f}s")
+
+        output = {
+            "results": results,
+            "configurations": n_configs,
+            "total_trades": n_trades,
+            "completed": n_configs - pruned,
+            "pruned": pruned,
+            "trade_evaluations": evaluations,
+            "trade_evaluations_full": n_configs * n_trades
+        }
+
+        if result_store is not None:
+            sweep_id = result_store.create_sweep(sweep_id, parameters={
+                "chunk_size": self.chunk_size,
+                "ordering": self.ordering,
+                "max_levels_per_day": self.max_levels_per_day,
+                "max_hold_days": self.max_hold_days,
+                "pruning": asdict(self.pruning)
+            }, total_trades=n_trades)
+            result_store.add_results(sweep_id, results)
+            output["sweep_id"] = sweep_id
+
+        return output
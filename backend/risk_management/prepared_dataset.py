@@ -0,0 +1,397 @@
+"""
+BIDBACK Trading Tool - Prepared Trade Dataset
+Parses the deep-dive trade CSV once into NumPy arrays (daily prices, true range,
+regime code, VIX rank, baseline return) and caches them next to the CSV, so
+backtest layers, engines and sweep workers do not re-parse and re-derive per trade
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import math
+import os
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .columnar_store import REGIME_CATEGORIES
+from .integrated_overlay_system import IntegratedRiskOverlay
+
+logger = logging.getLogger(__name__)
+
+PREPARED_VERSION = 3
+PRICE_DAYS = 5
+PREFIX_CHECK_BYTES = 4096
+
+# CSV parsing
+
+def parse_decimal(value: Optional[str]) -> Optional[float]:
+    """Parse German formatted numbers like '45,66 €', '-2,21%' or '1.234,5'"""
+    if value is None:
+        return None
+    text = value.replace("€", "").replace("%", "").replace("\xa0", "").strip()
+    if not text:
+        return None
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    try:
+        number = float(text)
+    except ValueError:
+        return None  # '#DIV/0!' etc.
+    return number if math.isfinite(number) else None
+
+def parse_trade_row(row: Dict[str, str]) -> Optional[Dict]:
+    """
+    Convert one deep-dive CSV row into a trade dict
+
+    Returns None if the row has no entry price or no 2-day move. Daily prices stop
+    at the first day without a close, so open trades only use the days they have.
+    """
+    entry = parse_decimal(row.get("Entry"))
+    move_2_day = parse_decimal(row.get("Move 2 day"))
+    if entry is None or entry <= 0 or move_2_day is None:
+        return None
+
+    daily_prices = []
+    for day in range(1, PRICE_DAYS + 1):
+        close = parse_decimal(row.get(f"$ Tag {day}"))
+        if close is None:
+            break
+        # Tag 1 has no high column - the close is the best available high
+        high = parse_decimal(row.get(f"$ Tag {day} High")) if day > 1 else None
+        high = high if high is not None else close
+        low = parse_decimal(row.get(f"$ Tag {day} Low"))
+        low = low if low is not None else high * 0.95  # Estimate
+        daily_prices.append({"high": high, "low": low, "close": close})
+
+    if not daily_prices:
+        return None
+
+    vix = parse_decimal(row.get("VIX CBOE 1-day"))
+
+    return {
+        "symbol": (row.get("Kuerzel") or "").strip(),
+        "breakout_date": (row.get("Tag des Ausbruchs") or "").strip(),
+        "entry_price": entry,
+        "vix": vix if vix is not None else 20.0,
+        "move_2_day": move_2_day / 100,
+        "daily_prices": daily_prices
+    }
+
+def is_placeholder_row(row: Dict[str, str]) -> bool:
+    """Spreadsheet exports pad the file with empty rows that only carry formula errors"""
+    return not (row.get("Kuerzel") or "").strip() and not (row.get("Entry") or "").strip()
+
+def calculate_trade_true_range(daily_prices: List[Dict]) -> float:
+    """True Range of the first two trading days"""
+    if len(daily_prices) < 2:
+        return daily_prices[0]["high"] - daily_prices[0]["low"]
+
+    tr1 = daily_prices[1]["high"] - daily_prices[1]["low"]
+    tr2 = abs(daily_prices[1]["high"] - daily_prices[0]["close"])
+    tr3 = abs(daily_prices[1]["low"] - daily_prices[0]["close"])
+
+    return max(tr1, tr2, tr3)
+
+def read_header_line(csv_path: Path) -> bytes:
+    with open(csv_path, "rb") as f:
+        return f.readline()
+
+def hash_prefix(csv_path: Path, offset: int) -> str:
+    """Hash of the bytes right before the offset (cheap check for rewritten history)"""
+    start = max(0, offset - PREFIX_CHECK_BYTES)
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+def iter_trade_rows(csv_path: Path, offset: int = 0,
+                    header_line: Optional[bytes] = None) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """
+    Yield (end offset, row) for each trade row behind the given byte offset
+
+    Placeholder rows are skipped without yielding an offset, so rows that are
+    filled in later by the export are still picked up by the next read.
+    """
+    header_line = header_line if header_line is not None else read_header_line(csv_path)
+    fieldnames = next(csv.reader([header_line.decode("utf-8-sig")], delimiter=";"))
+    fieldnames = [name.strip() for name in fieldnames]
+
+    with open(csv_path, "rb") as f:
+        f.seek(max(offset, len(header_line)))
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            text = line.decode("utf-8").strip("\r\n")
+            if not text.strip(";").strip():
+                continue
+
+            values = next(csv.reader([text], delimiter=";"))
+            row = dict(zip(fieldnames, values))
+            if is_placeholder_row(row):
+                continue
+            yield f.tell(), row
+
+# Derived arrays
+
+def classify_regimes(vix: np.ndarray, regime_configurations: Optional[Dict] = None) -> np.ndarray:
+    """Vectorized IntegratedRiskOverlay.classify_regime returning REGIME_CATEGORIES codes"""
+    if regime_configurations is None:
+        regime_configurations = IntegratedRiskOverlay().regime_configurations
+
+    codes = np.full(len(vix), REGIME_CATEGORIES.index("bull_normal"), dtype=np.int8)
+    assigned = np.zeros(len(vix), dtype=bool)
+    for regime, config in regime_configurations.items():
+        vix_min, vix_max = config["vix_range"]
+        mask = ~assigned & (vix >= vix_min) & (vix < vix_max)
+        codes[mask] = REGIME_CATEGORIES.index(regime)
+        assigned |= mask
+    return codes
+
+def calculate_true_ranges(high: np.ndarray, low: np.ndarray, close: np.ndarray, n_days: np.ndarray) -> np.ndarray:
+    """Vectorized calculate_trade_true_range over all trades"""
+    single_day = high[:, 0] - low[:, 0]
+    two_day = np.maximum.reduce([
+        high[:, 1] - low[:, 1],
+        np.abs(high[:, 1] - close[:, 0]),
+        np.abs(low[:, 1] - close[:, 0])
+    ])
+    return np.where(n_days >= 2, two_day, single_day)
+
+class PreparedTradeDataset:
+    """
+    Parameter-independent per-trade arrays of the deep-dive CSV
+
+    Price matrices have shape (trades, PRICE_DAYS) and hold NaN for days a trade
+    does not have; n_days counts the valid leading days.
+    """
+
+    ARRAY_FIELDS = ("symbols", "breakout_dates", "entry", "high", "low", "close",
+                    "baseline_return", "vix", "t2108", "momentum_ratio")
+
+    def __init__(self, symbols: np.ndarray, breakout_dates: np.ndarray, entry: np.ndarray,
+                 high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                 baseline_return: np.ndarray, vix: np.ndarray,
+                 t2108: Optional[np.ndarray] = None, momentum_ratio: Optional[np.ndarray] = None,
+                 source: Optional[Dict] = None):
+        self.symbols = symbols
+        self.breakout_dates = breakout_dates
+        self.entry = entry
+        self.high = high
+        self.low = low
+        self.close = close
+        self.baseline_return = baseline_return
+        self.vix = vix
+        # Market breadth context is not part of the deep-dive CSV (NaN = unknown)
+        self.t2108 = t2108 if t2108 is not None else np.full(len(entry), np.nan)
+        self.momentum_ratio = momentum_ratio if momentum_ratio is not None else np.full(len(entry), np.nan)
+        self.source = source or {}
+
+        self.n_days = np.sum(~np.isnan(close), axis=1).astype(np.int8)
+        self.true_range = calculate_true_ranges(high, low, close, self.n_days)
+        self.regime = classify_regimes(vix)
+
+        # VIX rank: position of each trade in ascending VIX order, so any VIX threshold
+        # maps to a prefix of vix_order via np.searchsorted(vix_sorted, threshold)
+        self.vix_order = np.argsort(vix, kind="stable")
+        self.vix_sorted = vix[self.vix_order]
+        self.vix_rank = np.empty(len(vix), dtype=np.int64)
+        self.vix_rank[self.vix_order] = np.arange(len(vix))
+
+    def __len__(self) -> int:
+        return len(self.entry)
+
+    @classmethod
+    def from_trades(cls, trades: Sequence[Dict], source: Optional[Dict] = None) -> "PreparedTradeDataset":
+        """Build from parsed trade dicts (see parse_trade_row)"""
+        n = len(trades)
+        high = np.full((n, PRICE_DAYS), np.nan)
+        low = np.full((n, PRICE_DAYS), np.nan)
+        close = np.full((n, PRICE_DAYS), np.nan)
+        for i, trade in enumerate(trades):
+            for day, prices in enumerate(trade["daily_prices"][:PRICE_DAYS]):
+                high[i, day] = prices["high"]
+                low[i, day] = prices["low"]
+                close[i, day] = prices["close"]
+
+        return cls(
+            symbols=np.array([trade["symbol"] for trade in trades], dtype="U16"),
+            breakout_dates=np.array([trade.get("breakout_date", "") for trade in trades], dtype="U10"),
+            entry=np.array([trade["entry_price"] for trade in trades], dtype=np.float64),
+            high=high,
+            low=low,
+            close=close,
+            baseline_return=np.array([trade["move_2_day"] for trade in trades], dtype=np.float64),
+            vix=np.array([trade["vix"] for trade in trades], dtype=np.float64),
+            t2108=np.array([trade.get("t2108", np.nan) for trade in trades], dtype=np.float64),
+            momentum_ratio=np.array([trade.get("momentum_ratio", np.nan) for trade in trades], dtype=np.float64),
+            source=source
+        )
+
+    @classmethod
+    def from_csv(cls, csv_path: str, offset: int = 0) -> "PreparedTradeDataset":
+        """
+        Parse the CSV (from a byte offset) into a dataset
+
+        Rows up to the first open trade (fewer than PRICE_DAYS closes) or unparseable
+        row are settled. source["offset"] ends the settled rows and
+        source["settled_trades"] counts their trades; the rows behind it are parsed
+        again on the next refresh, so trades that close or get fixed are picked up.
+        """
+        csv_path = Path(csv_path)
+        header_line = read_header_line(csv_path)
+        trades = []
+        skipped_rows = 0
+        settled_offset = offset
+        settled_trades = 0
+        settled_skipped_rows = 0
+        pending = False
+        for end_offset, row in iter_trade_rows(csv_path, offset, header_line):
+            trade = parse_trade_row(row)
+            if trade is None:
+                skipped_rows += 1
+            else:
+                trades.append(trade)
+            pending = pending or trade is None or len(trade["daily_prices"]) < PRICE_DAYS
+            if not pending:
+                settled_offset = end_offset
+                settled_trades = len(trades)
+                settled_skipped_rows = skipped_rows
+
+        stat = csv_path.stat()
+        return cls.from_trades(trades, source={
+            "path": str(csv_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "header_hash": hashlib.sha1(header_line).hexdigest(),
+            "offset": settled_offset,
+            "prefix_hash": hash_prefix(csv_path, settled_offset),
+            "skipped_rows": skipped_rows,
+            "settled_trades": settled_trades,
+            "settled_skipped_rows": settled_skipped_rows
+        })
+
+    @classmethod
+    def load(cls, csv_path: str, cache_path: Optional[str] = None, rebuild: bool = False) -> "PreparedTradeDataset":
+        """
+        Load the cached dataset for a CSV, refreshing it if the CSV changed
+
+        Rows behind the settled part (appended rows, open trades and unparseable
+        rows) are parsed again and concatenated onto the settled trades of the cache;
+        any other change to the CSV triggers a full rebuild.
+
+        Args:
+            csv_path: Path to the deep-dive trade CSV
+            cache_path: Cache file (default: <csv>.prepared.npz)
+            rebuild: Ignore an existing cache
+
+        Returns:
+            PreparedTradeDataset
+        """
+        csv_path = Path(csv_path)
+        cache_path = Path(cache_path) if cache_path else csv_path.with_name(csv_path.name + ".prepared.npz")
+
+        cached = None
+        if not rebuild and cache_path.exists():
+            try:
+                cached = cls.load_file(str(cache_path))
+            except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile) as e:
+                logger.warning(f"Ignoring unreadable prepared dataset {cache_path}: {e}")
+
+        if cached is not None:
+            stat = csv_path.stat()
+            source = cached.source
+            if source.get("size") == stat.st_size and source.get("mtime_ns") == stat.st_mtime_ns:
+                return cached
+
+            header_hash = hashlib.sha1(read_header_line(csv_path)).hexdigest()
+            if (source.get("header_hash") == header_hash and source.get("offset", 0) <= stat.st_size
+                    and hash_prefix(csv_path, source["offset"]) == source.get("prefix_hash")):
+                appended = cls.from_csv(str(csv_path), offset=source["offset"])
+                settled = cached.head(source["settled_trades"])
+                dataset = settled.extend(appended)
+                dataset.source["skipped_rows"] += source["settled_skipped_rows"]
+                dataset.source["settled_trades"] += len(settled)
+                dataset.source["settled_skipped_rows"] += source["settled_skipped_rows"]
+                dataset.save(str(cache_path))
+                logger.info(f"Prepared dataset refreshed: {len(appended)} trades behind the "
+                            f"{len(settled)} settled ones ({len(dataset)} total)")
+                return dataset
+
+        dataset = cls.from_csv(str(csv_path))
+        dataset.save(str(cache_path))
+        logger.info(f"Prepared dataset built from {csv_path} ({len(dataset)} trades)")
+        return dataset
+
+    @classmethod
+    def load_file(cls, path: str) -> "PreparedTradeDataset":
+        """Load a saved dataset file without checking its source CSV"""
+        with np.load(path, allow_pickle=False) as data:
+            source = json.loads(str(data["source"]))
+            if source.get("version") != PREPARED_VERSION:
+                raise ValueError(f"Unsupported prepared dataset version: {source.get('version')}")
+            arrays = {name: data[name] for name in cls.ARRAY_FIELDS}
+        return cls(source=source, **arrays)
+
+    def save(self, path: str):
+        """
+        Write the dataset atomically as an uncompressed .npz
+
+        The temp file name is unique, so workers sharing a cache directory can
+        write the same cache concurrently (the last rename wins).
+        """
+        source = dict(self.source, version=PREPARED_VERSION)
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, source=np.array(json.dumps(source)),
+                         **{name: getattr(self, name) for name in self.ARRAY_FIELDS})
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+
+    def head(self, count: int) -> "PreparedTradeDataset":
+        """New dataset with the first count trades (same source info)"""
+        arrays = {name: getattr(self, name)[:count] for name in self.ARRAY_FIELDS}
+        return PreparedTradeDataset(source=dict(self.source), **arrays)
+
+    def extend(self, other: "PreparedTradeDataset") -> "PreparedTradeDataset":
+        """New dataset with the trades of other appended (source info is taken from other)"""
+        arrays = {name: np.concatenate([getattr(self, name), getattr(other, name)])
+                  for name in self.ARRAY_FIELDS}
+        return PreparedTradeDataset(source=dict(other.source), **arrays)
+
+    def vix_threshold_rank(self, thresholds) -> np.ndarray:
+        """Number of trades with VIX below each threshold"""
+        return np.searchsorted(self.vix_sorted, thresholds, side="left")
+
+    def daily_prices(self, index: int) -> List[Dict]:
+        """Daily OHLC dicts in the format of the overlay engines"""
+        return [
+            {"high": float(self.high[index, day]), "low": float(self.low[index, day]),
+             "close": float(self.close[index, day])}
+            for day in range(self.n_days[index])
+        ]
+
+    def trade(self, index: int) -> Dict:
+        """Trade dict including the precomputed true range and regime"""
+        return {
+            "symbol": str(self.symbols[index]),
+            "breakout_date": str(self.breakout_dates[index]),
+            "entry_price": float(self.entry[index]),
+            "vix": float(self.vix[index]),
+            "move_2_day": float(self.baseline_return[index]),
+            "daily_prices": self.daily_prices(index),
+            "true_range": float(self.true_range[index]),
+            "regime": REGIME_CATEGORIES[self.regime[index]]
+        }
+
+    def iter_trades(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        for index in range(start, len(self) if stop is None else stop):
+            yield self.trade(index)
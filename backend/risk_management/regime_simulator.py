@@ -0,0 +1,340 @@
+"""
+BIDBACK Trading Tool - Regime-Switching Path Simulator
+Fits a Markov regime transition matrix and per-regime daily bar distributions from
+the breadth history, then simulates long synthetic market paths in reproducible
+chunks for stress tests of the exit rules and the event-driven risk manager
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+import multiprocessing as mp
+
+import numpy as np
+
+from .prepared_dataset import PRICE_DAYS, PreparedTradeDataset
+from .synthetic_trades import REGIME_PROFILES
+
+logger = logging.getLogger(__name__)
+
+# Breadth table risk_regime labels -> overlay regimes
+BREADTH_REGIME_MAP = {
+    "low": "low_vol_complacency",
+    "medium": "bull_normal",
+    "high": "high_vol_stress",
+    "extreme": "crisis_opportunity"
+}
+
+# Columns of a bootstrap sample (one historical day)
+SAMPLE_FIELDS = ("log_return", "log_high", "log_low", "vix", "t2108", "momentum_ratio")
+
+@dataclass
+class RegimeMarkovModel:
+    """
+    Regime transition matrix plus the historical days of each regime
+
+    Days are resampled as whole rows (return, high and low relative to the previous
+    close, VIX, T2108, momentum), so the joint behaviour within a day is kept and
+    regime persistence comes from the transition matrix.
+    """
+    regimes: List[str]
+    transition_matrix: np.ndarray   # (regimes, regimes), rows sum to 1
+    initial_distribution: np.ndarray
+    samples: np.ndarray             # (days, SAMPLE_FIELDS) grouped by regime
+    offsets: np.ndarray             # samples[offsets[r]:offsets[r + 1]] belong to regime r
+    seed: int = 42
+    metadata: Dict = field(default_factory=dict)
+
+    @classmethod
+    def fit(cls, regime_labels: Sequence[str], close: np.ndarray,
+            high: Optional[np.ndarray] = None, low: Optional[np.ndarray] = None,
+            vix: Optional[np.ndarray] = None, t2108: Optional[np.ndarray] = None,
+            momentum_ratio: Optional[np.ndarray] = None,
+            regimes: Optional[Sequence[str]] = None,
+            smoothing: float = 1.0, seed: int = 42) -> "RegimeMarkovModel":
+        """
+        Fit the model from a daily series in date order
+
+        Args:
+            regime_labels: Regime per day
+            close: Daily close; high/low default to the close
+            vix, t2108, momentum_ratio: Optional context series (NaN = unknown)
+            regimes: Regime order (default: labels in order of appearance)
+            smoothing: Additive smoothing of the transition counts, so regimes that
+                were never left in the sample can still be left in simulation
+            seed: Base seed of the simulation streams
+
+        Returns:
+            RegimeMarkovModel
+        """
+        labels = np.asarray(regime_labels, dtype=object)
+        close = np.asarray(close, dtype=np.float64)
+        n = len(close)
+        if n < 2 or len(labels) != n:
+            raise ValueError("Need at least two days with one regime label per day")
+
+        high = np.asarray(high, dtype=np.float64) if high is not None else close
+        low = np.asarray(low, dtype=np.float64) if low is not None else close
+        context = [np.asarray(series, dtype=np.float64) if series is not None else np.full(n, np.nan)
+                   for series in (vix, t2108, momentum_ratio)]
+
+        regimes = list(regimes) if regimes is not None else list(dict.fromkeys(labels.tolist()))
+        lookup = {regime: code for code, regime in enumerate(regimes)}
+        codes = np.array([lookup[label] for label in labels], dtype=np.int64)
+
+        # Transition counts of consecutive days
+        counts = np.full((len(regimes), len(regimes)), float(smoothing))
+        np.add.at(counts, (codes[:-1], codes[1:]), 1.0)
+        transition_matrix = counts / counts.sum(axis=1, keepdims=True)
+
+        # Day samples relative to the previous close (the first day has no previous close)
+        previous_close = close[:-1]
+        rows = np.column_stack([
+            np.log(close[1:] / previous_close),
+            np.log(np.maximum(high[1:], close[1:]) / previous_close),
+            np.log(np.minimum(low[1:], close[1:]) / previous_close),
+            *(series[1:] for series in context)
+        ])
+        row_codes = codes[1:]
+        valid = np.all(np.isfinite(rows[:, :3]), axis=1)
+        rows, row_codes = rows[valid], row_codes[valid]
+
+        order = np.argsort(row_codes, kind="stable")
+        samples = rows[order]
+        offsets = np.searchsorted(row_codes[order], np.arange(len(regimes) + 1))
+        empty = [regimes[r] for r in range(len(regimes)) if offsets[r + 1] == offsets[r]]
+        if empty:
+            raise ValueError(f"No usable days for regimes: {empty}")
+
+        initial_distribution = np.bincount(codes, minlength=len(regimes)) / n
+        logger.info(f"Regime model fitted on {n} days: "
+                    + ", ".join(f"{regime} {offsets[r + 1] - offsets[r]}" for r, regime in enumerate(regimes)))
+
+        return cls(regimes=regimes, transition_matrix=transition_matrix,
+                   initial_distribution=initial_distribution, samples=samples, offsets=offsets,
+                   seed=seed, metadata={"days": n, "smoothing": smoothing})
+
+    @classmethod
+    def from_breadth_history(cls, db, start_date: Optional[str] = None, **kwargs) -> "RegimeMarkovModel":
+        """
+        Fit from market_breadth_daily (risk_regime, daily bars, T2108, 5-day ratio)
+
+        Missing risk_regime values carry the last known regime forward.
+
+        Args:
+            db: DatabaseConnection
+            start_date: First date to use (YYYY-MM-DD)
+        """
+        query = """
+            SELECT date, daily_high, daily_low, daily_close, t2108, ratio_5day, risk_regime
+            FROM market_breadth_daily
+            WHERE daily_close IS NOT NULL AND date >= ?
+            ORDER BY date
+        """
+        columns = db.execute_query(query, (start_date or "1900-01-01",), mode="columnar")
+        if not len(columns["date"]):
+            raise ValueError("No breadth history with daily closes")
+
+        labels = []
+        last_regime = "bull_normal"
+        for regime in columns["risk_regime"]:
+            last_regime = BREADTH_REGIME_MAP.get(regime, last_regime)
+            labels.append(last_regime)
+
+        def column(name):
+            return columns[name].astype(np.float64)
+
+        model = cls.fit(labels, column("daily_close"), high=column("daily_high"), low=column("daily_low"),
+                        t2108=column("t2108"), momentum_ratio=column("ratio_5day"), **kwargs)
+        model.metadata.update({"source": "market_breadth_daily",
+                               "start_date": str(columns["date"][0]), "end_date": str(columns["date"][-1])})
+        return model
+
+    def stationary_distribution(self) -> np.ndarray:
+        """Long-run regime frequencies of the chain"""
+        values, vectors = np.linalg.eig(self.transition_matrix.T)
+        stationary = np.real(vectors[:, np.argmin(np.abs(values - 1))])
+        return stationary / stationary.sum()
+
+    def expected_durations(self) -> Dict[str, float]:
+        """Mean days spent in a regime before switching"""
+        stay = np.diag(self.transition_matrix)
+        return {regime: float(1 / (1 - stay[r])) if stay[r] < 1 else float("inf")
+                for r, regime in enumerate(self.regimes)}
+
+    def rng(self, stream: int) -> np.random.Generator:
+        """Independent generator of one chunk (same scheme as SyntheticTradeGenerator)"""
+        return np.random.Generator(np.random.PCG64(np.random.SeedSequence(self.seed, spawn_key=(stream,))))
+
+    def simulate_chunk(self, n_paths: int, n_days: int, stream: int = 0,
+                       start_price: float = 100.0, initial_regime: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """
+        Simulate one chunk of paths
+
+        Args:
+            n_paths: Paths in this chunk
+            n_days: Trading days per path
+            stream: Random stream (chunk index)
+            start_price: Close before the first simulated day
+            initial_regime: Fixed starting regime (default: drawn from the fitted frequencies)
+
+        Returns:
+            Dict of (paths, days) arrays: regime (code into regimes), close, high, low,
+            true_range, vix, t2108, momentum_ratio
+        """
+        rng = self.rng(stream)
+        n_regimes = len(self.regimes)
+
+        # Regime chain - one vectorized step over all paths per day
+        regime = np.empty((n_paths, n_days), dtype=np.int8)
+        if initial_regime is not None:
+            state = np.full(n_paths, self.regimes.index(initial_regime), dtype=np.int64)
+        else:
+            state = np.searchsorted(np.cumsum(self.initial_distribution), rng.random(n_paths), side="right")
+        cumulative = np.cumsum(self.transition_matrix, axis=1)
+        cumulative[:, -1] = 1.0
+        state = np.minimum(state, n_regimes - 1)
+        regime[:, 0] = state
+        draws = rng.random((n_paths, n_days))
+        for day in range(1, n_days):
+            state = (draws[:, day, None] > cumulative[state]).sum(axis=1)
+            regime[:, day] = state
+
+        # Bootstrap one historical day of the active regime per simulated day
+        sizes = np.diff(self.offsets)
+        codes = regime.astype(np.int64)
+        index = self.offsets[codes] + (rng.random((n_paths, n_days)) * sizes[codes]).astype(np.int64)
+        days = self.samples[index]
+
+        log_close = np.log(start_price) + np.cumsum(days[..., 0], axis=1)
+        close = np.exp(log_close)
+        previous_close = np.exp(np.concatenate([np.full((n_paths, 1), np.log(start_price)), log_close[:, :-1]], axis=1))
+        high = previous_close * np.exp(days[..., 1])
+        low = previous_close * np.exp(days[..., 2])
+        true_range = np.maximum.reduce([high - low, np.abs(high - previous_close), np.abs(low - previous_close)])
+
+        vix = days[..., 3]
+        missing = np.isnan(vix)
+        if missing.any():
+            vix = vix.copy()
+            vix[missing] = self._profile_vix(codes[missing], rng)
+
+        return {
+            "regime": regime,
+            "close": close,
+            "high": high,
+            "low": low,
+            "true_range": true_range,
+            "vix": vix,
+            "t2108": days[..., 4],
+            "momentum_ratio": days[..., 5]
+        }
+
+    def _profile_vix(self, codes: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """VIX for days without a VIX history, drawn from the synthetic regime profiles"""
+        profiles = [REGIME_PROFILES.get(regime, REGIME_PROFILES["bull_normal"]) for regime in self.regimes]
+        vix_low = np.array([profile["vix_range"][0] for profile in profiles])[codes]
+        vix_high = np.array([profile["vix_range"][1] for profile in profiles])[codes]
+        vix_tail = np.array([profile["vix_tail"] for profile in profiles])[codes]
+        uniform = vix_low + rng.random(len(codes)) * (vix_high - vix_low)
+        return np.where(vix_tail > 0, vix_low + rng.exponential(1.0, len(codes)) * vix_tail, uniform)
+
+    def simulate(self, n_paths: int, n_days: int, chunk_size: int = 1000,
+                 max_workers: Optional[int] = None, **kwargs) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Simulate paths in chunks, optionally in worker processes
+
+        Chunk i always uses stream i, so results do not depend on max_workers.
+
+        Yields:
+            Chunk dicts of simulate_chunk in chunk order
+        """
+        chunks = [(min(chunk_size, n_paths - start), stream)
+                  for stream, start in enumerate(range(0, n_paths, chunk_size))]
+        if not max_workers or max_workers <= 1 or len(chunks) == 1:
+            for size, stream in chunks:
+                yield self.simulate_chunk(size, n_days, stream, **kwargs)
+            return
+
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp.get_context("spawn")) as executor:
+            futures = [executor.submit(_simulate_chunk, self, size, n_days, stream, kwargs)
+                       for size, stream in chunks]
+            for future in futures:
+                yield future.result()
+
+def _simulate_chunk(model: RegimeMarkovModel, n_paths: int, n_days: int, stream: int, kwargs: Dict):
+    """Process pool entry point"""
+    return model.simulate_chunk(n_paths, n_days, stream, **kwargs)
+
+def trades_from_paths(paths: Dict[str, np.ndarray], regimes: Sequence[str], entry_interval: int = 5,
+                      start_date: str = "2010-01-04") -> PreparedTradeDataset:
+    """
+    Cut simulated paths into trades for the exit kernel and parameter sweeps
+
+    A trade is entered at the close every entry_interval days and gets the next
+    PRICE_DAYS bars; the baseline exit is the day-2 close like the deep-dive data.
+    """
+    n_paths, n_days = paths["close"].shape
+    entry_days = np.arange(0, n_days - PRICE_DAYS, entry_interval)
+    path_index = np.repeat(np.arange(n_paths), len(entry_days))
+    day_index = np.tile(entry_days, n_paths)
+    window = day_index[:, None] + 1 + np.arange(PRICE_DAYS)
+
+    entry = paths["close"][path_index, day_index]
+    close = paths["close"][path_index[:, None], window]
+    dates = np.busday_offset(np.datetime64(start_date, "D"), day_index, roll="forward")
+
+    dataset = PreparedTradeDataset(
+        symbols=np.char.add("SIM", np.char.zfill(path_index.astype("U8"), 6)).astype("U16"),
+        breakout_dates=np.datetime_as_string(dates, unit="D").astype("U10"),
+        entry=entry,
+        high=paths["high"][path_index[:, None], window],
+        low=paths["low"][path_index[:, None], window],
+        close=close,
+        baseline_return=close[:, 1] / entry - 1,
+        vix=paths["vix"][path_index, day_index],
+        t2108=paths["t2108"][path_index, day_index],
+        momentum_ratio=paths["momentum_ratio"][path_index, day_index],
+        source={"simulated": True, "regimes": list(regimes), "entry_interval": entry_interval}
+    )
+    return dataset
+
+def replay_path(paths: Dict[str, np.ndarray], path: int = 0, risk_manager=None,
+                entry_interval: int = 5) -> Dict:
+    """
+    Feed one simulated path day by day through UltimateRiskManager
+
+    A position is opened at the close every entry_interval days; open positions
+    (and open shadow positions) get every following bar through update_position.
+
+    Returns:
+        Portfolio performance of the risk manager
+    """
+    if risk_manager is None:
+        from .ultimate_implementation import UltimateRiskManager
+        risk_manager = UltimateRiskManager()
+
+    def market_data(day: int) -> Dict:
+        data = {"vix": float(paths["vix"][path, day]), "true_range": float(paths["true_range"][path, day])}
+        for name in ("t2108", "momentum_ratio"):
+            value = paths[name][path, day]
+            if np.isfinite(value):
+                data[name] = float(value)
+        return data
+
+    n_days = paths["close"].shape[1]
+    for day in range(n_days):
+        bar = {"high": float(paths["high"][path, day]), "low": float(paths["low"][path, day]),
+               "close": float(paths["close"][path, day])}
+        symbols = list(risk_manager.active_positions)
+        if risk_manager.shadow_book is not None:
+            symbols += [symbol for symbol in dict.fromkeys(risk_manager.shadow_book.symbols)
+                        if symbol not in risk_manager.active_positions]
+        for symbol in symbols:
+            risk_manager.update_position(symbol, bar, market_data(day))
+
+        if day % entry_interval == 0 and day < n_days - 1:
+            risk_manager.open_position(f"SIM{path:06d}_{day:05d}", bar["close"], market_data(day))
+
+    return risk_manager.get_portfolio_performance()
@@ -0,0 +1,267 @@
+"""
+BIDBACK Trading Tool - Rule Specification
+Declarative regime rules (classification, stops, profit targets, position scaling,
+transition adjustments, time exits) compiled into one set of array tables and
+kernels used by the live risk manager, shadow strategies and backtests alike
+"""
+
+import copy
+import json
+import logging
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .columnar_store import REGIME_CATEGORIES
+from .exit_kernel import compute_exit_levels, regime_tables, run_exit_kernel, transition_adjustments
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RegimeRule:
+    """Rules of one market regime (percent values as in regime_configurations)"""
+    vix_range: Tuple[float, float]
+    stop_loss_pct: float
+    tr_stop_multiplier: float
+    profit_levels: List[float]
+    tr_profit_multipliers: List[float]
+    position_scaling: List[float]      # Cumulative % closed at each profit level
+    max_hold_days: Optional[int] = None  # None = RuleSpec.max_hold_days
+    max_hold_override: Optional[int] = None  # Expected hold reported at entry
+    description: str = ""
+
+@dataclass
+class RuleSpec:
+    """
+    Complete declarative rule set
+
+    Regimes are classified in the order given (first matching VIX range wins,
+    default_regime otherwise). Serializes to plain JSON, so a rule set can live in
+    config.json under "rule_spec".
+    """
+    regimes: Dict[str, RegimeRule]
+    transition_thresholds: Dict[str, float]
+    emergency_rules: Dict[str, Dict]
+    default_regime: str = "bull_normal"
+    stop_bounds: Tuple[float, float] = (-25.0, -2.0)  # Widest and tightest stop in %
+    max_hold_days: int = 5                            # Time exit (0 = none)
+
+    @classmethod
+    def from_regime_configurations(cls, regime_configurations: Dict,
+                                   transition_thresholds: Optional[Dict] = None,
+                                   emergency_rules: Optional[Dict] = None, **kwargs) -> "RuleSpec":
+        """Spec from IntegratedRiskOverlay-style regime configurations"""
+        if transition_thresholds is None or emergency_rules is None:
+            from .dynamic_regime_system import DynamicRegimeManager
+            manager = DynamicRegimeManager()
+            transition_thresholds = transition_thresholds or manager.transition_thresholds
+            emergency_rules = emergency_rules or manager.emergency_rules
+
+        regimes = {}
+        for regime, config in regime_configurations.items():
+            regimes[regime] = RegimeRule(
+                vix_range=tuple(config["vix_range"]),
+                stop_loss_pct=config["stop_loss_pct"],
+                tr_stop_multiplier=config["tr_stop_multiplier"],
+                profit_levels=list(config["profit_levels"]),
+                tr_profit_multipliers=list(config["tr_profit_multipliers"]),
+                position_scaling=list(config["position_scaling"]),
+                max_hold_days=config.get("max_hold_days"),
+                max_hold_override=config.get("max_hold_override"),
+                description=config.get("description", "")
+            )
+        return cls(regimes=regimes, transition_thresholds=dict(transition_thresholds),
+                   emergency_rules=copy.deepcopy(emergency_rules), **kwargs)
+
+    @classmethod
+    def default(cls, risk_limits: Optional[Dict] = None) -> "RuleSpec":
+        """
+        Current system rules: IntegratedRiskOverlay regimes, DynamicRegimeManager
+        thresholds, stop bounds from the risk_limits config section
+        """
+        from .integrated_overlay_system import IntegratedRiskOverlay
+        kwargs = {}
+        if risk_limits:
+            kwargs["stop_bounds"] = (-risk_limits.get("max_stop_distance", 25.0),
+                                     -risk_limits.get("min_stop_distance", 2.0))
+        return cls.from_regime_configurations(IntegratedRiskOverlay().regime_configurations, **kwargs)
+
+    @classmethod
+    def from_dict(cls, spec: Dict) -> "RuleSpec":
+        """Spec from its JSON form (to_dict); a null VIX upper bound means unbounded"""
+        spec = copy.deepcopy(spec)
+        regimes = {}
+        for regime, rule in spec.pop("regimes").items():
+            low, high = rule.pop("vix_range")
+            regimes[regime] = RegimeRule(vix_range=(low, float("inf") if high is None else high), **rule)
+        if "stop_bounds" in spec:
+            spec["stop_bounds"] = tuple(spec["stop_bounds"])
+        return cls(regimes=regimes, **spec)
+
+    @classmethod
+    def load(cls, path: str) -> "RuleSpec":
+        with open(path, "r") as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self) -> Dict:
+        """JSON form of the spec"""
+        spec = asdict(self)
+        for rule in spec["regimes"].values():
+            low, high = rule["vix_range"]
+            rule["vix_range"] = [low, None if np.isinf(high) else high]
+        spec["stop_bounds"] = list(self.stop_bounds)
+        return spec
+
+    def to_regime_configurations(self) -> Dict:
+        """Regime configurations for code that takes the overlay format (sweeps, sensitivity)"""
+        configurations = {}
+        for regime, rule in self.regimes.items():
+            configurations[regime] = {
+                "vix_range": tuple(rule.vix_range),
+                "stop_loss_pct": rule.stop_loss_pct,
+                "profit_levels": list(rule.profit_levels),
+                "position_scaling": list(rule.position_scaling),
+                "tr_stop_multiplier": rule.tr_stop_multiplier,
+                "tr_profit_multipliers": list(rule.tr_profit_multipliers),
+                "max_hold_override": rule.max_hold_override,
+                "description": rule.description
+            }
+        return configurations
+
+    def validate(self):
+        """Raise ValueError for rule sets the kernels cannot represent"""
+        unknown = [regime for regime in self.regimes if regime not in REGIME_CATEGORIES]
+        if unknown:
+            raise ValueError(f"Unknown regimes: {unknown} (known: {list(REGIME_CATEGORIES)})")
+        if self.default_regime not in self.regimes:
+            raise ValueError(f"Default regime {self.default_regime} has no rules")
+        widest, tightest = self.stop_bounds
+        if not widest <= tightest <= 0:
+            raise ValueError(f"Stop bounds must satisfy widest <= tightest <= 0, got {self.stop_bounds}")
+        for regime, rule in self.regimes.items():
+            if rule.vix_range[0] >= rule.vix_range[1]:
+                raise ValueError(f"{regime}: empty VIX range {rule.vix_range}")
+            levels = len(rule.profit_levels)
+            if len(rule.tr_profit_multipliers) != levels or len(rule.position_scaling) < levels:
+                raise ValueError(f"{regime}: profit_levels, tr_profit_multipliers and position_scaling "
+                                 f"need one entry per level")
+            scaling = rule.position_scaling[:levels]
+            if any(b < a for a, b in zip([0] + scaling, scaling)) or (scaling and scaling[-1] > 100):
+                raise ValueError(f"{regime}: position_scaling must be cumulative and end at most at 100")
+            if rule.max_hold_days is not None and rule.max_hold_days < 0:
+                raise ValueError(f"{regime}: max_hold_days must be >= 0")
+
+    def compile(self) -> "CompiledRules":
+        self.validate()
+        return CompiledRules(self)
+
+class CompiledRules:
+    """
+    Array form of a RuleSpec
+
+    All methods take arrays (one entry per trade); the live manager calls them
+    with single-element arrays, backtests with whole datasets.
+    """
+
+    def __init__(self, spec: RuleSpec):
+        self.spec = spec
+        self.regime_configurations = spec.to_regime_configurations()
+        self.tables = regime_tables(self.regime_configurations)
+        self.default_code = REGIME_CATEGORIES.index(spec.default_regime)
+
+        self._vix_bounds = [(REGIME_CATEGORIES.index(regime), *map(float, rule.vix_range))
+                            for regime, rule in spec.regimes.items()]
+        self.max_hold_days = np.full(len(REGIME_CATEGORIES), spec.max_hold_days, dtype=np.int64)
+        for regime, rule in spec.regimes.items():
+            if rule.max_hold_days is not None:
+                self.max_hold_days[REGIME_CATEGORIES.index(regime)] = rule.max_hold_days
+        # Codes without rules (unknown) use the default regime like regime_tables
+        for code, regime in enumerate(REGIME_CATEGORIES):
+            if regime not in spec.regimes:
+                self.max_hold_days[code] = self.max_hold_days[self.default_code]
+
+    def classify(self, vix: np.ndarray) -> np.ndarray:
+        """Regime codes (REGIME_CATEGORIES) per VIX value"""
+        vix = np.asarray(vix, dtype=np.float64)
+        codes = np.full(vix.shape, self.default_code, dtype=np.int8)
+        assigned = np.zeros(vix.shape, dtype=bool)
+        for code, vix_min, vix_max in self._vix_bounds:
+            mask = ~assigned & (vix >= vix_min) & (vix < vix_max)
+            codes[mask] = code
+            assigned |= mask
+        return codes
+
+    def regime_name(self, code: int) -> str:
+        return REGIME_CATEGORIES[code]
+
+    def entry_adjustments(self, vix: np.ndarray, t2108: Optional[np.ndarray] = None,
+                          momentum_ratio: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Stop and profit adjustments of consecutive entries as open_position applies
+        them (the stop multiplier counts twice, see transition_adjustments)
+        """
+        adjustments = transition_adjustments(vix, t2108, momentum_ratio,
+                                             self.spec.transition_thresholds, self.spec.emergency_rules)
+        return adjustments["stop_multiplier"] ** 2, adjustments["profit_multiplier"]
+
+    def entry_levels(self, entry: np.ndarray, true_range: np.ndarray, regime: np.ndarray,
+                     stop_adjustment=1.0, profit_adjustment=1.0, volatility_factor=1.0) -> Dict[str, np.ndarray]:
+        """
+        Stop, profit targets, close percentages and hold limit per trade
+
+        Returns:
+            Dict with stop (trades,), profit_levels and close_pct (trades, levels),
+            max_hold_days (trades,)
+        """
+        regime = np.asarray(regime, dtype=np.int64)
+        levels = compute_exit_levels(entry, true_range, regime, self.regime_configurations,
+                                     stop_adjustment=stop_adjustment, profit_adjustment=profit_adjustment,
+                                     volatility_factor=volatility_factor, tables=self.tables,
+                                     stop_bounds=self.spec.stop_bounds)
+        levels["max_hold_days"] = self.max_hold_days[regime]
+        return levels
+
+    def run(self, dataset, apply_transitions: bool = True, stop_adjustment=1.0, profit_adjustment=1.0,
+            volatility_factor=1.0, ordering="stop_first", max_levels_per_day: int = 0,
+            chunk_size: int = 100000) -> Dict[str, np.ndarray]:
+        """
+        Backtest a PreparedTradeDataset (trades in entry order) with these rules
+
+        Args:
+            apply_transitions: Apply the entry adjustments of consecutive entries
+            stop_adjustment, profit_adjustment, volatility_factor: Extra adjustments
+            chunk_size: Trades per exit kernel call
+
+        Returns:
+            run_exit_kernel outputs for all trades plus regime and max_hold_days
+        """
+        n_trades = len(dataset)
+        regime = self.classify(dataset.vix)
+        stop_scale = np.broadcast_to(np.asarray(stop_adjustment, dtype=np.float64), n_trades)
+        profit_scale = np.broadcast_to(np.asarray(profit_adjustment, dtype=np.float64), n_trades)
+        if apply_transitions:
+            stop_multiplier, profit_multiplier = self.entry_adjustments(dataset.vix, dataset.t2108,
+                                                                        dataset.momentum_ratio)
+            stop_scale = stop_scale * stop_multiplier
+            profit_scale = profit_scale * profit_multiplier
+
+        outputs: Dict[str, List[np.ndarray]] = {}
+        hold_limits = []
+        for start in range(0, n_trades, chunk_size):
+            chunk = slice(start, min(start + chunk_size, n_trades))
+            levels = self.entry_levels(dataset.entry[chunk], dataset.true_range[chunk], regime[chunk],
+                                       stop_scale[chunk], profit_scale[chunk], volatility_factor)
+            outcome = run_exit_kernel(dataset.entry[chunk], levels["stop"], levels["profit_levels"],
+                                      levels["close_pct"], dataset.high[chunk], dataset.low[chunk],
+                                      dataset.close[chunk], ordering=ordering,
+                                      max_levels_per_day=max_levels_per_day,
+                                      max_hold_days=levels["max_hold_days"])
+            for name, values in outcome.items():
+                outputs.setdefault(name, []).append(values)
+            hold_limits.append(levels["max_hold_days"])
+
+        result = {name: np.concatenate(values) for name, values in outputs.items()}
+        result["regime"] = regime
+        result["max_hold_days"] = np.concatenate(hold_limits) if hold_limits else np.zeros(0, dtype=np.int64)
+        return result
@@ -0,0 +1,236 @@
+"""
+BIDBACK Trading Tool - Parameter Sensitivity
+Finite-difference sensitivity of return and drawdown to every numeric parameter of
+the regime configurations and the DynamicRegimeManager transition thresholds; all
+perturbed rule sets are evaluated together in one chunked exit kernel pass
+"""
+
+import copy
+import logging
+import math
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .parameter_sweep import ParameterSweep, PruningRules
+from .prepared_dataset import PreparedTradeDataset
+
+logger = logging.getLogger(__name__)
+
+# Metrics reported per perturbation
+SENSITIVITY_METRICS = ("total_return", "max_drawdown", "win_rate", "sharpe_ratio")
+
+class SensitivityAnalysis:
+    """
+    ± perturbation of each rule parameter around a base rule set
+
+    Every parameter is moved by relative_step in both directions (absolute_step for
+    parameters that are zero); infinite VIX bounds and the final position_scaling
+    level (always 100%) are not perturbed. Entries use the transition adjustments
+    of open_position, so the transition thresholds take effect.
+    """
+
+    def __init__(self, dataset: PreparedTradeDataset,
+                 regime_configurations: Optional[Dict] = None,
+                 transition_thresholds: Optional[Dict] = None,
+                 relative_step: float = 0.1,
+                 absolute_step: float = 1.0,
+                 chunk_size: int = 5000,
+                 ordering: str = "stop_first",
+                 max_levels_per_day: int = 0,
+                 max_hold_days: int = 5):
+        """
+        Args:
+            dataset: Trades in chronological order
+            regime_configurations: Base regime rules (default: IntegratedRiskOverlay)
+            transition_thresholds: Base thresholds (default: DynamicRegimeManager)
+            relative_step: Perturbation as a fraction of the parameter value
+            absolute_step: Perturbation of parameters whose value is zero
+            chunk_size: Trades per exit kernel call (all rule sets share each call)
+            ordering, max_levels_per_day, max_hold_days: Exit kernel semantics
+        """
+        if regime_configurations is None:
+            from .integrated_overlay_system import IntegratedRiskOverlay
+            regime_configurations = IntegratedRiskOverlay().regime_configurations
+        if transition_thresholds is None:
+            from .dynamic_regime_system import DynamicRegimeManager
+            transition_thresholds = DynamicRegimeManager().transition_thresholds
+
+        self.dataset = dataset
+        self.regime_configurations = regime_configurations
+        self.transition_thresholds = dict(transition_thresholds)
+        self.relative_step = relative_step
+        self.absolute_step = absolute_step
+        self.chunk_size = chunk_size
+        self.ordering = ordering
+        self.max_levels_per_day = max_levels_per_day
+        self.max_hold_days = max_hold_days
+
+    def _step(self, value: float) -> float:
+        return abs(value) * self.relative_step if value else self.absolute_step
+
+    def perturbations(self) -> List[Dict]:
+        """
+        One entry per perturbed parameter
+
+        Returns:
+            Dicts with parameter (dotted name), group, base_value and the minus/plus
+            configurations (ParameterSweep configuration dicts)
+        """
+        perturbations = []
+
+        def add(parameter: str, group: str, base_value: float, minus_value: float, plus_value: float, apply):
+            configurations = []
+            for value in (minus_value, plus_value):
+                regimes = copy.deepcopy(self.regime_configurations)
+                thresholds = dict(self.transition_thresholds)
+                apply(regimes, thresholds, value)
+                configurations.append({"regime_configurations": regimes, "transition_thresholds": thresholds})
+            perturbations.append({
+                "parameter": parameter,
+                "group": group,
+                "base_value": base_value,
+                "minus_value": minus_value,
+                "plus_value": plus_value,
+                "configurations": configurations
+            })
+
+        for regime, config in self.regime_configurations.items():
+            for key, value in config.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float, list, tuple)):
+                    continue
+                values = list(value) if isinstance(value, (list, tuple)) else [value]
+                for index, entry in enumerate(values):
+                    if not isinstance(entry, (int, float)) or math.isinf(entry):
+                        continue
+                    if key == "vix_range" and entry == 0:
+                        continue  # VIX is never below zero
+                    if key == "position_scaling" and index == len(values) - 1:
+                        continue  # Final level closes the position
+                    step = self._step(entry)
+                    minus_value, plus_value = entry - step, entry + step
+                    if key == "position_scaling":
+                        lower = values[index - 1] if index else 0
+                        minus_value = max(minus_value, lower)
+                        plus_value = min(plus_value, values[index + 1])
+
+                    def apply(regimes, thresholds, new_value, regime=regime, key=key, index=index):
+                        current = regimes[regime][key]
+                        if isinstance(current, (list, tuple)):
+                            updated = list(current)
+                            updated[index] = new_value
+                            regimes[regime][key] = type(current)(updated)
+                        else:
+                            regimes[regime][key] = new_value
+
+                    name = f"{regime}.{key}" + (f"[{index}]" if isinstance(value, (list, tuple)) else "")
+                    add(name, "regime_configurations", entry, minus_value, plus_value, apply)
+
+        for key, value in self.transition_thresholds.items():
+            step = self._step(value)
+
+            def apply(regimes, thresholds, new_value, key=key):
+                thresholds[key] = new_value
+
+            add(key, "transition_thresholds", value, value - step, value + step, apply)
+
+        return perturbations
+
+    def run(self, risk_free_rate: float = 0.02) -> Dict:
+        """
+        Evaluate the base rule set and all perturbations in one pass
+
+        Returns:
+            Dict with baseline metrics and one entry per parameter, ranked by the
+            larger of the return and drawdown responses
+        """
+        started = datetime.now()
+        perturbations = self.perturbations()
+        configurations = [{"regime_configurations": self.regime_configurations,
+                           "transition_thresholds": self.transition_thresholds}]
+        for perturbation in perturbations:
+            configurations.extend(perturbation["configurations"])
+
+        sweep = ParameterSweep(
+            self.dataset, configurations, regime_configurations=self.regime_configurations,
+            pruning=PruningRules(max_drawdown_tolerance=None, min_win_rate=None),
+            chunk_size=self.chunk_size, ordering=self.ordering,
+            max_levels_per_day=self.max_levels_per_day, max_hold_days=self.max_hold_days
+        )
+        results = sweep.run(risk_free_rate=risk_free_rate)["results"]
+        baseline = {metric: results[0][metric] for metric in SENSITIVITY_METRICS}
+
+        parameters = []
+        for index, perturbation in enumerate(perturbations):
+            minus, plus = results[1 + 2 * index], results[2 + 2 * index]
+            width = perturbation["plus_value"] - perturbation["minus_value"]
+            entry = {key: perturbation[key] for key in ("parameter", "group", "base_value", "minus_value", "plus_value")}
+            for metric in SENSITIVITY_METRICS:
+                entry[f"{metric}_minus"] = minus[metric]
+                entry[f"{metric}_plus"] = plus[metric]
+            for metric in ("total_return", "max_drawdown"):
+                slope = (plus[metric] - minus[metric]) / width if width else 0.0
+                entry[f"{metric}_slope"] = slope
+                # Elasticity: % metric change per % parameter change
+                entry[f"{metric}_elasticity"] = slope * perturbation["base_value"] / baseline[metric] \
+                    if baseline[metric] else None
+            entry["return_response"] = max(abs(minus["total_return"] - baseline["total_return"]),
+                                           abs(plus["total_return"] - baseline["total_return"]))
+            entry["drawdown_response"] = max(abs(minus["max_drawdown"] - baseline["max_drawdown"]),
+                                             abs(plus["max_drawdown"] - baseline["max_drawdown"]))
+            parameters.append(entry)
+
+        parameters.sort(key=lambda entry: (entry["return_response"], entry["drawdown_response"]), reverse=True)
+        elapsed = (datetime.now() - started).total_seconds()
+        logger.info(f"Sensitivity: {len(parameters)} parameters, {len(configurations)} rule sets "
+                    f"over {len(self.dataset)} trades in {elapsed:.3f}s")
+
+        return {
+            "baseline": baseline,
+            "relative_step": self.relative_step,
+            "parameters": parameters,
+            "configurations": len(configurations),
+            "total_trades": len(self.dataset),
+            "elapsed_seconds": elapsed
+        }
+
+def main():
+    """Command line entry point: print the ranked sensitivity table"""
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="BIDBACK rule parameter sensitivity")
+    parser.add_argument("--csv", help="Deep-dive trade CSV")
+    parser.add_argument("--synthetic-trades", type=int, help="Use a synthetic dataset of this size")
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic dataset seed")
+    parser.add_argument("--step", type=float, default=0.1, help="Relative perturbation")
+    parser.add_argument("--top", type=int, default=20, help="Parameters to print")
+    parser.add_argument("--output", help="Write the full report as JSON")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.csv:
+        dataset = PreparedTradeDataset.load(args.csv)
+    elif args.synthetic_trades:
+        from .synthetic_trades import SyntheticTradeGenerator
+        dataset = SyntheticTradeGenerator(seed=args.seed).generate(args.synthetic_trades)
+    else:
+        parser.error("Need --csv or --synthetic-trades")
+
+    report = SensitivityAnalysis(dataset, relative_step=args.step).run()
+    baseline = report["baseline"]
+    print(f"Baseline: return {baseline['total_return']:.4f}, max drawdown {baseline['max_drawdown']:.4f} "
+          f"({report['total_trades']} trades, {report['configurations']} rule sets)")
+    print(f"{'parameter':<48}{'base':>10}{'return -':>12}{'return +':>12}{'dd -':>10}{'dd +':>10}")
+    for entry in report["parameters"][:args.top]:
+        print(f"{entry['parameter']:<48}{entry['base_value']:>10.2f}"
+              f"{entry['total_return_minus'] - baseline['total_return']:>12.4f}"
+              f"{entry['total_return_plus'] - baseline['total_return']:>12.4f}"
+              f"{entry['max_drawdown_minus'] - baseline['max_drawdown']:>10.4f}"
+              f"{entry['max_drawdown_plus'] - baseline['max_drawdown']:>10.4f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+if __name__ == "__main__":
+    main()
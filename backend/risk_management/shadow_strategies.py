@@ -0,0 +1,276 @@
+"""
+BIDBACK Trading Tool - Shadow Strategies
+Tracks alternative rule sets next to the live UltimateRiskManager rules without
+placing orders. Market state is evaluated once by the live manager, and all shadow
+positions of all strategies advance together through the batched exit state machine
+"""
+
+import logging
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .columnar_store import REGIME_CATEGORIES
+from .exit_kernel import EXIT_REASONS, ExitState, compute_exit_levels, regime_tables, step_day
+from .prepared_dataset import classify_regimes
+from .ultimate_implementation import calculate_portfolio_metrics
+from .vix_sweep import thresholds_to_regime_configurations
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ShadowStrategy:
+    """
+    Rule set tracked in shadow mode
+
+    Without stops or profit targets the position is held until max_hold_days, so
+    the defaults mirror the backtest layers: the original system exits at the
+    day-2 close, the live rules time out after 5 days.
+    """
+    name: str
+    use_stops: bool = True
+    use_profit_targets: bool = True
+    max_hold_days: int = 5
+    stop_adjustment: float = 1.0
+    profit_adjustment: float = 1.0
+    volatility_factor: float = 1.0
+    vix_thresholds: Optional[Tuple[float, float, float, float]] = None
+    regime_configurations: Optional[Dict] = None
+
+    @classmethod
+    def from_configuration(cls, name: str, configuration: Dict, max_hold_days: int = 5) -> "ShadowStrategy":
+        """Strategy from a ParameterSweep configuration (e.g. a sweep frontier result)"""
+        vix_thresholds = configuration.get("vix_thresholds")
+        return cls(
+            name=name,
+            max_hold_days=max_hold_days,
+            stop_adjustment=configuration.get("stop_adjustment", 1.0),
+            profit_adjustment=configuration.get("profit_adjustment", 1.0),
+            volatility_factor=configuration.get("volatility_factor", 1.0),
+            vix_thresholds=tuple(vix_thresholds) if vix_thresholds is not None else None,
+            regime_configurations=configuration.get("regime_configurations")
+        )
+
+def default_shadow_strategies() -> List[ShadowStrategy]:
+    """Original system and the single-component layers of the multilayer backtest"""
+    return [
+        ShadowStrategy("baseline", use_stops=False, use_profit_targets=False, max_hold_days=2),
+        ShadowStrategy("stop_only", use_profit_targets=False, max_hold_days=2),
+        ShadowStrategy("profit_only", use_stops=False, max_hold_days=2)
+    ]
+
+class ShadowBook:
+    """
+    Shadow positions of all strategies as one batched ExitState
+
+    Each live entry adds one row per strategy. A price update advances the rows of
+    that symbol with a single step_day call (other rows get a NaN bar and are left
+    untouched); closed rows are recorded per strategy and dropped.
+    """
+
+    def __init__(self, strategies: Optional[Sequence[ShadowStrategy]] = None, rules=None):
+        """
+        Args:
+            strategies: Rule sets to track (default: default_shadow_strategies)
+            rules: CompiledRules of the live manager, used by strategies without
+                own regime rules (default: RuleSpec.default())
+        """
+        if rules is None:
+            from .rule_spec import RuleSpec
+            rules = RuleSpec.default().compile()
+        self.rules = rules
+        self.strategies: List[ShadowStrategy] = []
+        self.state: Optional[ExitState] = None
+        self.symbols = np.array([], dtype=object)
+        self.strategy_index = np.array([], dtype=np.int64)
+        self.hold_limits = np.array([], dtype=np.int64)
+        self.entry_dates: List[str] = []
+        self.returns: Dict[str, List[float]] = {}
+        self.trade_history: Dict[str, List[Dict]] = {}
+        self.bars = 0
+        self.n_levels = 0
+
+        for strategy in (strategies if strategies is not None else default_shadow_strategies()):
+            self.add_strategy(strategy)
+
+    def add_strategy(self, strategy: ShadowStrategy):
+        """Track another rule set from the next entry on"""
+        if strategy.name in self.returns:
+            raise ValueError(f"Shadow strategy {strategy.name} already exists")
+        if strategy.vix_thresholds is not None and len(strategy.vix_thresholds) != 4:
+            raise ValueError(f"Shadow strategy {strategy.name} needs 4 VIX thresholds")
+        self.strategies.append(strategy)
+        self.returns[strategy.name] = []
+        self.trade_history[strategy.name] = []
+        self._prepare()
+
+    def _prepare(self):
+        """Per-strategy arrays and regime rule groups used at every entry"""
+        groups: Dict[int, Tuple[Optional[Dict], List[int]]] = {}
+        for index, strategy in enumerate(self.strategies):
+            configurations = self._configurations(strategy)
+            groups.setdefault(id(configurations), (configurations, []))[1].append(index)
+        self._groups = [(configurations,
+                         self.rules.tables if configurations is None else regime_tables(configurations),
+                         np.array(members))
+                        for configurations, members in groups.values()]
+
+        n_levels = max(len(config["profit_levels"])
+                       for configurations, _, _ in self._groups
+                       for config in (configurations or self.rules.regime_configurations).values())
+        if self.state is not None and n_levels > self.n_levels:
+            extra = n_levels - self.n_levels
+            self.state.profit_levels = np.pad(self.state.profit_levels, ((0, 0), (0, extra)), constant_values=np.inf)
+            for name in ("close_pct", "level_pnl", "levels_hit"):
+                setattr(self.state, name, np.pad(getattr(self.state, name), ((0, 0), (0, extra))))
+        self.n_levels = max(n_levels, self.n_levels)
+
+        self._stop_adjustment = np.array([s.stop_adjustment for s in self.strategies], dtype=np.float64)
+        self._profit_adjustment = np.array([s.profit_adjustment for s in self.strategies], dtype=np.float64)
+        self._volatility_factor = np.array([s.volatility_factor for s in self.strategies], dtype=np.float64)
+        self._use_stops = np.array([s.use_stops for s in self.strategies], dtype=bool)
+        self._use_profit_targets = np.array([s.use_profit_targets for s in self.strategies], dtype=bool)
+        self._hold_limits = np.array([s.max_hold_days for s in self.strategies], dtype=np.int64)
+
+    def is_open(self, symbol: str) -> bool:
+        return bool(np.any(self.symbols == symbol))
+
+    def _configurations(self, strategy: ShadowStrategy) -> Optional[Dict]:
+        """Regime rules of a strategy (None = live rules and live regime)"""
+        configurations = strategy.regime_configurations
+        if strategy.vix_thresholds is not None:
+            if configurations is None:
+                configurations = self.rules.regime_configurations
+            configurations = thresholds_to_regime_configurations(strategy.vix_thresholds, configurations)
+        return configurations
+
+    def open(self, symbol: str, entry_price: float, true_range: float, vix: float, regime: str,
+             stop_adjustment: float = 1.0, profit_adjustment: float = 1.0, volatility_factor: float = 1.0):
+        """
+        Add shadow positions of every strategy for a live entry
+
+        Strategies sharing regime rules get their levels from one compute_exit_levels
+        call with per-strategy adjustment arrays.
+
+        Args:
+            regime: Regime the live manager classified
+            stop_adjustment, profit_adjustment, volatility_factor: Market-state
+                adjustments the live manager applied to this entry
+        """
+        n = len(self.strategies)
+        if not n:
+            return
+
+        stop = np.empty(n)
+        profit_levels = np.full((n, self.n_levels), np.inf)
+        close_pct = np.zeros((n, self.n_levels))
+        for configurations, tables, members in self._groups:
+            if configurations is None:
+                codes = np.full(len(members), REGIME_CATEGORIES.index(regime), dtype=np.int8)
+            else:
+                codes = np.repeat(classify_regimes(np.array([vix], dtype=np.float64), configurations), len(members))
+            levels = compute_exit_levels(
+                np.full(len(members), entry_price, dtype=np.float64),
+                np.full(len(members), true_range, dtype=np.float64), codes, configurations,
+                stop_adjustment=self._stop_adjustment[members] * stop_adjustment,
+                profit_adjustment=self._profit_adjustment[members] * profit_adjustment,
+                volatility_factor=self._volatility_factor[members] * volatility_factor,
+                tables=tables, stop_bounds=self.rules.spec.stop_bounds
+            )
+            width = levels["profit_levels"].shape[1]
+            stop[members] = levels["stop"]
+            profit_levels[members, :width] = levels["profit_levels"]
+            close_pct[members, :width] = levels["close_pct"]
+
+        stop[~self._use_stops] = -np.inf
+        profit_levels[~self._use_profit_targets] = np.inf
+
+        rows = ExitState.create(np.full(n, entry_price, dtype=np.float64), stop, profit_levels, close_pct)
+        if self.state is None:
+            self.state = rows
+        else:
+            self.state = ExitState(**{item.name: np.concatenate([getattr(self.state, item.name),
+                                                                 getattr(rows, item.name)])
+                                      for item in fields(ExitState)})
+        self.symbols = np.concatenate([self.symbols, np.full(n, symbol, dtype=object)])
+        self.strategy_index = np.concatenate([self.strategy_index, np.arange(n)])
+        self.hold_limits = np.concatenate([self.hold_limits, self._hold_limits])
+        self.entry_dates.extend([datetime.now().isoformat()] * n)
+
+    def _keep(self, keep: np.ndarray):
+        self.state = ExitState(**{item.name: getattr(self.state, item.name)[keep] for item in fields(ExitState)})
+        self.symbols = self.symbols[keep]
+        self.strategy_index = self.strategy_index[keep]
+        self.hold_limits = self.hold_limits[keep]
+        self.entry_dates = [date for date, kept in zip(self.entry_dates, keep) if kept]
+
+    def update(self, symbol: str, price_data: Dict, stop_multiplier: float = 1.0) -> Dict[str, Dict]:
+        """
+        Advance the shadow positions of a symbol by one bar
+
+        Args:
+            price_data: Dict with high, low, close (like update_position)
+            stop_multiplier: Regime stop adjustment the live manager applied on this bar
+
+        Returns:
+            Status per strategy with a position in this symbol
+        """
+        rows = self.symbols == symbol
+        if not rows.any():
+            return {}
+
+        high_price = price_data.get('high', price_data.get('close', 0))
+        low_price = price_data.get('low', price_data.get('close', 0))
+        close_price = price_data.get('close', high_price)
+        n = len(self.symbols)
+        high, low, close = np.full(n, np.nan), np.full(n, np.nan), np.full(n, np.nan)
+        high[rows], low[rows], close[rows] = high_price, low_price, close_price
+
+        state = self.state
+        step_day(state, high, low, close, self.bars, max_hold_days=self.hold_limits,
+                 stop_multiplier=np.where(rows, stop_multiplier, 1.0))
+        self.bars += 1
+
+        statuses = {}
+        closed = rows & ~state.is_open
+        for row in np.flatnonzero(rows):
+            strategy = self.strategies[self.strategy_index[row]]
+            status = {
+                'position_status': 'CLOSED' if closed[row] else 'ACTIVE',
+                'realized_pnl': float(state.realized[row]),
+                'remaining_position': float(state.remaining[row]),
+                'stop_level': float(state.stop[row]) if np.isfinite(state.stop[row]) else None,
+                'days_held': int(state.days_held[row])
+            }
+            if closed[row]:
+                status['exit_reason'] = EXIT_REASONS[int(state.exit_reason[row])]
+                self.returns[strategy.name].append(float(state.realized[row]))
+                self.trade_history[strategy.name].append({
+                    'symbol': symbol,
+                    'entry_price': float(state.entry[row]),
+                    'entry_date': self.entry_dates[row],
+                    'exit_date': datetime.now().isoformat(),
+                    'total_return_pct': float(state.realized[row]) * 100,
+                    'days_held': int(state.days_held[row]),
+                    'reason': status['exit_reason'],
+                    'profit_levels_hit': int(state.levels_hit[row].sum())
+                })
+            statuses[strategy.name] = status
+
+        if closed.any():
+            self._keep(~closed)
+        return statuses
+
+    def open_positions(self, strategy: str) -> int:
+        index = [s.name for s in self.strategies].index(strategy)
+        return int(np.sum(self.strategy_index == index))
+
+    def performance(self) -> Dict[str, Dict]:
+        """Portfolio metrics per strategy (same definitions as the live portfolio)"""
+        return {
+            strategy.name: calculate_portfolio_metrics(self.returns[strategy.name],
+                                                       self.open_positions(strategy.name))
+            for strategy in self.strategies
+        }
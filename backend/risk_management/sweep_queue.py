@@ -0,0 +1,435 @@
+"""
+BIDBACK Trading Tool - Sharded Sweep Queue
+Splits a parameter grid into work units in a shared directory. Any number of
+workers on any host that mounts the directory claim units with exclusive claim
+files, keep them alive with heartbeats and drop results with an atomic rename.
+Expired claims are taken over, so a crashed sweep resumes where it stopped
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .parameter_sweep import ParameterSweep, PruningRules
+from .prepared_dataset import PreparedTradeDataset
+
+logger = logging.getLogger(__name__)
+
+QUEUE_VERSION = 1
+MANIFEST_FILE = "sweep.json"
+DEFAULT_LEASE_SECONDS = 300
+
+def _write_json_atomic(path: Path, payload: Dict):
+    """Write to a unique temp file next to the target and rename it into place"""
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_dataset(spec: Dict) -> PreparedTradeDataset:
+    """
+    Load the dataset a sweep runs on
+
+    Args:
+        spec: {"csv": path} (deep-dive CSV through its prepared cache),
+            {"prepared": path} (saved .npz) or {"synthetic": {"seed", "n_trades"}}
+    """
+    if "csv" in spec:
+        return PreparedTradeDataset.load(spec["csv"])
+    if "prepared" in spec:
+        return PreparedTradeDataset.load_file(spec["prepared"])
+    if "synthetic" in spec:
+        from .synthetic_trades import SyntheticTradeGenerator
+        synthetic = spec["synthetic"]
+        return SyntheticTradeGenerator(seed=synthetic.get("seed", 42)).generate(synthetic["n_trades"])
+    raise ValueError(f"Unknown dataset spec: {spec}")
+
+class SweepQueue:
+    """
+    Directory based work queue of one sweep
+
+    Layout:
+        sweep.json              sweep id, dataset spec, sweep settings, unit count
+        units/<unit>.json       configurations of a work unit
+        claims/<unit>.claim     created with O_EXCL by the worker holding the unit;
+                                its mtime is the heartbeat
+        results/<unit>.json     ParameterSweep output of a finished unit
+        results/ingested/       results already loaded into a SweepResultStore
+
+    Only create-exclusive, rename and replace are used for coordination, which are
+    atomic on local file systems and on NFS/SMB mounts shared between hosts.
+    Results go to files rather than SQLite because SQLite locking is not reliable
+    on network file systems; collect() loads them into the store from one host.
+    """
+
+    def __init__(self, queue_dir: str):
+        self.queue_dir = Path(queue_dir)
+        self.units_dir = self.queue_dir / "units"
+        self.claims_dir = self.queue_dir / "claims"
+        self.results_dir = self.queue_dir / "results"
+        self.ingested_dir = self.results_dir / "ingested"
+
+    @classmethod
+    def create(cls, queue_dir: str, configurations: Sequence[Dict], dataset: Dict,
+               unit_size: int = 100, sweep_id: Optional[str] = None,
+               settings: Optional[Dict] = None) -> "SweepQueue":
+        """
+        Write the work units of a sweep
+
+        An existing queue in the directory is left untouched, so re-running the
+        orchestrator after a crash resumes instead of starting over.
+
+        Args:
+            queue_dir: Shared directory
+            configurations: Sweep configurations (see adjustment_grid)
+            dataset: Dataset spec (see load_dataset)
+            unit_size: Configurations per work unit
+            sweep_id: Id in the result store (default: random)
+            settings: ParameterSweep keyword arguments (chunk_size, ordering,
+                max_levels_per_day, max_hold_days, pruning as dict)
+        """
+        queue = cls(queue_dir)
+        if (queue.queue_dir / MANIFEST_FILE).exists():
+            logger.info(f"Resuming existing sweep queue {queue.queue_dir} ({queue.manifest()['sweep_id']})")
+            return queue
+
+        for directory in (queue.units_dir, queue.claims_dir, queue.ingested_dir):
+            directory.mkdir(parents=True, exist_ok=True)
+
+        configurations = list(configurations)
+        unit_ids = []
+        for index, start in enumerate(range(0, len(configurations), unit_size)):
+            unit_id = f"unit-{index:06d}"
+            _write_json_atomic(queue.units_dir / f"{unit_id}.json", {
+                "unit_id": unit_id,
+                "configurations": configurations[start:start + unit_size]
+            })
+            unit_ids.append(unit_id)
+
+        # Manifest last - its presence marks a complete queue
+        _write_json_atomic(queue.queue_dir / MANIFEST_FILE, {
+            "version": QUEUE_VERSION,
+            "sweep_id": sweep_id or uuid.uuid4().hex,
+            "dataset": dataset,
+            "settings": settings or {},
+            "units": unit_ids,
+            "configurations": len(configurations),
+            "created_at": datetime.now().isoformat()
+        })
+        logger.info(f"Sweep queue created: {queue.queue_dir} ({len(unit_ids)} units)")
+        return queue
+
+    def manifest(self) -> Dict:
+        with open(self.queue_dir / MANIFEST_FILE, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != QUEUE_VERSION:
+            raise ValueError(f"Unsupported sweep queue version: {manifest.get('version')}")
+        return manifest
+
+    def load_unit(self, unit_id: str) -> Dict:
+        with open(self.units_dir / f"{unit_id}.json", "r") as f:
+            return json.load(f)
+
+    def _claim_path(self, unit_id: str) -> Path:
+        return self.claims_dir / f"{unit_id}.claim"
+
+    def _is_done(self, unit_id: str) -> bool:
+        return (self.results_dir / f"{unit_id}.json").exists() or \
+            (self.ingested_dir / f"{unit_id}.json").exists()
+
+    def _claim_age(self, unit_id: str) -> Optional[float]:
+        """Seconds since the last heartbeat, None if unclaimed"""
+        try:
+            return time.time() - self._claim_path(unit_id).stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    # Claims
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[str]:
+        """
+        Claim the next unfinished unit; returns its id or None when nothing is left
+
+        Unclaimed units are taken first. A claim whose heartbeat is older than
+        lease_seconds is renamed away (only one worker can win that rename) and
+        claimed again.
+        """
+        candidates = [unit_id for unit_id in self.manifest()["units"] if not self._is_done(unit_id)]
+        expired = []
+        for unit_id in candidates:
+            age = self._claim_age(unit_id)
+            if age is None:
+                if self._create_claim(unit_id, worker_id, lease_seconds):
+                    return unit_id
+            elif age > lease_seconds:
+                expired.append(unit_id)
+
+        for unit_id in expired:
+            claim_path = self._claim_path(unit_id)
+            expired_path = claim_path.with_name(f"{claim_path.name}.expired.{uuid.uuid4().hex}")
+            try:
+                os.rename(claim_path, expired_path)
+            except FileNotFoundError:
+                continue  # Another worker took it over first
+            if time.time() - expired_path.stat().st_mtime <= lease_seconds:
+                # Renamed a claim another worker created in the meantime - hand it back
+                try:
+                    os.link(expired_path, claim_path)
+                except FileExistsError:
+                    pass
+                os.remove(expired_path)
+                continue
+            logger.warning(f"Taking over expired claim of {unit_id}")
+            os.remove(expired_path)
+            if self._create_claim(unit_id, worker_id, lease_seconds):
+                return unit_id
+        return None
+
+    def _create_claim(self, unit_id: str, worker_id: str, lease_seconds: float) -> bool:
+        if self._is_done(unit_id):
+            return False
+        try:
+            fd = os.open(self._claim_path(unit_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            json.dump({
+                "worker_id": worker_id,
+                "host": socket.gethostname(),
+                "pid": os.getpid(),
+                "claimed_at": datetime.now().isoformat(),
+                "lease_seconds": lease_seconds
+            }, f)
+        return True
+
+    def owns_claim(self, unit_id: str, worker_id: str) -> bool:
+        try:
+            with open(self._claim_path(unit_id), "r") as f:
+                return json.load(f).get("worker_id") == worker_id
+        except (OSError, ValueError):
+            return False
+
+    def heartbeat(self, unit_id: str, worker_id: str) -> bool:
+        """Renew the lease; returns False if the claim was lost to another worker"""
+        if not self.owns_claim(unit_id, worker_id):
+            return False
+        try:
+            os.utime(self._claim_path(unit_id))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def release(self, unit_id: str, worker_id: str):
+        """Give a unit back without a result"""
+        if self.owns_claim(unit_id, worker_id):
+            try:
+                os.remove(self._claim_path(unit_id))
+            except FileNotFoundError:
+                pass
+
+    def complete(self, unit_id: str, worker_id: str, output: Dict):
+        """Publish the result of a unit and drop the claim"""
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        _write_json_atomic(self.results_dir / f"{unit_id}.json", dict(
+            output, unit_id=unit_id, worker_id=worker_id, host=socket.gethostname(),
+            finished_at=datetime.now().isoformat()
+        ))
+        self.release(unit_id, worker_id)
+
+    # Progress and results
+
+    def status(self, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Dict:
+        """Unit counts by state"""
+        counts = {"units": 0, "done": 0, "ingested": 0, "running": 0, "expired": 0, "pending": 0}
+        for unit_id in self.manifest()["units"]:
+            counts["units"] += 1
+            if (self.ingested_dir / f"{unit_id}.json").exists():
+                counts["done"] += 1
+                counts["ingested"] += 1
+            elif (self.results_dir / f"{unit_id}.json").exists():
+                counts["done"] += 1
+            else:
+                age = self._claim_age(unit_id)
+                if age is None:
+                    counts["pending"] += 1
+                elif age > lease_seconds:
+                    counts["expired"] += 1
+                else:
+                    counts["running"] += 1
+        return counts
+
+    def collect(self, result_store) -> int:
+        """
+        Load finished unit results into a SweepResultStore
+
+        Writes are idempotent (one row per config hash), so a collect that dies
+        between the insert and moving the file only repeats the insert.
+
+        Returns:
+            Number of result rows written
+        """
+        manifest = self.manifest()
+        sweep_id = result_store.create_sweep(
+            manifest["sweep_id"], description=f"Sharded sweep {self.queue_dir}",
+            parameters={"dataset": manifest["dataset"], **manifest["settings"]}
+        )
+        self.ingested_dir.mkdir(parents=True, exist_ok=True)
+
+        written = 0
+        for result_path in sorted(self.results_dir.glob("unit-*.json")):
+            try:
+                with open(result_path, "r") as f:
+                    output = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable unit result {result_path}: {e}")
+                continue
+            written += result_store.add_results(sweep_id, output["results"])
+            try:
+                os.replace(result_path, self.ingested_dir / result_path.name)
+            except FileNotFoundError:
+                pass  # Collected concurrently
+        return written
+
+class SweepWorker:
+    """Claims and evaluates units of a SweepQueue until none are left"""
+
+    def __init__(self, queue: SweepQueue, worker_id: Optional[str] = None,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = lease_seconds
+        self._dataset: Optional[PreparedTradeDataset] = None
+
+    def _sweep_kwargs(self, settings: Dict) -> Dict:
+        kwargs = {key: settings[key] for key in ("chunk_size", "ordering", "max_levels_per_day", "max_hold_days")
+                  if key in settings}
+        if "pruning" in settings:
+            kwargs["pruning"] = PruningRules(**settings["pruning"])
+        return kwargs
+
+    def run(self, max_units: Optional[int] = None, wait_for_expired: bool = False,
+            poll_seconds: float = 10.0) -> List[str]:
+        """
+        Process units
+
+        Args:
+            max_units: Stop after this many units
+            wait_for_expired: Keep polling while other workers hold claims, so units of
+                workers that crash are picked up once their lease expires
+            poll_seconds: Poll interval while waiting
+
+        Returns:
+            Ids of the units this worker finished
+        """
+        manifest = self.queue.manifest()
+        kwargs = self._sweep_kwargs(manifest["settings"])
+        finished = []
+
+        while max_units is None or len(finished) < max_units:
+            unit_id = self.queue.claim(self.worker_id, self.lease_seconds)
+            if unit_id is None:
+                status = self.queue.status(self.lease_seconds)
+                if wait_for_expired and status["running"] + status["expired"] > 0:
+                    time.sleep(poll_seconds)
+                    continue
+                break
+
+            if self._dataset is None:
+                self._dataset = load_dataset(manifest["dataset"])
+
+            stop_heartbeat = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(unit_id, stop_heartbeat), daemon=True)
+            heartbeat.start()
+            try:
+                unit = self.queue.load_unit(unit_id)
+                output = ParameterSweep(self._dataset, unit["configurations"], **kwargs).run()
+            except Exception:
+                self.queue.release(unit_id, self.worker_id)
+                raise
+            finally:
+                stop_heartbeat.set()
+                heartbeat.join()
+
+            # Results are deterministic, so a unit taken over meanwhile only yields a duplicate
+            self.queue.complete(unit_id, self.worker_id, output)
+            finished.append(unit_id)
+            logger.info(f"Worker {self.worker_id} finished {unit_id} "
+                        f"({output['configurations']} configurations, {output['pruned']} pruned)")
+        return finished
+
+    def _heartbeat(self, unit_id: str, stop: threading.Event):
+        while not stop.wait(self.lease_seconds / 3):
+            if not self.queue.heartbeat(unit_id, self.worker_id):
+                logger.warning(f"Worker {self.worker_id} lost its claim on {unit_id}")
+                return
+
+def main():
+    """Command line entry point: create, work, status and collect"""
+    import argparse
+
+    from .parameter_sweep import adjustment_grid
+    from .sweep_store import SweepResultStore
+
+    def floats(text: str) -> List[float]:
+        return [float(value) for value in text.split(",")]
+
+    parser = argparse.ArgumentParser(description="Sharded BIDBACK parameter sweep")
+    parser.add_argument("queue_dir", help="Shared queue directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Split a parameter grid into work units")
+    create.add_argument("--csv", help="Deep-dive trade CSV")
+    create.add_argument("--synthetic-trades", type=int, help="Use a synthetic dataset of this size")
+    create.add_argument("--seed", type=int, default=42, help="Synthetic dataset seed")
+    create.add_argument("--stop-adjustments", type=floats, default=[1.0])
+    create.add_argument("--profit-adjustments", type=floats, default=[1.0])
+    create.add_argument("--volatility-factors", type=floats, default=[1.0])
+    create.add_argument("--unit-size", type=int, default=100)
+    create.add_argument("--chunk-size", type=int, default=500)
+    create.add_argument("--sweep-id")
+
+    work = commands.add_parser("work", help="Process work units")
+    work.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    work.add_argument("--max-units", type=int)
+    work.add_argument("--wait", action="store_true", help="Wait for units held by other workers")
+
+    commands.add_parser("status", help="Show unit counts")
+
+    collect = commands.add_parser("collect", help="Load finished results into the result store")
+    collect.add_argument("--db", default=os.environ.get("SWEEP_RESULTS_DB", "reports/sweep_results.db"))
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == "create":
+        if args.csv:
+            dataset = {"csv": str(Path(args.csv).resolve())}
+        elif args.synthetic_trades:
+            dataset = {"synthetic": {"seed": args.seed, "n_trades": args.synthetic_trades}}
+        else:
+            parser.error("create needs --csv or --synthetic-trades")
+        grid = adjustment_grid(args.stop_adjustments, args.profit_adjustments, args.volatility_factors)
+        queue = SweepQueue.create(args.queue_dir, grid, dataset, unit_size=args.unit_size,
+                                  sweep_id=args.sweep_id, settings={"chunk_size": args.chunk_size})
+        print(json.dumps(queue.status(), indent=2))
+    elif args.command == "work":
+        finished = SweepWorker(SweepQueue(args.queue_dir), lease_seconds=args.lease_seconds).run(
+            max_units=args.max_units, wait_for_expired=args.wait)
+        print(f"Finished {len(finished)} units")
+    elif args.command == "status":
+        print(json.dumps(SweepQueue(args.queue_dir).status(), indent=2))
+    elif args.command == "collect":
+        written = SweepQueue(args.queue_dir).collect(SweepResultStore(args.db))
+        print(f"Collected {written} results")
+
+if __name__ == "__main__":
+    main()
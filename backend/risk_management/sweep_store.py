@@ -0,0 +1,307 @@
+"""
+BIDBACK Trading Tool - Sweep Result Store
+Persists every evaluated sweep configuration with its metrics in an indexed SQLite
+table and answers Pareto frontier (return vs. drawdown) and constraint queries,
+so trade-offs can be explored without rerunning sweeps
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sweeps (
+    sweep_id TEXT PRIMARY KEY,
+    description TEXT,
+    parameters TEXT,
+    total_trades INTEGER,
+    result_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sweep_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sweep_id TEXT NOT NULL REFERENCES sweeps(sweep_id) ON DELETE CASCADE,
+    config_hash TEXT NOT NULL,
+    configuration TEXT NOT NULL,
+    status TEXT NOT NULL,
+    trades_evaluated INTEGER NOT NULL,
+    total_return REAL,
+    avg_return_per_trade REAL,
+    win_rate REAL,
+    sharpe_ratio REAL,
+    max_drawdown REAL,
+    created_at TEXT NOT NULL,
+    UNIQUE (sweep_id, config_hash)
+);
+
+CREATE INDEX IF NOT EXISTS idx_sweep_results_return
+    ON sweep_results (sweep_id, status, total_return DESC, max_drawdown DESC);
+CREATE INDEX IF NOT EXISTS idx_sweep_results_drawdown ON sweep_results (sweep_id, max_drawdown);
+CREATE INDEX IF NOT EXISTS idx_sweep_results_sharpe ON sweep_results (sweep_id, sharpe_ratio);
+CREATE INDEX IF NOT EXISTS idx_sweep_results_win_rate ON sweep_results (sweep_id, win_rate);
+"""
+
+METRIC_COLUMNS = ("total_return", "avg_return_per_trade", "win_rate", "sharpe_ratio", "max_drawdown")
+ORDER_COLUMNS = METRIC_COLUMNS + ("trades_evaluated", "id")
+
+# Window functions need SQLite 3.25
+WINDOW_FUNCTIONS = sqlite3.sqlite_version_info >= (3, 25, 0)
+
+def config_hash(configuration: Dict) -> str:
+    """Stable hash of a configuration (key order does not matter)"""
+    return hashlib.sha1(json.dumps(configuration, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def pareto_frontier(total_return: np.ndarray, max_drawdown: np.ndarray) -> np.ndarray:
+    """
+    Indices of the non-dominated points, maximizing return and max drawdown
+
+    Max drawdown is stored as a negative fraction, so larger is better. Points are
+    sorted by return (descending, ties by drawdown) and a point is on the frontier
+    if its drawdown beats every point with a higher return: O(n log n) for the sort
+    plus one running maximum. Exact duplicates keep only their first occurrence.
+
+    Returns:
+        Indices into the inputs in descending return order
+    """
+    total_return = np.asarray(total_return, dtype=np.float64)
+    max_drawdown = np.asarray(max_drawdown, dtype=np.float64)
+    if not len(total_return):
+        return np.empty(0, dtype=np.int64)
+
+    order = np.lexsort((-max_drawdown, -total_return))
+    drawdown_sorted = max_drawdown[order]
+    best_before = np.concatenate([[-np.inf], np.maximum.accumulate(drawdown_sorted)[:-1]])
+    return order[drawdown_sorted > best_before]
+
+class SweepResultStore:
+    """SQLite store of sweep configurations and their metrics"""
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Frontier cache keyed by (sweep, constraints), invalidated when the sweep gets new results
+        self._frontier_cache: Dict[Tuple, Tuple[str, List[Dict]]] = {}
+        self._cache_lock = threading.Lock()
+
+        with self.get_connection() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def get_connection(self):
+        """Context manager for store connections (same pragmas as DatabaseConnection)"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30.0, check_same_thread=False)
+        try:
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA foreign_keys = ON")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA cache_size = -64000")
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    # Writing
+
+    def create_sweep(self, sweep_id: Optional[str] = None, description: str = "",
+                     parameters: Optional[Dict] = None, total_trades: Optional[int] = None) -> str:
+        """Register a sweep (existing sweeps are kept); returns the sweep id"""
+        sweep_id = sweep_id or uuid.uuid4().hex
+        now = datetime.now().isoformat()
+        with self.get_connection() as conn:
+            conn.execute(
+                """INSERT OR IGNORE INTO sweeps
+                   (sweep_id, description, parameters, total_trades, created_at, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (sweep_id, description, json.dumps(parameters or {}, default=str), total_trades, now, now)
+            )
+        return sweep_id
+
+    def add_results(self, sweep_id: str, results: Iterable[Dict], batch_size: int = 10000) -> int:
+        """
+        Insert ParameterSweep results; re-evaluated configurations replace their row
+
+        Returns:
+            Number of rows written
+        """
+        now = datetime.now().isoformat()
+        written = 0
+        with self.get_connection() as conn:
+            if conn.execute("SELECT 1 FROM sweeps WHERE sweep_id = ?", (sweep_id,)).fetchone() is None:
+                raise KeyError(f"Unknown sweep: {sweep_id}")
+
+            batch = []
+            for result in results:
+                configuration = result["configuration"]
+                batch.append((
+                    sweep_id, config_hash(configuration), json.dumps(configuration, default=str),
+                    result.get("status", "complete"), result.get("trades_evaluated", 0),
+                    *(result.get(column) for column in METRIC_COLUMNS), now
+                ))
+                if len(batch) >= batch_size:
+                    written += self._insert_batch(conn, batch)
+                    batch = []
+            if batch:
+                written += self._insert_batch(conn, batch)
+
+            conn.execute(
+                """UPDATE sweeps SET updated_at = ?,
+                   result_count = (SELECT COUNT(*) FROM sweep_results WHERE sweep_id = ?)
+                   WHERE sweep_id = ?""",
+                (now, sweep_id, sweep_id)
+            )
+        return written
+
+    @staticmethod
+    def _insert_batch(conn: sqlite3.Connection, batch: List[tuple]) -> int:
+        conn.executemany(
+            f"""INSERT INTO sweep_results
+                (sweep_id, config_hash, configuration, status, trades_evaluated,
+                 {", ".join(METRIC_COLUMNS)}, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (sweep_id, config_hash) DO UPDATE SET
+                    status = excluded.status,
+                    trades_evaluated = excluded.trades_evaluated,
+                    {", ".join(f"{column} = excluded.{column}" for column in METRIC_COLUMNS)},
+                    created_at = excluded.created_at""",
+            batch
+        )
+        return len(batch)
+
+    def existing_hashes(self, sweep_id: str) -> set:
+        """Config hashes already evaluated in a sweep"""
+        with self.get_connection() as conn:
+            rows = conn.execute("SELECT config_hash FROM sweep_results WHERE sweep_id = ?", (sweep_id,))
+            return {row[0] for row in rows}
+
+    # Querying
+
+    def list_sweeps(self) -> List[Dict]:
+        with self.get_connection() as conn:
+            rows = conn.execute("SELECT * FROM sweeps ORDER BY created_at DESC").fetchall()
+        return [self._sweep_to_dict(row) for row in rows]
+
+    def get_sweep(self, sweep_id: str) -> Optional[Dict]:
+        with self.get_connection() as conn:
+            row = conn.execute("SELECT * FROM sweeps WHERE sweep_id = ?", (sweep_id,)).fetchone()
+        return self._sweep_to_dict(row) if row else None
+
+    def _constraint_clause(self, sweep_id: str, constraints: Dict, include_pruned: bool) -> Tuple[str, list]:
+        """WHERE clause for metric constraints like min_win_rate or max_drawdown"""
+        clauses = ["sweep_id = ?"]
+        params: list = [sweep_id]
+        if not include_pruned:
+            clauses.append("status = 'complete'")
+        for name, value in constraints.items():
+            if value is None:
+                continue
+            bound, _, column = name.partition("_")
+            if bound not in ("min", "max") or column not in METRIC_COLUMNS:
+                raise ValueError(f"Unknown constraint: {name}")
+            clauses.append(f"{column} {'>=' if bound == 'min' else '<='} ?")
+            params.append(value)
+        return " AND ".join(clauses), params
+
+    def query_results(self, sweep_id: str, constraints: Optional[Dict] = None, include_pruned: bool = False,
+                      order_by: str = "total_return", descending: bool = True,
+                      limit: int = 100, offset: int = 0) -> List[Dict]:
+        """
+        Filter and sort stored results
+
+        Args:
+            sweep_id: Sweep to query
+            constraints: {"min_<metric>": value, "max_<metric>": value} for the metric columns
+            include_pruned: Also return configurations abandoned by early pruning
+            order_by: Metric column (or trades_evaluated / id) to sort by
+            descending: Sort direction
+            limit, offset: Page of the result
+        """
+        if order_by not in ORDER_COLUMNS:
+            raise ValueError(f"Cannot order by {order_by}")
+        where, params = self._constraint_clause(sweep_id, constraints or {}, include_pruned)
+        query = (f"SELECT * FROM sweep_results WHERE {where} "
+                 f"ORDER BY {order_by} {'DESC' if descending else 'ASC'}, id LIMIT ? OFFSET ?")
+        with self.get_connection() as conn:
+            rows = conn.execute(query, params + [limit, offset]).fetchall()
+        return [self._result_to_dict(row) for row in rows]
+
+    def frontier(self, sweep_id: str, constraints: Optional[Dict] = None, include_pruned: bool = False) -> List[Dict]:
+        """
+        Pareto frontier of total return vs. max drawdown among the matching results
+
+        The running maximum runs inside SQLite, so only frontier rows reach Python.
+        Results are cached until the sweep gets new rows.
+        """
+        sweep = self.get_sweep(sweep_id)
+        if sweep is None:
+            raise KeyError(f"Unknown sweep: {sweep_id}")
+
+        cache_key = (sweep_id, include_pruned, tuple(sorted((constraints or {}).items())))
+        with self._cache_lock:
+            cached = self._frontier_cache.get(cache_key)
+            if cached is not None and cached[0] == sweep["updated_at"]:
+                return cached[1]
+
+        where, params = self._constraint_clause(sweep_id, constraints or {}, include_pruned)
+        where += " AND total_return IS NOT NULL AND max_drawdown IS NOT NULL"
+        with self.get_connection() as conn:
+            if WINDOW_FUNCTIONS:
+                # Same running maximum as pareto_frontier, evaluated inside SQLite over the
+                # (sweep_id, status, total_return, max_drawdown) index order
+                frontier_ids = [row[0] for row in conn.execute(
+                    f"""SELECT id FROM (
+                            SELECT id, max_drawdown, MAX(max_drawdown) OVER (
+                                ORDER BY total_return DESC, max_drawdown DESC
+                                ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+                            ) AS best_before
+                            FROM sweep_results WHERE {where}
+                        ) WHERE best_before IS NULL OR max_drawdown > best_before""",
+                    params
+                )]
+            else:
+                rows = conn.execute(f"SELECT id, total_return, max_drawdown FROM sweep_results WHERE {where}",
+                                    params).fetchall()
+                points = np.array(rows, dtype=np.float64).reshape(-1, 3)
+                frontier_ids = points[pareto_frontier(points[:, 1], points[:, 2]), 0].astype(np.int64).tolist()
+
+            frontier_rows = []
+            for start in range(0, len(frontier_ids), 500):
+                ids = frontier_ids[start:start + 500]
+                frontier_rows.extend(conn.execute(
+                    f"SELECT * FROM sweep_results WHERE id IN ({', '.join('?' * len(ids))})", ids
+                ).fetchall())
+
+        frontier_rows.sort(key=lambda row: (-row["total_return"], -row["max_drawdown"]))
+        frontier = [self._result_to_dict(row) for row in frontier_rows]
+        with self._cache_lock:
+            self._frontier_cache[cache_key] = (sweep["updated_at"], frontier)
+        return frontier
+
+    @staticmethod
+    def _sweep_to_dict(row: sqlite3.Row) -> Dict:
+        sweep = dict(row)
+        sweep["parameters"] = json.loads(sweep["parameters"] or "{}")
+        return sweep
+
+    @staticmethod
+    def _result_to_dict(row: sqlite3.Row) -> Dict:
+        result = dict(row)
+        result["configuration"] = json.loads(result["configuration"])
+        return result
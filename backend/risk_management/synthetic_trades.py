@@ -0,0 +1,258 @@
+"""
+BIDBACK Trading Tool - Synthetic Trade Generator
+Vectorized generator for large synthetic trade workloads (stress tests, hardware
+sizing, scaling benchmarks) with regime-conditional volatility, OHLC paths and
+VIX/T2108/momentum context, written as PreparedTradeDatasets or columnar stores
+"""
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+from .columnar_store import REGIME_CATEGORIES, ColumnarResultReader, ColumnarResultWriter
+from .prepared_dataset import PRICE_DAYS, PreparedTradeDataset
+
+logger = logging.getLogger(__name__)
+
+# Regime profiles - VIX ranges match the IntegratedRiskOverlay regime configurations,
+# so classify_regime puts every synthetic trade back into the regime it was drawn in
+REGIME_PROFILES = {
+    "low_vol_complacency": {
+        "probability": 0.20,
+        "vix_range": (10, 15),
+        "vix_tail": 0.0,
+        "daily_volatility": 0.015,
+        "daily_drift": 0.003,
+        "t2108": (65, 10),
+        "momentum": (0.15, 0.25)
+    },
+    "bull_normal": {
+        "probability": 0.50,
+        "vix_range": (15, 30),
+        "vix_tail": 0.0,
+        "daily_volatility": 0.025,
+        "daily_drift": 0.004,
+        "t2108": (45, 12),
+        "momentum": (0.05, 0.30)
+    },
+    "high_vol_stress": {
+        "probability": 0.22,
+        "vix_range": (30, 50),
+        "vix_tail": 0.0,
+        "daily_volatility": 0.040,
+        "daily_drift": 0.002,
+        "t2108": (25, 10),
+        "momentum": (-0.15, 0.35)
+    },
+    "crisis_opportunity": {
+        "probability": 0.08,
+        "vix_range": (50, 50),
+        "vix_tail": 12.0,  # VIX = 50 + exponential tail
+        "daily_volatility": 0.060,
+        "daily_drift": 0.008,
+        "t2108": (10, 6),
+        "momentum": (-0.35, 0.45)
+    }
+}
+
+SYNTHETIC_TRADE_DTYPE = np.dtype([
+    ("trade_id", np.int64),
+    ("symbol", "U16"),
+    ("breakout_date", "U10"),
+    ("entry_price", np.float64),
+    ("high", np.float64, (PRICE_DAYS,)),
+    ("low", np.float64, (PRICE_DAYS,)),
+    ("close", np.float64, (PRICE_DAYS,)),
+    ("baseline_return", np.float64),
+    ("vix", np.float64),
+    ("t2108", np.float64),
+    ("momentum_ratio", np.float64),
+    ("regime", np.int8)  # Code into REGIME_CATEGORIES
+])
+
+SYNTHETIC_TRADE_CATEGORIES = {"regime": REGIME_CATEGORIES}
+
+class SyntheticTradeGenerator:
+    """
+    Reproducible synthetic trades in independent streams
+
+    Every stream has its own np.random.Generator derived from (seed, stream) via
+    SeedSequence, so a chunk of trades is identical no matter which worker
+    produces it or in which order chunks are generated.
+    """
+
+    def __init__(self, seed: int = 42, regime_profiles: Optional[Dict] = None,
+                 start_date: str = "2010-01-04", trades_per_day: int = 20,
+                 price_range: tuple = (5.0, 200.0)):
+        self.seed = seed
+        self.regime_profiles = regime_profiles or REGIME_PROFILES
+        self.start_date = np.datetime64(start_date, "D")
+        self.trades_per_day = trades_per_day
+        self.price_range = price_range
+
+        self.regimes = list(self.regime_profiles)
+        probabilities = np.array([profile["probability"] for profile in self.regime_profiles.values()], dtype=float)
+        self.probabilities = probabilities / probabilities.sum()
+        self.regime_codes = np.array([REGIME_CATEGORIES.index(regime) for regime in self.regimes], dtype=np.int8)
+
+        # Per-regime parameter tables indexed by the drawn regime
+        profiles = list(self.regime_profiles.values())
+        self._vix_low = np.array([profile["vix_range"][0] for profile in profiles], dtype=float)
+        self._vix_high = np.array([profile["vix_range"][1] for profile in profiles], dtype=float)
+        self._vix_tail = np.array([profile["vix_tail"] for profile in profiles], dtype=float)
+        self._volatility = np.array([profile["daily_volatility"] for profile in profiles], dtype=float)
+        self._drift = np.array([profile["daily_drift"] for profile in profiles], dtype=float)
+        self._t2108 = np.array([profile["t2108"] for profile in profiles], dtype=float)
+        self._momentum = np.array([profile["momentum"] for profile in profiles], dtype=float)
+
+    def rng(self, stream: int = 0) -> np.random.Generator:
+        """Independent generator of one stream"""
+        return np.random.Generator(np.random.PCG64(np.random.SeedSequence(self.seed, spawn_key=(stream,))))
+
+    def generate(self, n_trades: int, stream: int = 0, start_id: int = 0) -> PreparedTradeDataset:
+        """
+        Generate one chunk of trades
+
+        Args:
+            n_trades: Number of trades
+            stream: Random stream (use the chunk index for parallel workers)
+            start_id: Trade id of the first trade (symbols and breakout dates follow it)
+
+        Returns:
+            PreparedTradeDataset with full PRICE_DAYS price paths
+        """
+        rng = self.rng(stream)
+        regime = rng.choice(len(self.regimes), size=n_trades, p=self.probabilities)
+
+        # Market context
+        vix_uniform = self._vix_low[regime] + rng.random(n_trades) * (self._vix_high[regime] - self._vix_low[regime])
+        vix = np.where(self._vix_tail[regime] > 0,
+                       self._vix_low[regime] + rng.exponential(1.0, n_trades) * self._vix_tail[regime],
+                       vix_uniform)
+        t2108 = np.clip(rng.normal(self._t2108[regime, 0], self._t2108[regime, 1]), 0, 100)
+        momentum_ratio = rng.lognormal(self._momentum[regime, 0], self._momentum[regime, 1])
+
+        # Trade-specific volatility scatters around the regime level
+        volatility = self._volatility[regime] * rng.lognormal(0.0, 0.25, n_trades)
+        drift = self._drift[regime]
+
+        # OHLC paths: close-to-close returns, opening gaps, intraday extensions beyond open/close.
+        # One standard normal block is drawn and scaled in place to keep peak memory low.
+        low_price, high_price = self.price_range
+        entry = np.exp(rng.uniform(np.log(low_price), np.log(high_price), n_trades))
+        shocks = rng.standard_normal((4, n_trades, PRICE_DAYS))
+        returns, gap, high_extension, low_extension = shocks
+        scale = volatility[:, None]
+        returns *= scale
+        returns += drift[:, None]
+        np.maximum(returns, -0.9, out=returns)
+        gap *= 0.3 * scale
+        np.maximum(gap, -0.5, out=gap)
+        np.abs(high_extension, out=high_extension)
+        high_extension *= 0.5 * scale
+        np.abs(low_extension, out=low_extension)
+        low_extension *= 0.5 * scale
+        np.minimum(low_extension, 0.9, out=low_extension)
+
+        close = np.empty((n_trades, PRICE_DAYS))
+        high = np.empty((n_trades, PRICE_DAYS))
+        low = np.empty((n_trades, PRICE_DAYS))
+        previous_close = entry
+        for day in range(PRICE_DAYS):
+            open_ = previous_close * (1 + gap[:, day])
+            close[:, day] = previous_close * (1 + returns[:, day])
+            high[:, day] = np.maximum(open_, close[:, day]) * (1 + high_extension[:, day])
+            low[:, day] = np.minimum(open_, close[:, day]) * (1 - low_extension[:, day])
+            previous_close = close[:, day]
+
+        trade_ids = np.arange(start_id, start_id + n_trades)
+
+        return PreparedTradeDataset(
+            symbols=synthetic_symbols(trade_ids),
+            breakout_dates=self.breakout_dates(trade_ids),
+            entry=entry,
+            high=high,
+            low=low,
+            close=close,
+            baseline_return=close[:, 1] / entry - 1,  # Original system exits after day 2
+            vix=vix,
+            t2108=t2108,
+            momentum_ratio=momentum_ratio,
+            source={"synthetic": True, "seed": self.seed, "stream": stream, "start_id": start_id}
+        )
+
+    def breakout_dates(self, trade_ids: np.ndarray) -> np.ndarray:
+        """ISO dates, trades_per_day consecutive trades per business day"""
+        day_index = trade_ids // self.trades_per_day
+        if not len(day_index):
+            return np.empty(0, dtype="U10")
+        # Trade ids are contiguous, so only the distinct days are formatted
+        first_day = day_index.min()
+        days = np.busday_offset(self.start_date, np.arange(first_day, day_index.max() + 1), roll="forward")
+        return np.datetime_as_string(days, unit="D").astype("U10")[day_index - first_day]
+
+    def write_columnar(self, path: str, n_trades: int, chunk_size: int = 100000) -> Dict:
+        """
+        Generate trades chunk by chunk straight into a columnar store
+
+        Chunk i uses stream i, so any chunk can be regenerated on its own.
+
+        Returns:
+            Manifest of the store
+        """
+        metadata = {"generator": "synthetic_trades", "seed": self.seed, "chunk_size": chunk_size,
+                    "trades_per_day": self.trades_per_day, "regime_profiles": self.regime_profiles}
+        with ColumnarResultWriter(path, dtype=SYNTHETIC_TRADE_DTYPE,
+                                  categories=SYNTHETIC_TRADE_CATEGORIES, metadata=metadata) as writer:
+            for chunk_index, start in enumerate(range(0, n_trades, chunk_size)):
+                dataset = self.generate(min(chunk_size, n_trades - start), stream=chunk_index, start_id=start)
+                writer.append(dataset_to_records(dataset, start_id=start))
+            manifest = writer.close()
+
+        logger.info(f"Synthetic trades written: {path} ({n_trades} trades, seed {self.seed})")
+        return manifest
+
+def synthetic_symbols(trade_ids: np.ndarray) -> np.ndarray:
+    """Symbols 'SYN00000042' built from code points (np.char.mod formats per element)"""
+    digits = trade_ids[:, None] // 10 ** np.arange(7, -1, -1) % 10 + ord("0")
+    codes = np.empty((len(trade_ids), 16), dtype=np.uint32)
+    codes[:, :3] = [ord(char) for char in "SYN"]
+    codes[:, 3:11] = digits
+    codes[:, 11:] = 0
+    return codes.view("U16").ravel()
+
+def dataset_to_records(dataset: PreparedTradeDataset, start_id: int = 0) -> np.ndarray:
+    """Structured SYNTHETIC_TRADE_DTYPE array of a prepared dataset"""
+    records = np.empty(len(dataset), dtype=SYNTHETIC_TRADE_DTYPE)
+    records["trade_id"] = np.arange(start_id, start_id + len(dataset))
+    records["symbol"] = dataset.symbols
+    records["breakout_date"] = dataset.breakout_dates
+    records["entry_price"] = dataset.entry
+    records["high"] = dataset.high
+    records["low"] = dataset.low
+    records["close"] = dataset.close
+    records["baseline_return"] = dataset.baseline_return
+    records["vix"] = dataset.vix
+    records["t2108"] = dataset.t2108
+    records["momentum_ratio"] = dataset.momentum_ratio
+    records["regime"] = dataset.regime
+    return records
+
+def read_columnar_dataset(path: str, start: int = 0, stop: Optional[int] = None) -> PreparedTradeDataset:
+    """Load a row range of a synthetic columnar store as a PreparedTradeDataset"""
+    reader = ColumnarResultReader(path)
+    columns = reader.slice(start, stop)
+    return PreparedTradeDataset(
+        symbols=np.asarray(columns["symbol"]),
+        breakout_dates=np.asarray(columns["breakout_date"]),
+        entry=np.asarray(columns["entry_price"]),
+        high=np.asarray(columns["high"]),
+        low=np.asarray(columns["low"]),
+        close=np.asarray(columns["close"]),
+        baseline_return=np.asarray(columns["baseline_return"]),
+        vix=np.asarray(columns["vix"]),
+        t2108=np.asarray(columns["t2108"]),
+        momentum_ratio=np.asarray(columns["momentum_ratio"]),
+        source=dict(reader.metadata, path=str(path), start=start, stop=stop)
+    )
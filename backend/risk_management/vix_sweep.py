@@ -0,0 +1,171 @@
+"""
+BIDBACK Trading Tool - VIX Threshold Sweep
+Scores thousands of vix_thresholds tuples without reclassifying trades: trades are
+sorted by VIX once, per-regime outcomes are turned into prefix sums, and every
+threshold tuple becomes a handful of np.searchsorted lookups and differences
+"""
+
+import copy
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .incremental_backtesting import evaluate_trade_layers
+from .integrated_overlay_system import IntegratedRiskOverlay
+from .prepared_dataset import PreparedTradeDataset
+
+logger = logging.getLogger(__name__)
+
+# A threshold tuple (t1, t2, t3, t4) rewrites the regime vix_ranges as
+#   low_vol_complacency [0, t1), bull_normal [t1, t2), high_vol_stress [t2, t3),
+#   crisis_opportunity [t4, inf)
+# VIX in [t3, t4) matches no range and falls back to bull_normal like classify_regime.
+# The default rule set corresponds to (15, 30, 50, 50).
+DEFAULT_BAND_REGIMES = ("low_vol_complacency", "bull_normal", "high_vol_stress", "bull_normal", "crisis_opportunity")
+
+def thresholds_to_regime_configurations(thresholds: Sequence[float], regime_configurations: Dict) -> Dict:
+    """Regime configurations with vix_ranges rewritten for a threshold tuple (reference path)"""
+    t1, t2, t3, t4 = thresholds
+    configurations = copy.deepcopy(regime_configurations)
+    configurations["low_vol_complacency"]["vix_range"] = (0, t1)
+    configurations["bull_normal"]["vix_range"] = (t1, t2)
+    configurations["high_vol_stress"]["vix_range"] = (t2, t3)
+    configurations["crisis_opportunity"]["vix_range"] = (t4, float("inf"))
+    return configurations
+
+def threshold_grid(t1: Sequence[float], t2: Sequence[float], t3: Sequence[float], t4: Sequence[float]) -> np.ndarray:
+    """Dense 4-D threshold surface as a (K, 4) array in C order of the inputs"""
+    mesh = np.meshgrid(np.asarray(t1, float), np.asarray(t2, float),
+                       np.asarray(t3, float), np.asarray(t4, float), indexing="ij")
+    return np.stack([axis.ravel() for axis in mesh], axis=1)
+
+class VixThresholdSweep:
+    """
+    Prefix-sum evaluator for VIX threshold tuples
+
+    For every candidate rule set (a regime_configurations dict) the outcome of each
+    trade under each regime is computed once. Outcomes are sorted by VIX and
+    accumulated, so the statistics of any VIX band under any regime are O(1).
+
+    Max drawdown depends on the chronological order of trades and cannot be built
+    from VIX-sorted prefix sums; score it separately for the short list of winners.
+    """
+
+    def __init__(self, dataset: PreparedTradeDataset,
+                 rule_sets: Optional[Dict[str, Dict]] = None,
+                 layer: str = "combined",
+                 band_regimes: Sequence[str] = DEFAULT_BAND_REGIMES):
+        self.dataset = dataset
+        self.layer = layer
+        self.band_regimes = tuple(band_regimes)
+        if len(self.band_regimes) != 5:
+            raise ValueError("band_regimes needs one regime per band (5 bands for 4 thresholds)")
+
+        self.overlay_system = IntegratedRiskOverlay()
+        self.rule_sets = rule_sets or {"default": self.overlay_system.regime_configurations}
+        self.regimes = list(next(iter(self.rule_sets.values())).keys())
+        self._band_rows = np.array([self.regimes.index(regime) for regime in self.band_regimes])
+
+        self.vix_sorted = dataset.vix_sorted
+        self.prefix: Dict[str, Dict[str, np.ndarray]] = {
+            name: self._build_prefix_sums(configurations) for name, configurations in self.rule_sets.items()
+        }
+
+    def regime_outcomes(self, regime_configurations: Dict) -> np.ndarray:
+        """Trade returns (regimes x trades) with every trade forced into every regime"""
+        overlay = IntegratedRiskOverlay()
+        overlay.regime_configurations = regime_configurations
+
+        outcomes = np.empty((len(self.regimes), len(self.dataset)))
+        for index in range(len(self.dataset)):
+            trade = self.dataset.trade(index)
+            for row, regime in enumerate(self.regimes):
+                trade["regime"] = regime
+                outcomes[row, index] = evaluate_trade_layers(trade, overlay)[self.layer][0]
+        return outcomes
+
+    def _build_prefix_sums(self, regime_configurations: Dict) -> Dict[str, np.ndarray]:
+        outcomes = self.regime_outcomes(regime_configurations)[:, self.dataset.vix_order]
+        zeros = np.zeros((outcomes.shape[0], 1))
+        return {
+            "sum": np.hstack([zeros, np.cumsum(outcomes, axis=1)]),
+            "sum_sq": np.hstack([zeros, np.cumsum(outcomes ** 2, axis=1)]),
+            "wins": np.hstack([zeros, np.cumsum(outcomes > 0, axis=1)])
+        }
+
+    def band_bounds(self, thresholds: np.ndarray) -> np.ndarray:
+        """Sorted-trade index bounds (K, 6) of the 5 bands of each threshold tuple"""
+        thresholds = np.atleast_2d(np.asarray(thresholds, dtype=float))
+        inner = np.searchsorted(self.vix_sorted, thresholds, side="left")
+        bounds = np.zeros((len(thresholds), 6), dtype=np.int64)
+        bounds[:, 1:5] = inner
+        bounds[:, 5] = len(self.vix_sorted)
+        return bounds
+
+    def score(self, thresholds, rule_set: str = "default", risk_free_rate: float = 0.02) -> Dict[str, np.ndarray]:
+        """
+        Score threshold tuples under one rule set
+
+        Args:
+            thresholds: (K, 4) array-like of (t1, t2, t3, t4); tuples that are not
+                non-decreasing score NaN
+            rule_set: Name of the candidate rule set
+            risk_free_rate: Annual risk-free rate for the Sharpe ratio
+
+        Returns:
+            Dict of (K,) arrays: total_return, avg_return_per_trade, win_rate, volatility,
+            sharpe_ratio and trades per band (K, 5)
+        """
+        thresholds = np.atleast_2d(np.asarray(thresholds, dtype=float))
+        prefix = self.prefix[rule_set]
+        bounds = self.band_bounds(thresholds)
+        lo, hi = bounds[:, :-1], bounds[:, 1:]
+        rows = np.broadcast_to(self._band_rows, lo.shape)
+
+        total = (prefix["sum"][rows, hi] - prefix["sum"][rows, lo]).sum(axis=1)
+        total_sq = (prefix["sum_sq"][rows, hi] - prefix["sum_sq"][rows, lo]).sum(axis=1)
+        wins = (prefix["wins"][rows, hi] - prefix["wins"][rows, lo]).sum(axis=1)
+
+        count = len(self.vix_sorted)
+        mean = total / count if count else np.zeros_like(total)
+        std = np.sqrt(np.maximum(total_sq / count - mean ** 2, 0.0)) if count else np.zeros_like(total)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = np.where(std > 0, (mean - risk_free_rate / 252) / std * np.sqrt(252), 0.0)
+
+        valid = np.all(np.diff(thresholds, axis=1) >= 0, axis=1)
+        result = {
+            "total_return": total,
+            "avg_return_per_trade": mean,
+            "win_rate": wins / count if count else np.zeros_like(total),
+            "volatility": std,
+            "sharpe_ratio": sharpe
+        }
+        for name in result:
+            result[name] = np.where(valid, result[name], np.nan)
+        result["band_trades"] = hi - lo
+        return result
+
+    def score_all(self, thresholds, risk_free_rate: float = 0.02) -> Dict[str, Dict[str, np.ndarray]]:
+        """Score threshold tuples under every candidate rule set"""
+        return {name: self.score(thresholds, name, risk_free_rate) for name in self.rule_sets}
+
+    def best(self, thresholds, metric: str = "total_return", top_n: int = 10) -> List[Dict]:
+        """Best (rule set, threshold tuple) combinations by a metric"""
+        thresholds = np.atleast_2d(np.asarray(thresholds, dtype=float))
+        candidates: List[Tuple[float, str, int, Dict]] = []
+        for name, scores in self.score_all(thresholds).items():
+            values = np.nan_to_num(scores[metric], nan=-np.inf)
+            for index in np.argsort(values)[::-1][:top_n]:
+                candidates.append((values[index], name, int(index), scores))
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        return [
+            {
+                "rule_set": name,
+                "vix_thresholds": tuple(float(t) for t in thresholds[index]),
+                **{key: float(value[index]) for key, value in scores.items() if key != "band_trades"},
+                "band_trades": scores["band_trades"][index].tolist()
+            }
+            for _, name, index, scores in candidates[:top_n]
+        ]
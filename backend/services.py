@@ -196,8 +196,11 @@ class RiskManagementService:
         try:
             logger.info(f"Starting enhanced backtest with {len(historical_data)} data points")
             
-            # Run core backtest
-            backtest_results = self.backtest_engine.run_comprehensive_backtest(
+            # Run core backtest in a worker thread so the event loop keeps serving requests
+            loop = asyncio.get_running_loop()
+            backtest_results = await loop.run_in_executor(
+                None,
+                self.backtest_engine.run_comprehensive_backtest,
                 historical_data,
                 config_overrides or {}
             )
@@ -0,0 +1,146 @@
+"""
+Async Database Access for BIDBACK Trading Tool
+Runs blocking sqlite3 work on a dedicated bounded thread pool so async FastAPI
+handlers never block the event loop; every call has a timeout
+"""
+
+import asyncio
+import functools
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .connection import DatabaseConnection, MarketBreadthQueries
+
+logger = logging.getLogger(__name__)
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when a database call does not finish within its timeout"""
+
+class AsyncDatabase:
+    """
+    Awaitable access to a DatabaseConnection
+
+    Calls run on their own thread pool (sized like the connection pool by default),
+    so slow queries cannot starve the default executor. A call that exceeds its
+    timeout raises QueryTimeoutError; its statement is interrupted through the
+    connection pool deadline so the worker thread is freed as well.
+    """
+
+    def __init__(self, db: DatabaseConnection, max_workers: Optional[int] = None,
+                 default_timeout: float = 5.0):
+        """
+        Args:
+            db: Pooled database connection
+            max_workers: Worker threads (default: connection pool size)
+            default_timeout: Seconds per call when no timeout is given
+        """
+        self.db = db
+        self.default_timeout = default_timeout
+        self.max_workers = max_workers or db.pool.max_connections
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="db-query")
+        self.stats = {"calls": 0, "timeouts": 0, "errors": 0}
+
+    def _call_with_deadline(self, timeout: float, fn: Callable, args, kwargs):
+        with self.db.pool.deadline(timeout):
+            try:
+                return fn(*args, **kwargs)
+            except sqlite3.OperationalError as e:
+                if str(e) == "interrupted":
+                    raise QueryTimeoutError(f"Database query timed out after {timeout}s") from e
+                raise
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a blocking database function on the query pool
+
+        Args:
+            fn: Callable doing sqlite3 work (through self.db)
+            timeout: Seconds before QueryTimeoutError (default: default_timeout)
+        """
+        timeout = timeout or self.default_timeout
+        self.stats["calls"] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, functools.partial(self._call_with_deadline, timeout, fn, args, kwargs)
+        )
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except (asyncio.TimeoutError, QueryTimeoutError):
+            self.stats["timeouts"] += 1
+            name = getattr(fn, "__name__", repr(fn))
+            logger.warning(f"Database call {name} timed out after {timeout}s")
+            raise QueryTimeoutError(f"Database query timed out after {timeout}s")
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+
+    async def execute_query(self, query: str, params: tuple = None, mode: str = "dict",
+                            timeout: Optional[float] = None) -> Any:
+        return await self.run(self.db.execute_query, query, params, mode, timeout=timeout)
+
+    async def execute_single(self, query: str, params: tuple = None,
+                             timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return await self.run(self.db.execute_single, query, params, timeout=timeout)
+
+    async def execute_write(self, query: str, params: tuple = None,
+                            timeout: Optional[float] = None) -> int:
+        return await self.run(self.db.execute_write, query, params, timeout=timeout)
+
+    def status(self) -> Dict[str, Any]:
+        return {"max_workers": self.max_workers, "default_timeout": self.default_timeout, **self.stats}
+
+    def shutdown(self):
+        """Stop accepting calls and wait for running ones"""
+        self.executor.shutdown(wait=True)
+
+class AsyncMarketBreadthQueries:
+    """
+    Awaitable versions of the MarketBreadthQueries methods
+
+    Wraps a shared MarketBreadthQueries, so its breadth mirror, ATR percentile
+    index and result cache serve the awaitable calls as well.
+    """
+
+    def __init__(self, adb: AsyncDatabase, queries: Optional[MarketBreadthQueries] = None):
+        """
+        Args:
+            adb: Query pool the calls run on
+            queries: Shared query object (default: plain queries on adb.db)
+        """
+        self.adb = adb
+        self.queries = queries if queries is not None else MarketBreadthQueries(adb.db)
+
+    async def get_latest_breadth_data(self, days: int = 30, anchor_date: Optional[Union[str, date]] = None,
+                                      timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return await self.adb.run(self.queries.get_latest_breadth_data, days, anchor_date, timeout=timeout)
+
+    async def get_true_range_data(self, days: int = 252, anchor_date: Optional[Union[str, date]] = None,
+                                  timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return await self.adb.run(self.queries.get_true_range_data, days, anchor_date, timeout=timeout)
+
+    async def get_breadth_indicators_for_date(self, target_date: Union[str, date],
+                                              timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return await self.adb.run(self.queries.get_breadth_indicators_for_date, target_date, timeout=timeout)
+
+    async def get_regime_analysis(self, days: int = 90, anchor_date: Optional[Union[str, date]] = None,
+                                  timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        return await self.adb.run(self.queries.get_regime_analysis, days, anchor_date, timeout=timeout)
+
+    async def calculate_atr_percentile(self, current_atr: float, lookback_days: int = 252,
+                                       anchor_date: Optional[Union[str, date]] = None,
+                                       timeout: Optional[float] = None) -> float:
+        return await self.adb.run(self.queries.calculate_atr_percentile, current_atr, lookback_days,
+                                  anchor_date, timeout=timeout)
+
+    async def get_volatility_context(self, days: int = 20, anchor_date: Optional[Union[str, date]] = None,
+                                     timeout: Optional[float] = None) -> Dict[str, Any]:
+        return await self.adb.run(self.queries.get_volatility_context, days, anchor_date, timeout=timeout)
+
+__all__ = [
+    'QueryTimeoutError',
+    'AsyncDatabase',
+    'AsyncMarketBreadthQueries'
+]
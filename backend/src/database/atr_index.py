@@ -0,0 +1,174 @@
+"""
+ATR Percentile Index for BIDBACK Trading Tool
+In-memory order-statistic index over average_true_range_14. Percentile ranks for
+any lookback window are answered from sorted blocks (merge-sort tree) with
+bisection instead of a COUNT(CASE ...) scan, and the index follows appends and
+recomputed tails through the DatabaseConnection write notifications
+"""
+
+import bisect
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from .connection import DatabaseConnection
+
+logger = logging.getLogger(__name__)
+
+# Full rebuild marker for pending changes
+_REBUILD = ""
+
+class SortedBlockIndex:
+    """
+    Merge-sort tree over an append-only sequence
+
+    Level k holds the sequence in aligned blocks of 2**k positions, each sorted.
+    A position range splits into at most 2 log2(n) aligned blocks, so counting the
+    values <= x in it takes O(log^2 n) with bisect (microseconds for decades of
+    daily rows). A block is built once, when its last position is appended;
+    truncating drops the blocks that reach past the cut.
+    """
+
+    def __init__(self):
+        self._levels: List[List[List[float]]] = [[]]
+
+    def __len__(self) -> int:
+        return len(self._levels[0])
+
+    def append(self, value: float):
+        n = len(self._levels[0])
+        self._levels[0].append([value])
+        k = 1
+        while (n + 1) % (1 << k) == 0:
+            if len(self._levels) <= k:
+                self._levels.append([])
+            lower = self._levels[k - 1]
+            self._levels[k].append(sorted(lower[-2] + lower[-1]))
+            k += 1
+
+    def truncate(self, length: int):
+        """Keep the first length positions"""
+        for k, level in enumerate(self._levels):
+            del level[length >> k:]
+
+    def count_at_most(self, value: float, start: int = 0, stop: Optional[int] = None) -> int:
+        """Number of values <= value at positions start..stop-1"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        count = 0
+        while start < stop:
+            # Largest aligned block starting at start that fits in the range
+            size = start & -start if start else 1 << (len(self._levels) - 1)
+            while size > stop - start:
+                size >>= 1
+            k = size.bit_length() - 1
+            count += bisect.bisect_right(self._levels[k][start >> k], value)
+            start += size
+        return count
+
+class AtrPercentileIndex:
+    """
+    Percentile ranks of ATR values over date-bounded lookbacks
+
+    Rows with a 14-day ATR are indexed in date order. A write notification with a
+    first changed date marks the tail from that date; the next query truncates
+    the index there and appends the current rows (an appended day costs one row
+    read). Notifications without a date trigger a full rebuild, as do writes by
+    importers and other processes, which the DatabaseConnection detects through
+    the persistent data version polled before each query.
+    """
+
+    def __init__(self, db: DatabaseConnection, column: str = 'average_true_range_14'):
+        self.db = db
+        self.column = column
+        self.dates: List[str] = []
+        self.tree = SortedBlockIndex()
+        self._pending: Optional[str] = _REBUILD
+        self._lock = threading.Lock()
+        self.rebuilds = 0
+        self.appended = 0
+        db.add_write_listener(self._on_write)
+
+    def _on_write(self, table: Optional[str], from_date: Optional[str] = None):
+        # table is None for external writes
+        if table not in (None, 'market_breadth_daily'):
+            return
+        with self._lock:
+            if from_date is None or self._pending == _REBUILD:
+                self._pending = _REBUILD
+            elif self._pending is None or from_date < self._pending:
+                self._pending = from_date
+
+    def _sync(self):
+        """Apply pending changes (caller holds the lock)"""
+        from_date, self._pending = self._pending, None
+        started = time.perf_counter()
+        if from_date == _REBUILD:
+            keep = 0
+            self.rebuilds += 1
+        else:
+            keep = bisect.bisect_left(self.dates, from_date)
+        del self.dates[keep:]
+        self.tree.truncate(keep)
+
+        try:
+            with self.db.get_connection() as conn:
+                rows = conn.execute(f"""
+                    SELECT date, {self.column} FROM market_breadth_daily
+                    WHERE date > ? AND {self.column} IS NOT NULL
+                    ORDER BY date
+                """, (self.dates[-1] if self.dates else '',)).fetchall()
+        except Exception:
+            self._pending = _REBUILD
+            raise
+        for row_date, value in rows:
+            self.dates.append(row_date)
+            self.tree.append(value)
+        self.appended += len(rows)
+        logger.debug(f"ATR index synced from {from_date or 'start'}: {len(rows)} rows "
+                     f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    def percentile(self, value: float, start_date: Optional[Union[str, date]] = None,
+                   end_date: Optional[Union[str, date]] = None) -> float:
+        """
+        Percentile rank (0-100) of value among the ATRs dated start_date to end_date
+        (both inclusive and optional), as calculate_atr_percentile (share of
+        values <= value; 0.0 without data)
+        """
+        if isinstance(start_date, date):
+            start_date = start_date.strftime('%Y-%m-%d')
+        if isinstance(end_date, date):
+            end_date = end_date.strftime('%Y-%m-%d')
+        self.db.check_external_writes()
+        with self._lock:
+            if self._pending is not None:
+                self._sync()
+            start = bisect.bisect_left(self.dates, str(start_date)) if start_date is not None else 0
+            stop = bisect.bisect_right(self.dates, str(end_date)) if end_date is not None else len(self.dates)
+            total = stop - start
+            if total <= 0:
+                return 0.0
+            return self.tree.count_at_most(value, start, stop) * 100.0 / total
+
+    def lookback_percentile(self, value: float, lookback_days: int,
+                            anchor_date: Optional[Union[str, date]] = None) -> float:
+        """Percentile over the window date(anchor_date, '-lookback_days days') to anchor_date"""
+        if anchor_date is None:
+            anchor_date = date.today()
+        elif isinstance(anchor_date, str):
+            anchor_date = date.fromisoformat(anchor_date)
+        return self.percentile(value, anchor_date - timedelta(days=int(lookback_days)), anchor_date)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "rows": len(self.dates),
+            "pending": self._pending,
+            "rebuilds": self.rebuilds,
+            "rows_read": self.appended
+        }
+
+__all__ = [
+    'SortedBlockIndex',
+    'AtrPercentileIndex'
+]
@@ -0,0 +1,209 @@
+"""
+Market Breadth Mirror for BIDBACK Trading Tool
+Process-local columnar copy of market_breadth_daily. The table is small (one row
+per trading day), so it is held as NumPy arrays sorted by date; point lookups and
+date-range slices are binary searches instead of SQLite round trips
+"""
+
+import logging
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .connection import DatabaseConnection, _convert_value, rows_to_columns
+
+logger = logging.getLogger(__name__)
+
+BREADTH_TABLE = "market_breadth_daily"
+
+DateLike = Union[str, date, np.datetime64]
+
+def _day(value: DateLike) -> np.datetime64:
+    """Date as datetime64[D]; raises ValueError for unparsable input"""
+    if isinstance(value, date):
+        value = value.strftime('%Y-%m-%d')
+    return np.datetime64(value, 'D')
+
+def _present(values: np.ndarray) -> np.ndarray:
+    """Mask of non-NULL entries of a mirrored column"""
+    if values.dtype.kind == 'f':
+        return ~np.isnan(values)
+    if values.dtype.kind == 'M':
+        return ~np.isnat(values)
+    if values.dtype.kind == 'O':
+        return np.array([value is not None for value in values], dtype=bool)
+    return np.ones(len(values), dtype=bool)
+
+class BreadthSnapshot:
+    """
+    Immutable state of the table at load time
+
+    rows keeps the raw tuples (column order of SELECT *), so results are the
+    same values a query would return; columns holds the NumPy view for
+    vectorized work. Readers keep using a snapshot while a newer one is loaded.
+    """
+
+    def __init__(self, names: List[str], rows: List[tuple], version: int):
+        self.names = names
+        self.rows = rows
+        self.columns = rows_to_columns(names, rows)
+        self.dates = self.columns['date'].astype('datetime64[D]') if rows else np.array([], dtype='datetime64[D]')
+        self.index = {name: i for i, name in enumerate(names)}
+        self.version = version
+        self.loaded_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def position(self, target_date: DateLike) -> Optional[int]:
+        """Row position of a date, None if there is no row for it"""
+        day = _day(target_date)
+        i = int(np.searchsorted(self.dates, day))
+        return i if i < len(self.dates) and self.dates[i] == day else None
+
+    def window(self, start_date: Optional[DateLike] = None, end_date: Optional[DateLike] = None) -> slice:
+        """Row positions with start_date <= date <= end_date (bounds inclusive, optional)"""
+        start = int(np.searchsorted(self.dates, _day(start_date), side='left')) if start_date is not None else 0
+        stop = int(np.searchsorted(self.dates, _day(end_date), side='right')) if end_date is not None else len(self.dates)
+        return slice(start, max(start, stop))
+
+    def row(self, target_date: DateLike) -> Optional[tuple]:
+        i = self.position(target_date)
+        return self.rows[i] if i is not None else None
+
+    def row_dict(self, i: int) -> Dict[str, Any]:
+        """Row as execute_query would return it in dict mode"""
+        return {name: _convert_value(name, value) for name, value in zip(self.names, self.rows[i])}
+
+    def positions(self, start_date: Optional[DateLike] = None, end_date: Optional[DateLike] = None,
+                  require: Optional[str] = None, newest_first: bool = False,
+                  limit: Optional[int] = None) -> np.ndarray:
+        """
+        Row positions in a date range
+
+        Args:
+            require: Only rows where this column is not NULL
+            newest_first: Descending date order
+            limit: Maximum number of positions
+        """
+        span = self.window(start_date, end_date)
+        positions = np.arange(span.start, span.stop)
+        if require is not None:
+            positions = positions[_present(self.columns[require][span])]
+        if newest_first:
+            positions = positions[::-1]
+        return positions[:limit] if limit is not None else positions
+
+    def select(self, *args, **kwargs) -> List[tuple]:
+        """Raw rows for positions(*args, **kwargs)"""
+        return [self.rows[i] for i in self.positions(*args, **kwargs)]
+
+    def column(self, name: str, start_date: Optional[DateLike] = None,
+               end_date: Optional[DateLike] = None) -> np.ndarray:
+        """Slice of one column (a view, do not modify)"""
+        return self.columns[name][self.window(start_date, end_date)]
+
+    def coverage(self, start_date: Optional[DateLike] = None, end_date: Optional[DateLike] = None,
+                 names: Tuple[str, ...] = ()) -> Dict[str, Any]:
+        """Record count, date range and non-NULL percentage per column in a date range"""
+        span = self.window(start_date, end_date)
+        count = span.stop - span.start
+        return {
+            "total_records": count,
+            "date_range_start": self.rows[span.start][self.index['date']] if count else None,
+            "date_range_end": self.rows[span.stop - 1][self.index['date']] if count else None,
+            "has_data_percentage": {
+                name: float(_present(self.columns[name][span]).sum()) * 100.0 / count if count else None
+                for name in names
+            }
+        }
+
+class BreadthMirror:
+    """
+    Keeps the current BreadthSnapshot of market_breadth_daily
+
+    Writes made through TradingDataQueries notify the DatabaseConnection, which
+    invalidates the mirror; the next read reloads the table. Writes by importers
+    and other processes are found through the persistent data version, which
+    snapshot() has the DatabaseConnection re-read at most every
+    external_check_interval seconds. Direct sqlite3 writes in this process that
+    do not bump the data version must call invalidate() themselves.
+    """
+
+    def __init__(self, db: DatabaseConnection):
+        self.db = db
+        self._snapshot: Optional[BreadthSnapshot] = None
+        self._version = 0
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.invalidations = 0
+        db.add_write_listener(self._on_write)
+
+    def _on_write(self, table: Optional[str], from_date: Optional[str] = None):
+        # table is None for external writes
+        if table in (None, BREADTH_TABLE):
+            self.invalidate()
+
+    @property
+    def stale(self) -> bool:
+        snapshot = self._snapshot
+        return snapshot is None or snapshot.version != self._version
+
+    def invalidate(self):
+        """Mark the loaded snapshot outdated"""
+        with self._lock:
+            self._version += 1
+            self.invalidations += 1
+
+    def load(self) -> BreadthSnapshot:
+        """Read the whole table into a new snapshot"""
+        version = self._version
+        started = time.perf_counter()
+        with self.db.get_connection() as conn:
+            cursor = conn.execute(f"SELECT * FROM {BREADTH_TABLE} ORDER BY date")
+            cursor.row_factory = None
+            names = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        snapshot = BreadthSnapshot(names, rows, version)
+
+        with self._lock:
+            # A write during the load leaves the version ahead, so the next read reloads again
+            if self._snapshot is None or self._snapshot.version <= version:
+                self._snapshot = snapshot
+            self.loads += 1
+        logger.info(f"Breadth mirror loaded {len(rows)} rows in {(time.perf_counter() - started) * 1000:.1f} ms")
+        return snapshot
+
+    def snapshot(self, check_external: bool = True) -> BreadthSnapshot:
+        """
+        Current snapshot, reloaded first if a write invalidated it
+
+        Args:
+            check_external: Poll the persistent data version first (may read the
+                database); False answers from memory unless the mirror is stale
+        """
+        if check_external:
+            self.db.check_external_writes()
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self._version:
+            snapshot = self.load()
+        return snapshot
+
+    def status(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {
+            "rows": len(snapshot) if snapshot else 0,
+            "stale": self.stale,
+            "loads": self.loads,
+            "invalidations": self.invalidations,
+            "loaded_at": snapshot.loaded_at if snapshot else None
+        }
+
+__all__ = [
+    'BREADTH_TABLE',
+    'BreadthSnapshot',
+    'BreadthMirror'
+]
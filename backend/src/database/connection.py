@@ -5,25 +5,307 @@ Provides high-performance SQLite connections for Python Risk Management backend
 
 import sqlite3
 import json
+import queue
+import threading
+import time
+from collections.abc import Mapping
 from contextlib import contextmanager
-from typing import List, Dict, Any, Optional, Union
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Tuple, Union
 from datetime import datetime, date
 from pathlib import Path
 import logging
 from decimal import Decimal
 
+import numpy as np
+
+from .data_version import bump_data_version, read_data_version
+from .derived_metrics import recompute_derived_metrics
+from .query_registry import QueryRegistry
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# PRAGMAs applied once when a pooled connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -64000",  # 64MB cache
+    "PRAGMA temp_store = MEMORY",
+)
+
+# Result modes of DatabaseConnection.execute_query
+FETCH_MODES = ("dict", "tuple", "lazy", "columnar")
+
+def _is_date_column(key: str) -> bool:
+    return key.endswith(('_at', 'date'))
+
+def _convert_value(key: str, value: Any) -> Any:
+    """Date/datetime conversion of one value (as _convert_row_to_dict)"""
+    if isinstance(value, str) and _is_date_column(key):
+        try:
+            if 'T' in value or ' ' in value:
+                return datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            return value
+    return value
+
+class LazyRow(Mapping):
+    """
+    Read-only dict-like view of a result row
+    
+    Values are converted (dates parsed) only when accessed, so rows that are
+    filtered out or only partly read cost no conversion.
+    """
+    
+    __slots__ = ('_row', '_index')
+    
+    def __init__(self, row: tuple, index: Dict[str, int]):
+        self._row = row
+        self._index = index
+    
+    def __getitem__(self, key: str) -> Any:
+        return _convert_value(key, self._row[self._index[key]])
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+    
+    def __len__(self) -> int:
+        return len(self._index)
+    
+    def __repr__(self) -> str:
+        return f"LazyRow({dict(self)})"
+
+def _to_array(key: str, values: Sequence[Any]) -> np.ndarray:
+    """One result column as a NumPy array (dates as datetime64, NULL as NaN/NaT)"""
+    sample = next((value for value in values if value is not None), None)
+    if sample is None:
+        return np.full(len(values), np.nan)
+    if isinstance(sample, str) and _is_date_column(key):
+        unit = 's' if ('T' in sample or ' ' in sample) else 'D'
+        try:
+            return np.array([value if value is None else value.replace('Z', '') for value in values],
+                            dtype=f'datetime64[{unit}]')
+        except ValueError:
+            return np.array(values, dtype=object)
+    if isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        # DECIMAL affinity stores whole numbers as INTEGER, so one column can mix
+        # int and float rows; int64 only when every value is an int
+        if all(type(value) is int for value in values):
+            try:
+                return np.array(values, dtype=np.int64)
+            except (OverflowError, TypeError):
+                pass
+        try:
+            return np.array(values, dtype=np.float64)
+        except (TypeError, ValueError):
+            pass
+    return np.array(values, dtype=object)
+
+def rows_to_columns(names: Sequence[str], rows: List[tuple]) -> Dict[str, np.ndarray]:
+    """
+    Columnar form of a result: one array per column
+    
+    Columns holding only integers (no NULLs, no floats in any row) stay int64,
+    other numeric columns become float64 with NaN for NULL, date columns
+    datetime64[D] (datetime64[s] for timestamps) with NaT for NULL, and
+    everything else an object array. Columns that are entirely NULL come back
+    as float64 NaN.
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    return {name: _to_array(name, values) for name, values in zip(names, columns)}
+
+class PoolClosedError(RuntimeError):
+    """Raised when a connection is requested from a closed pool"""
+
+class ConnectionPool:
+    """
+    Pool of long-lived SQLite connections
+    
+    Connections are opened lazily up to max_connections, configured once and keep
+    their page cache between queries. A thread checks out one connection at a time;
+    nested checkouts in the same thread reuse it. Connections idle for longer than
+    health_check_interval are probed with SELECT 1 and replaced if broken.
+    Statements running past a deadline set with deadline() are interrupted.
+    """
+    
+    def __init__(self, db_path: Path, max_connections: int = 8,
+                 checkout_timeout: float = 30.0, health_check_interval: float = 60.0,
+                 **connection_settings):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+        self.connection_settings = connection_settings
+        
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._opened = 0
+        self._checked_out = 0
+        self._closed = False
+        self.stats = {"checkouts": 0, "connections_opened": 0, "health_checks": 0,
+                      "connections_replaced": 0, "wait_timeouts": 0}
+    
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), **self.connection_settings)
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.set_progress_handler(self._past_deadline, 10000)
+        self.stats["connections_opened"] += 1
+        return conn
+    
+    def _past_deadline(self) -> int:
+        """Progress handler: non-zero aborts the running statement"""
+        deadline = getattr(self._local, "deadline", None)
+        return 1 if deadline is not None and time.monotonic() > deadline else 0
+    
+    @contextmanager
+    def deadline(self, seconds: Optional[float]):
+        """Interrupt statements of the current thread that run past seconds from now"""
+        previous = getattr(self._local, "deadline", None)
+        self._local.deadline = time.monotonic() + seconds if seconds else None
+        try:
+            yield
+        finally:
+            self._local.deadline = previous
+    
+    def _healthy(self, conn: sqlite3.Connection, idle_since: float) -> bool:
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        self.stats["health_checks"] += 1
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+    
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._opened -= 1
+    
+    def _acquire(self) -> sqlite3.Connection:
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            if self._closed:
+                raise PoolClosedError("Connection pool is closed")
+            try:
+                conn, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_open = self._opened < self.max_connections
+                    if can_open:
+                        self._opened += 1
+                if can_open:
+                    try:
+                        return self._open()
+                    except Exception:
+                        with self._lock:
+                            self._opened -= 1
+                        raise
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.stats["wait_timeouts"] += 1
+                    raise TimeoutError(f"No database connection available within {self.checkout_timeout}s")
+                try:
+                    conn, idle_since = self._idle.get(timeout=min(remaining, 0.5))
+                except queue.Empty:
+                    continue
+            
+            if self._healthy(conn, idle_since):
+                return conn
+            logger.warning("Replacing unhealthy pooled database connection")
+            self.stats["connections_replaced"] += 1
+            self._discard(conn)
+    
+    def _release(self, conn: sqlite3.Connection, broken: bool = False):
+        if conn.in_transaction:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                broken = True
+        if broken or self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put((conn, time.monotonic()))
+        with self._lock:
+            self._checked_out -= 1
+            self._released.notify_all()
+    
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the current thread"""
+        held = getattr(self._local, "held", None)
+        if held is not None:
+            # Nested checkout in the same thread
+            self._local.depth += 1
+            try:
+                yield held
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn = self._acquire()
+        with self._lock:
+            self._checked_out += 1
+        self.stats["checkouts"] += 1
+        self._local.held, self._local.depth = conn, 1
+        broken = False
+        try:
+            yield conn
+        except (sqlite3.InternalError, sqlite3.NotSupportedError):
+            broken = True  # Connection state is unknown, do not reuse it
+            raise
+        finally:
+            self._local.held = None
+            self._release(conn, broken)
+    
+    def close(self, timeout: float = 10.0):
+        """Stop checkouts, wait for checked-out connections and close all connections"""
+        self._closed = True
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._checked_out > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning(f"Closing pool with {self._checked_out} connections still checked out")
+                    break
+                self._released.wait(remaining)
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+    
+    def status(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "open_connections": self._opened,
+            "checked_out": self._checked_out,
+            "idle": self._idle.qsize(),
+            "closed": self._closed,
+            **self.stats
+        }
+
 class DatabaseConnection:
     """High-performance SQLite connection manager for trading data"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = 8, external_check_interval: float = 1.0):
         """
         Initialize database connection
         
         Args:
             db_path: Path to SQLite database file
+            pool_size: Maximum number of pooled connections
+            external_check_interval: Seconds between reads of the persistent data version
         """
         if db_path is None:
             self.db_path = Path(__file__).parent / "trading.db"
@@ -38,70 +320,162 @@ class DatabaseConnection:
             'timeout': 30.0,  # 30 second timeout
             'check_same_thread': False,  # Allow multi-threading
             'isolation_level': None,  # Autocommit mode for better performance
+            'cached_statements': 256,  # Prepared statements kept per connection
         }
+        
+        # Named, parameterized queries with per-query timing
+        self.registry = QueryRegistry()
+        
+        # Long-lived connections (PRAGMAs and page cache survive between queries)
+        self.pool = ConnectionPool(self.db_path, max_connections=pool_size, **self.connection_settings)
+        
+        # Callbacks (table name, first changed date) run after writes made through the query classes
+        self._write_listeners: List[Callable[[str, Optional[str]], None]] = []
+        
+        # Writes notified in this process, including detected external writes
+        self.data_version = 0
+        
+        # Persistent data version last seen (bumped by importers and other processes)
+        self.external_check_interval = external_check_interval
+        self.persistent_version: Optional[int] = None
+        self._persistent_checked = 0.0
+        self._version_lock = threading.Lock()
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections with performance optimization"""
-        conn = None
+        """Context manager for pooled database connections"""
         try:
-            conn = sqlite3.connect(str(self.db_path), **self.connection_settings)
-            
-            # Set row factory for dictionary-like access
-            conn.row_factory = sqlite3.Row
-            
-            # Performance optimizations
-            conn.execute("PRAGMA foreign_keys = ON")
-            conn.execute("PRAGMA journal_mode = WAL")
-            conn.execute("PRAGMA synchronous = NORMAL")
-            conn.execute("PRAGMA cache_size = -64000")  # 64MB cache
-            conn.execute("PRAGMA temp_store = MEMORY")
-            
-            yield conn
-            
+            with self.pool.connection() as conn:
+                yield conn
         except Exception as e:
-            if conn:
-                conn.rollback()
             logger.error(f"Database connection error: {str(e)}")
             raise
-        finally:
-            if conn:
-                conn.close()
+    
+    def close(self, timeout: float = 10.0):
+        """Close all pooled connections (waits for running queries up to timeout)"""
+        self.pool.close(timeout)
+    
+    def add_write_listener(self, listener: Callable[[Optional[str], Optional[str]], None]):
+        """
+        Register a callback run with (table, from_date) after each notified write
+        
+        Writes detected through the persistent data version (importers, other
+        processes) are reported as (None, None): any table may have changed.
+        """
+        self._write_listeners.append(listener)
+    
+    def _notify_listeners(self, table: Optional[str], from_date: Optional[str]):
+        for listener in self._write_listeners:
+            try:
+                listener(table, from_date)
+            except Exception as e:
+                logger.error(f"Write listener failed for {table or 'external write'}: {e}")
+    
+    def notify_write(self, table: str, from_date: Optional[str] = None):
+        """
+        Tell listeners (caches, mirrors, indexes) that a table changed
+        
+        Args:
+            table: Changed table
+            from_date: Earliest date whose rows changed (None if unknown)
+        """
+        external = False
+        with self._version_lock:
+            self.data_version += 1
+            try:
+                # Persistent counter for caches in other processes
+                with self.get_connection() as conn:
+                    version = bump_data_version(conn)
+                # A gap means another process wrote since the last check
+                external = self.persistent_version is not None and version != (self.persistent_version + 1) % 2 ** 31
+                self.persistent_version = version
+                self._persistent_checked = time.monotonic()
+            except sqlite3.Error as e:
+                logger.error(f"Could not bump data version after write to {table}: {e}")
+        
+        if external:
+            self._notify_listeners(None, None)
+        self._notify_listeners(table, from_date)
+    
+    @property
+    def external_check_due(self) -> bool:
+        """Whether check_external_writes would read the persistent data version (no I/O)"""
+        return (self.persistent_version is None
+                or time.monotonic() - self._persistent_checked >= self.external_check_interval)
+    
+    def check_external_writes(self, force: bool = False) -> bool:
+        """
+        Re-read the persistent data version if external_check_interval has passed
+        
+        A version other than the last one seen means an importer or another
+        process wrote to the database: data_version is bumped and listeners are
+        notified with (None, None). The first read only records the version.
+        
+        Args:
+            force: Read even if the interval has not passed
+            
+        Returns:
+            True if an external write was detected
+        """
+        if not force and not self.external_check_due:
+            return False
+        with self._version_lock:
+            if not force and not self.external_check_due:
+                return False
+            with self.get_connection() as conn:
+                version = read_data_version(conn)
+            previous, self.persistent_version = self.persistent_version, version
+            self._persistent_checked = time.monotonic()
+            changed = previous is not None and version != previous
+            if changed:
+                self.data_version += 1
+        if changed:
+            logger.info(f"External write detected (data version {previous} -> {version})")
+            self._notify_listeners(None, None)
+        return changed
     
     def _convert_row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
         """Convert SQLite Row to dictionary with proper type handling"""
         if row is None:
             return {}
         
-        result = {}
-        for key in row.keys():
-            value = row[key]
-            
-            # Handle date/datetime conversion
-            if isinstance(value, str) and key.endswith(('_at', 'date')):
-                try:
-                    if 'T' in value or ' ' in value:
-                        result[key] = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                    else:
-                        result[key] = datetime.strptime(value, '%Y-%m-%d').date()
-                except ValueError:
-                    result[key] = value
-            else:
-                result[key] = value
-        
-        return result
+        # Handle date/datetime conversion
+        return {key: _convert_value(key, row[key]) for key in row.keys()}
     
-    def execute_query(self, query: str, params: tuple = None) -> List[Dict[str, Any]]:
+    def _shape_result(self, cursor: sqlite3.Cursor, mode: str):
+        """Fetch all rows of an executed cursor in the requested result mode"""
+        if mode == "dict":
+            return [self._convert_row_to_dict(row) for row in cursor.fetchall()]
+        
+        # The other modes skip sqlite3.Row and work on plain tuples
+        cursor.row_factory = None
+        names = [column[0] for column in cursor.description or ()]
+        rows = cursor.fetchall()
+        if mode == "tuple":
+            return rows
+        if mode == "lazy":
+            index = {name: i for i, name in enumerate(names)}
+            return [LazyRow(row, index) for row in rows]
+        return rows_to_columns(names, rows)
+    
+    def execute_query(self, query: str, params: tuple = None,
+                      mode: str = "dict") -> Union[List[Dict[str, Any]], List[Tuple], List[LazyRow], Dict[str, np.ndarray]]:
         """
-        Execute SELECT query and return results as list of dictionaries
+        Execute SELECT query and return results
         
         Args:
             query: SQL query string
             params: Query parameters
+            mode: Result mode - "dict" (converted dicts), "tuple" (raw tuples in
+                column order), "lazy" (LazyRow, converted on access) or
+                "columnar" (dict of one NumPy array per column, for bulk reads)
             
         Returns:
-            List of dictionaries representing query results
+            Query results in the requested mode (list of dictionaries by default)
         """
+        if mode not in FETCH_MODES:
+            raise ValueError(f"Unknown fetch mode {mode}, expected one of {FETCH_MODES}")
+        
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
@@ -110,8 +484,7 @@ class DatabaseConnection:
             else:
                 cursor.execute(query)
             
-            rows = cursor.fetchall()
-            return [self._convert_row_to_dict(row) for row in rows]
+            return self._shape_result(cursor, mode)
     
     def execute_single(self, query: str, params: tuple = None) -> Optional[Dict[str, Any]]:
         """
@@ -135,6 +508,22 @@ class DatabaseConnection:
             row = cursor.fetchone()
             return self._convert_row_to_dict(row) if row else None
     
+    def execute_named(self, name: str, params: Optional[Dict[str, Any]] = None,
+                      single: bool = False) -> Union[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Execute a registered query (see query_registry) with bound parameters
+        
+        Args:
+            name: Registered query name
+            params: Named parameters
+            single: Return the first row (or None) instead of a list
+        """
+        with self.get_connection() as conn:
+            result = self.registry.fetch(conn, name, params, single=single)
+        if single:
+            return self._convert_row_to_dict(result) if result else None
+        return [self._convert_row_to_dict(row) for row in result]
+    
     def execute_write(self, query: str, params: tuple = None) -> int:
         """
         Execute INSERT/UPDATE/DELETE query
@@ -174,61 +563,109 @@ class DatabaseConnection:
             conn.commit()
             return cursor.rowcount
 
+# Columns returned by MarketBreadthQueries.get_true_range_data
+TRUE_RANGE_COLUMNS = (
+    'date', 'daily_high', 'daily_low', 'daily_close', 'previous_close', 'true_range',
+    'average_true_range_14', 'average_true_range_20', 'volatility_rank_20',
+    'volatility_rank_50', 'risk_regime'
+)
+
 class MarketBreadthQueries:
-    """Specialized queries for Market Breadth data access"""
+    """
+    Specialized queries for Market Breadth data access
     
-    def __init__(self, db_connection: DatabaseConnection):
+    With a BreadthMirror, lookups on market_breadth_daily are answered from the
+    in-memory arrays, and with an AtrPercentileIndex ATR percentiles come from
+    the index; queries on the views always go to SQLite. With a QueryResultCache,
+    window queries are cached until the next data write.
+    """
+    
+    def __init__(self, db_connection: DatabaseConnection, mirror=None, atr_index=None, cache=None):
         self.db = db_connection
+        self.mirror = mirror
+        self.atr_index = atr_index
+        self.cache = cache
+    
+    def _cached(self, name: str, params: Dict[str, Any], compute: Callable[[], Any]) -> Any:
+        if self.cache is None:
+            return compute()
+        return self.cache.get(name, params, compute)
+    
+    @staticmethod
+    def _anchor(anchor_date: Optional[Union[str, date]]) -> str:
+        """Explicit end of relative windows (default: today)"""
+        if anchor_date is None:
+            anchor_date = date.today()
+        return anchor_date.strftime('%Y-%m-%d') if isinstance(anchor_date, date) else anchor_date
+    
+    @classmethod
+    def _window(cls, anchor_date: Optional[Union[str, date]], days: int) -> Tuple[np.datetime64, np.datetime64]:
+        """First and last date of a relative window (date(:anchor_date, '-N days') to the anchor)"""
+        end = np.datetime64(cls._anchor(anchor_date), 'D')
+        return end - np.timedelta64(int(days), 'D'), end
+    
+    def _mirror_volatility_context(self, window: Tuple[np.datetime64, np.datetime64]) -> Dict[str, Any]:
+        """get_volatility_context computed on the mirror (NULLs skipped like AVG)"""
+        snapshot = self.mirror.snapshot()
+        positions = snapshot.positions(*window, require="true_range")
+        
+        def average(name: str) -> Optional[float]:
+            values = snapshot.columns[name][positions].astype(np.float64)
+            values = values[~np.isnan(values)]
+            return float(values.mean()) if len(values) else None
+        
+        dates = [snapshot.row_dict(i)["date"] for i in positions[[0, -1]]] if len(positions) else [None, None]
+        return {
+            "avg_true_range": average("true_range"),
+            "avg_atr_14": average("average_true_range_14"),
+            "avg_atr_20": average("average_true_range_20"),
+            "avg_vol_rank_20": average("volatility_rank_20"),
+            "avg_vol_rank_50": average("volatility_rank_50"),
+            "sample_size": len(positions),
+            "latest_date": dates[1],
+            "earliest_date": dates[0]
+        }
     
-    def get_latest_breadth_data(self, days: int = 30) -> List[Dict[str, Any]]:
+    def get_latest_breadth_data(self, days: int = 30,
+                                anchor_date: Optional[Union[str, date]] = None) -> List[Dict[str, Any]]:
         """
         Get latest market breadth data for risk management
         
         Args:
             days: Number of days to retrieve
+            anchor_date: End of the window (default: today)
             
         Returns:
             List of breadth data records
         """
-        query = """
-        SELECT * FROM v_risk_management_data 
-        WHERE date >= date('now', '-{} days')
-        ORDER BY date DESC
-        LIMIT {}
-        """.format(days, days)
-        
-        return self.db.execute_query(query)
+        params = {"anchor_date": self._anchor(anchor_date), "days": int(days)}
+        return self._cached("latest_breadth_data", params,
+                            lambda: self.db.execute_named("latest_breadth_data", params))
     
-    def get_true_range_data(self, days: int = 252) -> List[Dict[str, Any]]:
+    def get_true_range_data(self, days: int = 252,
+                            anchor_date: Optional[Union[str, date]] = None) -> List[Dict[str, Any]]:
         """
         Get True Range data for volatility calculations
         
         Args:
             days: Number of days to retrieve (default: 1 trading year)
+            anchor_date: End of the window (default: today)
             
         Returns:
             List of True Range data
         """
-        query = """
-        SELECT 
-            date,
-            daily_high,
-            daily_low,
-            daily_close,
-            previous_close,
-            true_range,
-            average_true_range_14,
-            average_true_range_20,
-            volatility_rank_20,
-            volatility_rank_50,
-            risk_regime
-        FROM market_breadth_daily 
-        WHERE date >= date('now', '-{} days') 
-        AND true_range IS NOT NULL
-        ORDER BY date DESC
-        """.format(days)
-        
-        return self.db.execute_query(query)
+        params = {"anchor_date": self._anchor(anchor_date), "days": int(days)}
+        return self._cached("true_range_data", params, lambda: self._true_range_data(params))
+    
+    def _true_range_data(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if self.mirror is not None:
+            snapshot = self.mirror.snapshot()
+            positions = snapshot.positions(*self._window(params["anchor_date"], params["days"]),
+                                           require="true_range", newest_first=True)
+            rows = [snapshot.row_dict(i) for i in positions]
+            return [{name: row[name] for name in TRUE_RANGE_COLUMNS} for row in rows]
+        
+        return self.db.execute_named("true_range_data", params)
     
     def get_breadth_indicators_for_date(self, target_date: Union[str, date]) -> Optional[Dict[str, Any]]:
         """
@@ -243,79 +680,80 @@ class MarketBreadthQueries:
         if isinstance(target_date, date):
             target_date = target_date.strftime('%Y-%m-%d')
         
-        query = """
-        SELECT * FROM market_breadth_daily 
-        WHERE date = ?
-        """
+        if self.mirror is not None:
+            snapshot = self.mirror.snapshot()
+            try:
+                i = snapshot.position(target_date)
+            except ValueError:
+                return None
+            return snapshot.row_dict(i) if i is not None else None
         
-        return self.db.execute_single(query, (target_date,))
+        return self.db.execute_named("breadth_for_date", {"date": target_date}, single=True)
     
-    def get_regime_analysis(self, days: int = 90) -> List[Dict[str, Any]]:
+    def get_regime_analysis(self, days: int = 90,
+                            anchor_date: Optional[Union[str, date]] = None) -> List[Dict[str, Any]]:
         """
         Get market regime analysis for risk management
         
         Args:
             days: Number of days to retrieve
+            anchor_date: End of the window (default: today)
             
         Returns:
             List of regime analysis records
         """
-        query = """
-        SELECT * FROM market_regime_analysis 
-        WHERE date >= date('now', '-{} days')
-        ORDER BY date DESC
-        """.format(days)
-        
-        return self.db.execute_query(query)
+        params = {"anchor_date": self._anchor(anchor_date), "days": int(days)}
+        return self._cached("regime_analysis", params,
+                            lambda: self.db.execute_named("regime_analysis", params))
     
-    def calculate_atr_percentile(self, current_atr: float, lookback_days: int = 252) -> float:
+    def calculate_atr_percentile(self, current_atr: float, lookback_days: int = 252,
+                                 anchor_date: Optional[Union[str, date]] = None) -> float:
         """
         Calculate ATR percentile rank for current value
         
         Args:
             current_atr: Current ATR value
             lookback_days: Days to look back for percentile calculation
+            anchor_date: End of the lookback window (default: today)
             
         Returns:
             Percentile rank (0.0 to 100.0)
         """
-        query = """
-        SELECT 
-            COUNT(CASE WHEN average_true_range_14 <= ? THEN 1 END) * 100.0 / COUNT(*) as percentile
-        FROM market_breadth_daily 
-        WHERE date >= date('now', '-{} days') 
-        AND average_true_range_14 IS NOT NULL
-        """.format(lookback_days)
+        if self.atr_index is not None:
+            return self.atr_index.lookback_percentile(current_atr, lookback_days, self._anchor(anchor_date))
         
-        result = self.db.execute_single(query, (current_atr,))
-        return result['percentile'] if result else 0.0
+        if self.mirror is not None:
+            atr = self.mirror.snapshot().column("average_true_range_14", *self._window(anchor_date, lookback_days))
+            atr = atr[~np.isnan(atr)]
+            return float((atr <= current_atr).sum() * 100.0 / len(atr)) if len(atr) else 0.0
+        
+        result = self.db.execute_named("atr_percentile", {
+            "current_atr": current_atr,
+            "anchor_date": self._anchor(anchor_date),
+            "days": int(lookback_days)
+        }, single=True)
+        return result['percentile'] if result and result['percentile'] is not None else 0.0
     
-    def get_volatility_context(self, days: int = 20) -> Dict[str, Any]:
+    def get_volatility_context(self, days: int = 20,
+                               anchor_date: Optional[Union[str, date]] = None) -> Dict[str, Any]:
         """
         Get volatility context for risk management decisions
         
         Args:
             days: Number of days for context
+            anchor_date: End of the window (default: today)
             
         Returns:
             Dictionary with volatility metrics
         """
-        query = """
-        SELECT 
-            AVG(true_range) as avg_true_range,
-            AVG(average_true_range_14) as avg_atr_14,
-            AVG(average_true_range_20) as avg_atr_20,
-            AVG(volatility_rank_20) as avg_vol_rank_20,
-            AVG(volatility_rank_50) as avg_vol_rank_50,
-            COUNT(*) as sample_size,
-            MAX(date) as latest_date,
-            MIN(date) as earliest_date
-        FROM market_breadth_daily 
-        WHERE date >= date('now', '-{} days')
-        AND true_range IS NOT NULL
-        """.format(days)
-        
-        result = self.db.execute_single(query)
+        params = {"anchor_date": self._anchor(anchor_date), "days": int(days)}
+        return self._cached("volatility_context", params, lambda: self._volatility_context(params))
+    
+    def _volatility_context(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if self.mirror is not None:
+            return self._mirror_volatility_context(self._window(params["anchor_date"], params["days"]))
+        
+        result = self.db.execute_named("volatility_context", params, single=True)
         return result if result else {}
 
 class TradingDataQueries:
@@ -345,7 +783,34 @@ class TradingDataQueries:
         """
         
         values = tuple(breadth_data.values())
-        return self.db.execute_write(query, values)
+        record_id = self.db.execute_write(query, values)
+        
+        # A new day with prices only shifts previous_close/ATR from its date forward
+        from_date = str(breadth_data['date']) if breadth_data.get('date') else None
+        if from_date and any(column in breadth_data for column in ('daily_high', 'daily_low', 'daily_close')):
+            self.recompute_derived_metrics(from_date, notify=False)
+        self.db.notify_write("market_breadth_daily", from_date)
+        return record_id
+    
+    def recompute_derived_metrics(self, from_date: Optional[Union[str, date]] = None,
+                                  notify: bool = True) -> Dict[str, Any]:
+        """
+        Recompute previous_close, true_range, ATR, volatility ranks and risk_regime (see derived_metrics)
+        
+        Args:
+            from_date: First changed date; None recomputes the whole table
+            notify: Notify write listeners when rows changed
+            
+        Returns:
+            Statistics with rows scanned and updated
+        """
+        if isinstance(from_date, date):
+            from_date = from_date.strftime('%Y-%m-%d')
+        with self.db.get_connection() as conn:
+            stats = recompute_derived_metrics(conn, from_date)
+        if notify and stats['rows_updated']:
+            self.db.notify_write("market_breadth_daily", from_date)
+        return stats
     
     def update_true_range_calculations(self, date_str: str, high: float, low: float, previous_close: float) -> bool:
         """
@@ -382,6 +847,8 @@ class TradingDataQueries:
                 query, 
                 (high, low, previous_close, true_range, date_str)
             )
+            if affected_rows:
+                self.db.notify_write("market_breadth_daily", date_str)
             
             return affected_rows > 0
             
@@ -433,7 +900,9 @@ class TradingDataQueries:
                 true_range
             ))
         
-        return self.db.execute_many(query, values_list)
+        inserted = self.db.execute_many(query, values_list)
+        self.db.notify_write("market_price_history")
+        return inserted
     
     def log_data_import(self, filename: str, import_type: str, records_processed: int, 
                        records_imported: int, records_failed: int, 
@@ -470,6 +939,9 @@ class TradingDataQueries:
 # Global database instance (lazy initialization)
 _db_connection: Optional[DatabaseConnection] = None
 _breadth_queries: Optional[MarketBreadthQueries] = None
+_breadth_mirror = None
+_atr_index = None
+_query_cache = None
 _trading_queries: Optional[TradingDataQueries] = None
 
 def get_database() -> DatabaseConnection:
@@ -479,11 +951,36 @@ def get_database() -> DatabaseConnection:
         _db_connection = DatabaseConnection()
     return _db_connection
 
+def get_breadth_mirror():
+    """Get global in-memory market_breadth_daily mirror (loaded on first read)"""
+    global _breadth_mirror
+    if _breadth_mirror is None:
+        from .breadth_mirror import BreadthMirror
+        _breadth_mirror = BreadthMirror(get_database())
+    return _breadth_mirror
+
+def get_atr_index():
+    """Get global ATR percentile index (built on first query)"""
+    global _atr_index
+    if _atr_index is None:
+        from .atr_index import AtrPercentileIndex
+        _atr_index = AtrPercentileIndex(get_database())
+    return _atr_index
+
+def get_query_cache():
+    """Get global query result cache"""
+    global _query_cache
+    if _query_cache is None:
+        from .result_cache import QueryResultCache
+        _query_cache = QueryResultCache(get_database())
+    return _query_cache
+
 def get_breadth_queries() -> MarketBreadthQueries:
-    """Get market breadth queries instance"""
+    """Get market breadth queries instance (backed by the breadth mirror, ATR index and result cache)"""
     global _breadth_queries
     if _breadth_queries is None:
-        _breadth_queries = MarketBreadthQueries(get_database())
+        _breadth_queries = MarketBreadthQueries(get_database(), mirror=get_breadth_mirror(),
+                                                atr_index=get_atr_index(), cache=get_query_cache())
     return _breadth_queries
 
 def get_trading_queries() -> TradingDataQueries:
@@ -495,10 +992,18 @@ def get_trading_queries() -> TradingDataQueries:
 
 # Export main components
 __all__ = [
+    'ConnectionPool',
+    'PoolClosedError',
+    'LazyRow',
+    'FETCH_MODES',
+    'rows_to_columns',
     'DatabaseConnection',
     'MarketBreadthQueries', 
     'TradingDataQueries',
     'get_database',
+    'get_breadth_mirror',
+    'get_atr_index',
+    'get_query_cache',
     'get_breadth_queries',
     'get_trading_queries'
 ]
\ No newline at end of file
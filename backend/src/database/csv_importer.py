@@ -17,6 +17,13 @@ from dataclasses import dataclass
 import requests
 from pathlib import Path
 
+try:
+    from .data_version import bump_data_version
+    from .derived_metrics import recompute_derived_metrics
+except ImportError:  # Run as a script from src/database
+    from data_version import bump_data_version
+    from derived_metrics import recompute_derived_metrics
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -371,95 +378,17 @@ class MarketBreadthCSVImporter:
         self.connection.execute(query, values)
         self.connection.commit()
     
-    def calculate_previous_close_and_true_range(self) -> None:
-        """Calculate previous_close and true_range for all imported records"""
-        logger.info("Calculating previous_close and true_range values")
-        
-        # Update previous_close
-        query_prev_close = """
-            UPDATE market_breadth_daily 
-            SET previous_close = (
-                SELECT daily_close 
-                FROM market_breadth_daily prev 
-                WHERE prev.date < market_breadth_daily.date 
-                AND prev.daily_close IS NOT NULL
-                ORDER BY prev.date DESC 
-                LIMIT 1
-            )
-            WHERE daily_close IS NOT NULL
+    def calculate_derived_metrics(self, from_date: Optional[str] = None) -> Dict[str, Any]:
         """
+        Calculate previous_close, true_range, 14/20-day ATR, volatility ranks and risk_regime
         
-        self.connection.execute(query_prev_close)
-        
-        # Calculate true_range using trigger or manual calculation
-        query_true_range = """
-            UPDATE market_breadth_daily 
-            SET true_range = (
-                CASE 
-                    WHEN daily_high IS NOT NULL AND daily_low IS NOT NULL THEN
-                        MAX(
-                            (daily_high - daily_low),
-                            COALESCE(ABS(daily_high - previous_close), 0),
-                            COALESCE(ABS(daily_low - previous_close), 0)
-                        )
-                    ELSE NULL
-                END
-            )
-            WHERE daily_high IS NOT NULL AND daily_low IS NOT NULL
+        Args:
+            from_date: First imported date; None recomputes the whole table
         """
-        
-        self.connection.execute(query_true_range)
-        self.connection.commit()
-        
-        logger.info("True Range calculations completed")
-    
-    def calculate_average_true_range(self) -> None:
-        """Calculate 14-day and 20-day Average True Range"""
-        logger.info("Calculating Average True Range (ATR) values")
-        
-        # Get all records ordered by date
-        query = """
-            SELECT date, true_range 
-            FROM market_breadth_daily 
-            WHERE true_range IS NOT NULL 
-            ORDER BY date
-        """
-        
-        cursor = self.connection.execute(query)
-        records = cursor.fetchall()
-        
-        # Calculate rolling ATR
-        for i, (date, true_range) in enumerate(records):
-            # 14-day ATR
-            if i >= 13:
-                atr_14_data = [r[1] for r in records[i-13:i+1] if r[1] is not None]
-                if atr_14_data:
-                    atr_14 = sum(atr_14_data) / len(atr_14_data)
-                else:
-                    atr_14 = None
-            else:
-                atr_14 = None
-            
-            # 20-day ATR
-            if i >= 19:
-                atr_20_data = [r[1] for r in records[i-19:i+1] if r[1] is not None]
-                if atr_20_data:
-                    atr_20 = sum(atr_20_data) / len(atr_20_data)
-                else:
-                    atr_20 = None
-            else:
-                atr_20 = None
-            
-            # Update record
-            update_query = """
-                UPDATE market_breadth_daily 
-                SET average_true_range_14 = ?, average_true_range_20 = ?
-                WHERE date = ?
-            """
-            self.connection.execute(update_query, (atr_14, atr_20, date))
-        
-        self.connection.commit()
-        logger.info("ATR calculations completed")
+        logger.info("Calculating previous_close, true_range, ATR and volatility rank values")
+        stats = recompute_derived_metrics(self.connection, from_date)
+        logger.info(f"Derived metrics completed: {stats['rows_updated']} records updated")
+        return stats
     
     def log_import_statistics(self, stats: ImportStats) -> None:
         """Log import statistics to data_import_log table"""
@@ -502,8 +431,10 @@ class MarketBreadthCSVImporter:
             self.log_import_statistics(stats)
         
         # Calculate derived fields after all imports
-        self.calculate_previous_close_and_true_range()
-        self.calculate_average_true_range()
+        self.calculate_derived_metrics()
+        
+        # Outdate query results cached by running servers
+        bump_data_version(self.connection)
         
         return all_stats
     
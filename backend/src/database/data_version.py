@@ -0,0 +1,39 @@
+"""
+Data Version Counter for BIDBACK Trading Tool
+Persistent counter of data writes, kept in the SQLite header (PRAGMA user_version,
+not used for schema versioning in this project). Importers and the write paths
+bump it after committing so other processes can tell that cached results are
+outdated without comparing data
+"""
+
+import sqlite3
+
+def read_data_version(conn: sqlite3.Connection) -> int:
+    """Current data version of the database"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def bump_data_version(conn: sqlite3.Connection) -> int:
+    """
+    Increment the data version (own transaction, call after committing the data)
+
+    Returns:
+        New data version
+    """
+    in_transaction = conn.in_transaction
+    if not in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = (read_data_version(conn) + 1) % 2 ** 31
+        conn.execute(f"PRAGMA user_version = {version}")
+        if not in_transaction:
+            conn.commit()
+    except Exception:
+        if not in_transaction:
+            conn.rollback()
+        raise
+    return version
+
+__all__ = [
+    'read_data_version',
+    'bump_data_version'
+]
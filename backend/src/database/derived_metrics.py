@@ -0,0 +1,215 @@
+"""
+Derived Price Metrics for BIDBACK Trading Tool
+Recomputes previous_close, true_range, the 14/20-day ATR, the 20/50-day volatility
+ranks and risk_regime of market_breadth_daily with NumPy over one ordered read,
+and writes back only the rows whose values changed in a single transaction.
+Recomputation can start at a date, so a new or corrected day only rereads the
+windows before it and updates the rows after it
+"""
+
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# ATR window lengths -> column
+ATR_COLUMNS = {
+    14: 'average_true_range_14',
+    20: 'average_true_range_20'
+}
+
+# Volatility rank window lengths -> column (percentile rank of the day's true range)
+RANK_COLUMNS = {
+    20: 'volatility_rank_20',
+    50: 'volatility_rank_50'
+}
+
+# risk_regime from the 50-day volatility rank: upper bounds (exclusive) per regime
+RISK_REGIME_RANK = 50
+RISK_REGIME_THRESHOLDS = (
+    (25.0, 'low'),
+    (75.0, 'medium'),
+    (95.0, 'high')
+)
+EXTREME_REGIME = 'extreme'
+
+NUMERIC_COLUMNS = ('previous_close', 'true_range', *ATR_COLUMNS.values(), *RANK_COLUMNS.values())
+
+def _floats(values) -> np.ndarray:
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+def _same(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Element-wise equality with NULL (NaN) equal to NULL"""
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Mean of each full window ending at a position (NaN before the first full window)
+
+    Every window is summed on its own, so a value only depends on the values in
+    its window; incremental and full runs give bit-identical results.
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = np.lib.stride_tricks.sliding_window_view(values, window).mean(axis=1)
+    return result
+
+def _rolling_rank(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Percentile rank (0-100) of each value within its trailing window, counting
+    values <= it (the convention of calculate_atr_percentile); NaN before the
+    first full window
+
+    One (n, window) comparison over strided windows - the rank is the order
+    statistic of the last element, no per-row sorting or SQL scan.
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        result[window - 1:] = np.round((windows <= windows[:, -1:]).sum(axis=1) * 100.0 / window, 2)
+    return result
+
+def risk_regimes(ranks: np.ndarray) -> np.ndarray:
+    """risk_regime labels for volatility ranks (None where the rank is NULL)"""
+    bounds = np.array([bound for bound, _ in RISK_REGIME_THRESHOLDS])
+    labels = np.array([label for _, label in RISK_REGIME_THRESHOLDS] + [EXTREME_REGIME], dtype=object)
+    result = labels[np.searchsorted(bounds, np.nan_to_num(ranks), side='right')]
+    result[np.isnan(ranks)] = None
+    return result
+
+def recompute_derived_metrics(conn: sqlite3.Connection, from_date: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Recompute previous_close, true_range, ATR, volatility ranks and risk_regime
+    from a date onward
+
+    Rules (previous_close, true_range and ATR as the original importer passes):
+    - previous_close of a row with a close is the close of the previous row with a close
+    - true_range = max(high - low, |high - previous_close|, |low - previous_close|)
+      for rows with high and low, a missing previous_close counting as 0
+    - ATR n is the mean of the last n true ranges over rows with a true range,
+      NULL until n true ranges exist
+    - volatility_rank_n is the percentile rank of the true range among the last
+      n true ranges, NULL until n exist; risk_regime follows from the 50-day rank
+    Columns of rows outside these conditions are left as they are. Reads and
+    updates run in one transaction; an already open transaction of the caller
+    is joined and left for the caller to commit.
+
+    Args:
+        conn: Open connection
+        from_date: First date (YYYY-MM-DD) that may have changed; None for the full table
+
+    Returns:
+        Statistics: rows scanned, rows updated, elapsed milliseconds
+    """
+    started = time.perf_counter()
+    own_transaction = not conn.in_transaction
+    if own_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        scanned, updated = _recompute(conn, from_date)
+        if own_transaction:
+            conn.commit()
+    except Exception:
+        if own_transaction:
+            conn.rollback()
+        raise
+
+    stats = {
+        "from_date": from_date,
+        "rows_scanned": scanned,
+        "rows_updated": updated,
+        "elapsed_ms": (time.perf_counter() - started) * 1000
+    }
+    logger.info(f"Derived metrics from {from_date or 'start'}: {updated} of {scanned} rows "
+                f"updated in {stats['elapsed_ms']:.1f} ms")
+    return stats
+
+def _recompute(conn: sqlite3.Connection, from_date: Optional[str]) -> Tuple[int, int]:
+    """Rows scanned and rows updated (runs inside the caller's transaction)"""
+    start = from_date or '0000-00-00'
+    longest = max(*ATR_COLUMNS, *RANK_COLUMNS)
+
+    rows = conn.execute(f"""
+        SELECT id, daily_high, daily_low, daily_close, {', '.join(NUMERIC_COLUMNS)}, risk_regime
+        FROM market_breadth_daily
+        WHERE date >= ?
+        ORDER BY date
+    """, (start,)).fetchall()
+    if not rows:
+        return 0, 0
+
+    # State before the start date: last close and the true ranges the windows reach back to
+    seed = conn.execute("""
+        SELECT daily_close FROM market_breadth_daily
+        WHERE date < ? AND daily_close IS NOT NULL
+        ORDER BY date DESC LIMIT 1
+    """, (start,)).fetchone()
+    prior_ranges = conn.execute("""
+        SELECT true_range FROM market_breadth_daily
+        WHERE date < ? AND true_range IS NOT NULL
+        ORDER BY date DESC LIMIT ?
+    """, (start, longest - 1)).fetchall()
+
+    columns = list(zip(*rows))
+    ids = columns[0]
+    high, low, close = (_floats(column) for column in columns[1:4])
+    stored = {name: _floats(column) for name, column in zip(NUMERIC_COLUMNS, columns[4:-1])}
+    stored_regime = np.array(columns[-1], dtype=object)
+    computed = {name: values.copy() for name, values in stored.items()}
+
+    # previous_close: shift the non-NULL closes by one
+    previous = computed['previous_close']
+    has_close = np.flatnonzero(~np.isnan(close))
+    if len(has_close):
+        closes = close[has_close]
+        first = seed[0] if seed and seed[0] is not None else np.nan
+        previous[has_close] = np.concatenate(([first], closes[:-1]))
+
+    # true_range where high and low exist
+    true_range = computed['true_range']
+    has_range = ~np.isnan(high) & ~np.isnan(low)
+    with np.errstate(invalid='ignore'):
+        high_close = np.nan_to_num(np.abs(high - previous), nan=0.0)
+        low_close = np.nan_to_num(np.abs(low - previous), nan=0.0)
+    true_range[has_range] = np.maximum(high - low, np.maximum(high_close, low_close))[has_range]
+
+    # ATR and ranks over the rows with a true range, continuing the windows from before the start date
+    has_tr = np.flatnonzero(~np.isnan(true_range))
+    prior = _floats([value for (value,) in reversed(prior_ranges)])
+    sequence = np.concatenate((prior, true_range[has_tr]))
+    for window, name in ATR_COLUMNS.items():
+        computed[name][has_tr] = _rolling_mean(sequence, window)[len(prior):]
+    for window, name in RANK_COLUMNS.items():
+        computed[name][has_tr] = _rolling_rank(sequence, window)[len(prior):]
+
+    regime = stored_regime.copy()
+    regime[has_tr] = risk_regimes(computed[RANK_COLUMNS[RISK_REGIME_RANK]][has_tr])
+
+    changed = regime != stored_regime
+    for name in NUMERIC_COLUMNS:
+        changed |= ~_same(computed[name], stored[name])
+    positions = np.flatnonzero(changed)
+
+    def sql_value(value: float) -> Optional[float]:
+        return None if np.isnan(value) else float(value)
+
+    updates = [
+        (*(sql_value(computed[name][i]) for name in NUMERIC_COLUMNS), regime[i], ids[i])
+        for i in positions
+    ]
+    if updates:
+        assignments = ', '.join(f"{column} = ?" for column in (*NUMERIC_COLUMNS, 'risk_regime'))
+        conn.executemany(f"UPDATE market_breadth_daily SET {assignments} WHERE id = ?", updates)
+    return len(rows), len(updates)
+
+__all__ = [
+    'ATR_COLUMNS',
+    'RANK_COLUMNS',
+    'RISK_REGIME_THRESHOLDS',
+    'risk_regimes',
+    'recompute_derived_metrics'
+]
@@ -13,6 +13,11 @@ from datetime import datetime
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass
 
+try:
+    from .data_version import bump_data_version
+except ImportError:  # Run as a script from src/database
+    from data_version import bump_data_version
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -324,6 +329,9 @@ def main():
         
         importer.connection.commit()
         
+        # Outdate query results cached by running servers
+        bump_data_version(importer.connection)
+        
         # Print summary
         print("\n" + "="*60)
         print("CSV IMPORT SUMMARY")
@@ -0,0 +1,195 @@
+"""
+Named Query Registry for BIDBACK Trading Tool
+Fixed, parameterized SQL texts for the breadth queries. Identical text lets each
+pooled connection prepare a statement once (sqlite3 statement cache), values are
+always bound, relative windows end at an explicit anchor date instead of 'now', and
+every execution is timed per query name
+"""
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+@dataclass(frozen=True)
+class NamedQuery:
+    """SQL text with named parameters (:name placeholders)"""
+    name: str
+    sql: str
+    params: Tuple[str, ...] = ()
+    description: str = ""
+
+# Window of the days before an explicit anchor date (anchor included)
+_WINDOW = "date >= date(:anchor_date, '-' || :days || ' days') AND date <= :anchor_date"
+
+BREADTH_QUERIES = (
+    NamedQuery(
+        "latest_breadth_data",
+        f"""
+        SELECT * FROM v_risk_management_data
+        WHERE {_WINDOW}
+        ORDER BY date DESC
+        LIMIT :days
+        """,
+        ("anchor_date", "days"),
+        "Risk management view rows of the last days"
+    ),
+    NamedQuery(
+        "true_range_data",
+        f"""
+        SELECT
+            date,
+            daily_high,
+            daily_low,
+            daily_close,
+            previous_close,
+            true_range,
+            average_true_range_14,
+            average_true_range_20,
+            volatility_rank_20,
+            volatility_rank_50,
+            risk_regime
+        FROM market_breadth_daily
+        WHERE {_WINDOW}
+        AND true_range IS NOT NULL
+        ORDER BY date DESC
+        """,
+        ("anchor_date", "days"),
+        "True Range and ATR history"
+    ),
+    NamedQuery(
+        "breadth_for_date",
+        """
+        SELECT * FROM market_breadth_daily
+        WHERE date = :date
+        """,
+        ("date",),
+        "All indicators of one date"
+    ),
+    NamedQuery(
+        "regime_analysis",
+        f"""
+        SELECT * FROM market_regime_analysis
+        WHERE {_WINDOW}
+        ORDER BY date DESC
+        """,
+        ("anchor_date", "days"),
+        "Market regime analysis rows"
+    ),
+    NamedQuery(
+        "atr_percentile",
+        f"""
+        SELECT
+            COUNT(CASE WHEN average_true_range_14 <= :current_atr THEN 1 END) * 100.0 / COUNT(*) as percentile
+        FROM market_breadth_daily
+        WHERE {_WINDOW}
+        AND average_true_range_14 IS NOT NULL
+        """,
+        ("current_atr", "anchor_date", "days"),
+        "Percentile rank of an ATR value in the lookback window"
+    ),
+    NamedQuery(
+        "volatility_context",
+        f"""
+        SELECT
+            AVG(true_range) as avg_true_range,
+            AVG(average_true_range_14) as avg_atr_14,
+            AVG(average_true_range_20) as avg_atr_20,
+            AVG(volatility_rank_20) as avg_vol_rank_20,
+            AVG(volatility_rank_50) as avg_vol_rank_50,
+            COUNT(*) as sample_size,
+            MAX(date) as latest_date,
+            MIN(date) as earliest_date
+        FROM market_breadth_daily
+        WHERE {_WINDOW}
+        AND true_range IS NOT NULL
+        """,
+        ("anchor_date", "days"),
+        "Volatility averages of the last days"
+    ),
+)
+
+class QueryRegistry:
+    """
+    Named queries with per-name call counts and latency
+
+    Statistics are kept per registry; DatabaseConnection owns one, so they cover
+    all pooled connections of that database.
+    """
+
+    def __init__(self, queries: Iterable[NamedQuery] = BREADTH_QUERIES):
+        self.queries: Dict[str, NamedQuery] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        for query in queries:
+            self.register(query)
+
+    def register(self, query: NamedQuery):
+        if query.name in self.queries and self.queries[query.name] != query:
+            raise ValueError(f"Query {query.name} is already registered")
+        self.queries[query.name] = query
+        self._stats.setdefault(query.name, {"calls": 0, "errors": 0, "rows": 0,
+                                            "total_ms": 0.0, "max_ms": 0.0})
+
+    def get(self, name: str) -> NamedQuery:
+        try:
+            return self.queries[name]
+        except KeyError:
+            raise KeyError(f"Unknown query: {name}") from None
+
+    def bind(self, name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Parameters of a query call; raises ValueError for missing or unknown names"""
+        query = self.get(name)
+        missing = [param for param in query.params if param not in params]
+        unknown = [param for param in params if param not in query.params]
+        if missing or unknown:
+            raise ValueError(f"Query {name}: missing parameters {missing}, unknown parameters {unknown}")
+        return params
+
+    def fetch(self, conn: sqlite3.Connection, name: str, params: Optional[Dict[str, Any]] = None,
+              single: bool = False):
+        """
+        Run a named query on a connection
+
+        Returns:
+            List of rows, or the first row (None if empty) with single
+        """
+        query = self.get(name)
+        params = self.bind(name, params or {})
+        started = time.perf_counter()
+        try:
+            cursor = conn.execute(query.sql, params)
+            result = cursor.fetchone() if single else cursor.fetchall()
+        except Exception:
+            with self._lock:
+                self._stats[name]["errors"] += 1
+            raise
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            stats["rows"] += (result is not None) if single else len(result)
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        return result
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Call count, errors, rows and latency per query"""
+        with self._lock:
+            return {
+                name: {**stats, "avg_ms": stats["total_ms"] / stats["calls"] if stats["calls"] else 0.0}
+                for name, stats in self._stats.items()
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            for stats in self._stats.values():
+                stats.update(calls=0, errors=0, rows=0, total_ms=0.0, max_ms=0.0)
+
+__all__ = [
+    'NamedQuery',
+    'QueryRegistry',
+    'BREADTH_QUERIES'
+]
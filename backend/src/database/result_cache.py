@@ -0,0 +1,130 @@
+"""
+Query Result Cache for BIDBACK Trading Tool
+Results of read queries keyed on (query name, parameters, data version). Breadth
+data changes once a day, so polled dashboard reads are answered from memory
+until a write bumps the data version
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .connection import DatabaseConnection
+
+logger = logging.getLogger(__name__)
+
+def _freeze(params: Any) -> Hashable:
+    """Hashable form of query parameters"""
+    if isinstance(params, dict):
+        return tuple(sorted((key, _freeze(value)) for key, value in params.items()))
+    if isinstance(params, (list, tuple)):
+        return tuple(_freeze(value) for value in params)
+    return params
+
+class QueryResultCache:
+    """
+    LRU cache of query results
+
+    The data version combines the DatabaseConnection write counter (bumped by
+    TradingDataQueries writes in this process and by detected external writes)
+    with the persistent counter in the database (bumped by importers and other
+    processes), which the DatabaseConnection re-reads at most every
+    external_check_interval seconds. Entries of older versions are dropped on
+    the first lookup after a change.
+
+    Cached results are shared between callers and must not be modified.
+    """
+
+    def __init__(self, db: DatabaseConnection, max_entries: int = 256, max_rows: int = 50000):
+        """
+        Args:
+            db: Database whose writes invalidate the cache
+            max_entries: Maximum number of cached results
+            max_rows: Maximum total rows over all cached list results
+        """
+        self.db = db
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self._cached_version: Optional[Tuple[int, Optional[int]]] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def data_version(self, check_external: bool = True) -> Tuple[int, Optional[int]]:
+        """
+        (in-process write counter, persistent data version)
+
+        Args:
+            check_external: Let the DatabaseConnection re-read the persistent
+                version if due (a database read); False only uses memory
+        """
+        if check_external:
+            self.db.check_external_writes()
+        return self.db.data_version, self.db.persistent_version
+
+    def get(self, name: str, params: Any, compute: Callable[[], Any], check_external: bool = True) -> Any:
+        """
+        Cached result of a query, computed on a miss
+
+        Args:
+            name: Query name
+            params: Parameters (dict, tuple or scalar; must identify the result)
+            compute: Function producing the result
+            check_external: Poll the persistent data version first (see data_version)
+        """
+        version = self.data_version(check_external)
+        key = (name, _freeze(params), version)
+        with self._lock:
+            if version != self._cached_version:
+                self._clear()
+                self._cached_version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        result = compute()
+        size = len(result) if isinstance(result, list) else 1
+        with self._lock:
+            # A write during compute changes the version; the result is still returned but not kept
+            if version == self._cached_version and size <= self.max_rows:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._rows -= previous[1]
+                self._entries[key] = (result, size)
+                self._rows += size
+                while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._rows -= evicted_size
+                    self.evictions += 1
+        return result
+
+    def _clear(self):
+        self._entries.clear()
+        self._rows = 0
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "rows": self._rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "data_version": list(self._cached_version) if self._cached_version else None
+        }
+
+__all__ = [
+    'QueryResultCache'
+]
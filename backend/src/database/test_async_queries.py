@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the async database access layer
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from src.database.async_queries import AsyncDatabase, AsyncMarketBreadthQueries, QueryTimeoutError
+from src.database.atr_index import AtrPercentileIndex
+from src.database.breadth_mirror import BreadthMirror
+from src.database.connection import MarketBreadthQueries
+from src.database.result_cache import QueryResultCache
+
+ANCHOR = "2023-03-31"
+
+SLOW_QUERY = """
+    WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter)
+    SELECT count(*) FROM counter
+"""
+
+def test_queries_return_rows(db):
+    adb = AsyncDatabase(db)
+
+    async def scenario():
+        rows = await adb.execute_query("SELECT date, daily_close FROM market_breadth_daily ORDER BY date LIMIT 3")
+        single = await adb.execute_single("SELECT count(*) AS days FROM market_breadth_daily")
+        return rows, single
+
+    try:
+        rows, single = asyncio.run(scenario())
+    finally:
+        adb.shutdown()
+
+    assert [str(row["date"]) for row in rows] == ["2022-01-03", "2022-01-04", "2022-01-05"]
+    assert single["days"] == 400
+    assert adb.status()["calls"] == 2
+
+def test_slow_query_times_out_without_blocking_the_loop(db):
+    adb = AsyncDatabase(db, max_workers=1)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        with pytest.raises(QueryTimeoutError):
+            await adb.execute_query(SLOW_QUERY, timeout=0.3)
+        elapsed = time.perf_counter() - started
+        # The only worker must be free again for the next call
+        rows = await adb.execute_query("SELECT 1 AS one", timeout=2.0)
+        ticking.cancel()
+        return elapsed, ticks, rows
+
+    try:
+        elapsed, ticks, rows = asyncio.run(scenario())
+    finally:
+        adb.shutdown()
+
+    assert elapsed < 2.0
+    assert ticks >= 10
+    assert rows == [{"one": 1}]
+    assert adb.status()["timeouts"] == 1
+
+def test_awaitable_breadth_queries_match_sync_methods(db):
+    cache = QueryResultCache(db)
+    shared = MarketBreadthQueries(db, mirror=BreadthMirror(db), atr_index=AtrPercentileIndex(db), cache=cache)
+    plain = MarketBreadthQueries(db)
+    adb = AsyncDatabase(db)
+    queries = AsyncMarketBreadthQueries(adb, shared)
+    atr = plain.get_true_range_data(60, ANCHOR)[0]["average_true_range_14"]
+
+    async def scenario():
+        return {
+            "latest": await queries.get_latest_breadth_data(30, ANCHOR),
+            "true_range": await queries.get_true_range_data(60, ANCHOR, timeout=2.0),
+            "day": await queries.get_breadth_indicators_for_date("2022-06-01"),
+            "regime": await queries.get_regime_analysis(90, ANCHOR),
+            "percentile": await queries.calculate_atr_percentile(atr, 120, ANCHOR),
+            "context": await queries.get_volatility_context(20, ANCHOR)
+        }
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        adb.shutdown()
+
+    for source in (shared, plain):
+        assert results["latest"] == source.get_latest_breadth_data(30, ANCHOR)
+        assert results["true_range"] == source.get_true_range_data(60, ANCHOR)
+        assert results["day"] == source.get_breadth_indicators_for_date("2022-06-01")
+        assert results["regime"] == source.get_regime_analysis(90, ANCHOR)
+        assert results["percentile"] == pytest.approx(source.calculate_atr_percentile(atr, 120, ANCHOR))
+        assert results["context"] == pytest.approx(source.get_volatility_context(20, ANCHOR))
+    assert results["true_range"] and results["percentile"] > 0
+    # The awaitable calls filled the shared cache
+    assert cache.stats()["hits"] >= 4
+    assert adb.status()["calls"] == 6
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Tests for the ATR percentile index
+"""
+
+import sqlite3
+
+import numpy as np
+import pytest
+
+from src.database.atr_index import AtrPercentileIndex, SortedBlockIndex
+from src.database.connection import DatabaseConnection, TradingDataQueries
+from src.database.data_version import bump_data_version
+
+def sql_percentile(db_path, value, start_date, end_date="9999-12-31"):
+    """Percentile as the SQL path of calculate_atr_percentile computes it"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        at_most, total = conn.execute("""
+            SELECT SUM(CASE WHEN average_true_range_14 <= ? THEN 1 ELSE 0 END), COUNT(*)
+            FROM market_breadth_daily
+            WHERE date >= ? AND date <= ? AND average_true_range_14 IS NOT NULL
+        """, (value, start_date, end_date)).fetchone()
+    finally:
+        conn.close()
+    return at_most * 100.0 / total if total else 0.0
+
+@pytest.fixture
+def polled_db(breadth_db_path):
+    connection = DatabaseConnection(str(breadth_db_path), external_check_interval=0.0)
+    yield connection
+    connection.close()
+
+def test_block_index_counts_match_brute_force():
+    rng = np.random.default_rng(5)
+    values = rng.normal(size=300).round(2).tolist()
+    tree = SortedBlockIndex()
+    for value in values:
+        tree.append(value)
+
+    for start, stop, probe in [(0, 300, 0.0), (17, 255, 0.5), (128, 129, values[128]), (99, 300, -1.0)]:
+        assert tree.count_at_most(probe, start, stop) == sum(value <= probe for value in values[start:stop])
+
+    tree.truncate(100)
+    assert len(tree) == 100
+    assert tree.count_at_most(0.0) == sum(value <= 0.0 for value in values[:100])
+
+def test_percentiles_match_sql(db, breadth_db_path):
+    index = AtrPercentileIndex(db)
+    for value in (20.0, 40.0, 60.0):
+        for start_date in ("2022-01-01", "2022-09-15", "2023-03-01"):
+            assert index.percentile(value, start_date) == pytest.approx(sql_percentile(breadth_db_path, value, start_date))
+            for end_date in ("2022-02-01", "2023-03-31"):
+                assert index.percentile(value, start_date, end_date) == \
+                    pytest.approx(sql_percentile(breadth_db_path, value, start_date, end_date))
+
+def test_external_update_rebuilds_index(polled_db, breadth_db_path):
+    index = AtrPercentileIndex(polled_db)
+    before = index.percentile(1.0, "2022-01-01")
+
+    conn = sqlite3.connect(str(breadth_db_path))
+    conn.execute("UPDATE market_breadth_daily SET average_true_range_14 = 0.5 WHERE date < '2022-06-01'")
+    conn.commit()
+    bump_data_version(conn)
+    conn.close()
+
+    expected = sql_percentile(breadth_db_path, 1.0, "2022-01-01")
+    assert expected > before
+    assert index.percentile(1.0, "2022-01-01") == pytest.approx(expected)
+    assert index.rebuilds == 2
+
+def test_own_append_extends_index(polled_db, breadth_db_path):
+    index = AtrPercentileIndex(polled_db)
+    index.percentile(30.0)
+    TradingDataQueries(polled_db).insert_breadth_data({
+        "date": "2030-01-02", "daily_high": 5100.0, "daily_low": 4900.0, "daily_close": 5000.0
+    })
+
+    assert index.percentile(30.0, "2022-01-01") == pytest.approx(sql_percentile(breadth_db_path, 30.0, "2022-01-01"))
+    assert index.rebuilds == 1
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the market breadth mirror
+"""
+
+import sqlite3
+
+import pytest
+
+from src.database.breadth_mirror import BreadthMirror
+from src.database.connection import DatabaseConnection, TradingDataQueries
+from src.database.data_version import bump_data_version
+
+def external_update(db_path, sql, params=()):
+    """Write like an importer process: own connection, data version bumped after commit"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.execute(sql, params)
+        conn.commit()
+        bump_data_version(conn)
+    finally:
+        conn.close()
+
+@pytest.fixture
+def polled_db(breadth_db_path):
+    connection = DatabaseConnection(str(breadth_db_path), external_check_interval=0.0)
+    yield connection
+    connection.close()
+
+def close_on(snapshot, day):
+    return snapshot.row(day)[snapshot.index["daily_close"]]
+
+def test_snapshot_matches_table(db, breadth_db_path):
+    snapshot = BreadthMirror(db).snapshot()
+    conn = sqlite3.connect(str(breadth_db_path))
+    rows = conn.execute("SELECT * FROM market_breadth_daily ORDER BY date").fetchall()
+    conn.close()
+
+    assert snapshot.rows == rows
+
+def test_external_write_reloads_snapshot(polled_db, breadth_db_path):
+    mirror = BreadthMirror(polled_db)
+    first = mirror.snapshot()
+    assert mirror.snapshot() is first
+
+    external_update(breadth_db_path, "UPDATE market_breadth_daily SET daily_close = 1234.5 WHERE date = '2022-01-04'")
+
+    reloaded = mirror.snapshot()
+    assert reloaded is not first
+    assert close_on(reloaded, "2022-01-04") == 1234.5
+    assert mirror.loads == 2
+
+def test_external_write_waits_for_check_interval(breadth_db_path):
+    db = DatabaseConnection(str(breadth_db_path), external_check_interval=3600.0)
+    try:
+        mirror = BreadthMirror(db)
+        first = mirror.snapshot()
+        external_update(breadth_db_path, "UPDATE market_breadth_daily SET daily_close = 1.0 WHERE date = '2022-01-04'")
+
+        assert mirror.snapshot() is first
+        assert db.check_external_writes(force=True)
+        assert mirror.stale
+        assert close_on(mirror.snapshot(), "2022-01-04") == 1.0
+    finally:
+        db.close()
+
+def test_own_write_reloads_once(polled_db):
+    mirror = BreadthMirror(polled_db)
+    mirror.snapshot()
+    TradingDataQueries(polled_db).insert_breadth_data({"date": "2030-01-02", "daily_close": 5000.25})
+
+    snapshot = mirror.snapshot()
+    assert close_on(snapshot, "2030-01-02") == 5000.25
+    assert mirror.snapshot() is snapshot
+    assert (mirror.loads, mirror.invalidations) == (2, 1)
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Tests for columnar query results and the breadth snapshot columns
+"""
+
+import sqlite3
+
+import numpy as np
+
+from src.database.breadth_mirror import BreadthMirror
+from src.database.connection import rows_to_columns
+
+def test_mixed_int_and_float_rows_stay_fractional():
+    columns = rows_to_columns(["close", "count", "partial"], [(4700, 12, None), (4704.81, 15, 3), (4710, 9, 4)])
+
+    assert columns["close"].dtype == np.float64
+    np.testing.assert_array_equal(columns["close"], [4700.0, 4704.81, 4710.0])
+    assert columns["count"].dtype == np.int64
+    assert columns["partial"].dtype == np.float64
+    assert np.isnan(columns["partial"][0])
+
+def test_columnar_mode_matches_row_values(db, breadth_db_path):
+    conn = sqlite3.connect(str(breadth_db_path))
+    stored = dict(conn.execute("SELECT typeof(daily_close), count(*) FROM market_breadth_daily GROUP BY 1").fetchall())
+    conn.close()
+    # The fixture stores every fifth close as a whole number, which SQLite keeps as INTEGER
+    assert stored["integer"] > 0 and stored["real"] > 0
+
+    query = "SELECT date, daily_close, daily_high, t2108, stocks_up_4pct_daily FROM market_breadth_daily ORDER BY date"
+    columns = db.execute_query(query, mode="columnar")
+    rows = db.execute_query(query)
+
+    for name in ("daily_close", "daily_high", "t2108"):
+        assert columns[name].dtype == np.float64
+        np.testing.assert_array_equal(columns[name], [float(row[name]) for row in rows])
+    assert columns["stocks_up_4pct_daily"].dtype == np.int64
+
+def test_snapshot_columns_keep_fractional_values(db):
+    snapshot = BreadthMirror(db).snapshot()
+    close = snapshot.columns["daily_close"]
+    position = snapshot.index["daily_close"]
+
+    assert close.dtype == np.float64
+    np.testing.assert_array_equal(close, [float(row[position]) for row in snapshot.rows])
+    assert np.any(close != np.round(close))
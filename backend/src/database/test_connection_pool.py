@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled SQLite connections of DatabaseConnection
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.database.connection import ConnectionPool, DatabaseConnection, PoolClosedError
+
+def test_connections_are_reused_and_configured(empty_db_path):
+    db = DatabaseConnection(str(empty_db_path))
+    try:
+        for _ in range(20):
+            db.execute_query("SELECT count(*) AS days FROM market_breadth_daily")
+        with db.get_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+            with db.get_connection() as nested:
+                assert nested is conn
+        status = db.pool.status()
+    finally:
+        db.close()
+
+    assert status["connections_opened"] == 1
+    assert status["checkouts"] == 21
+
+def test_checkout_waits_for_a_free_connection(empty_db_path):
+    pool = ConnectionPool(empty_db_path, max_connections=1, checkout_timeout=5.0, check_same_thread=False)
+    held, release, acquired = threading.Event(), threading.Event(), []
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait(5)
+
+    def wait_for_connection():
+        with pool.connection() as conn:
+            acquired.append(conn.execute("SELECT 1").fetchone()[0])
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(5)
+    waiter = threading.Thread(target=wait_for_connection)
+    waiter.start()
+    waiter.join(0.3)
+    assert acquired == []
+
+    release.set()
+    holder.join()
+    waiter.join(5)
+    pool.close()
+
+    assert acquired == [1]
+    assert pool.stats["connections_opened"] == 1
+
+def test_checkout_times_out_when_pool_is_exhausted(empty_db_path):
+    pool = ConnectionPool(empty_db_path, max_connections=1, checkout_timeout=0.2)
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with pool.connection():
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    held.wait(5)
+    try:
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+    finally:
+        release.set()
+        holder.join()
+        pool.close()
+    assert pool.stats["wait_timeouts"] == 1
+
+def test_broken_idle_connection_is_replaced(empty_db_path):
+    pool = ConnectionPool(empty_db_path, health_check_interval=0.0)
+    with pool.connection() as conn:
+        pass
+    conn.close()
+
+    with pool.connection() as replacement:
+        assert replacement is not conn
+        assert replacement.execute("SELECT 1").fetchone()[0] == 1
+    pool.close()
+    assert pool.stats["connections_replaced"] == 1
+
+def test_open_transaction_is_rolled_back_on_release(empty_db_path):
+    pool = ConnectionPool(empty_db_path, max_connections=1)
+    with pool.connection() as conn:
+        conn.execute("INSERT INTO market_breadth_daily (date, daily_close) VALUES ('2024-01-02', 4700)")
+        assert conn.in_transaction
+
+    with pool.connection() as conn:
+        assert conn.execute("SELECT count(*) FROM market_breadth_daily").fetchone()[0] == 0
+    pool.close()
+
+def test_deadline_interrupts_long_statements(empty_db_path):
+    pool = ConnectionPool(empty_db_path)
+    query = "WITH RECURSIVE counter(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM counter) SELECT count(*) FROM counter"
+    with pool.connection() as conn:
+        with pool.deadline(0.2):
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute(query).fetchone()
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
+    pool.close()
+
+def test_closed_pool_rejects_checkouts(empty_db_path):
+    pool = ConnectionPool(empty_db_path)
+    with pool.connection():
+        pass
+    pool.close()
+
+    assert pool.status()["open_connections"] == 0
+    with pytest.raises(PoolClosedError):
+        with pool.connection():
+            pass
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy recomputation of the derived price metrics
+"""
+
+import shutil
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import breadth_rows, create_database, insert_breadth_rows
+from src.database.derived_metrics import ATR_COLUMNS, RANK_COLUMNS, recompute_derived_metrics
+
+METRIC_COLUMNS = ("previous_close", "true_range", *ATR_COLUMNS.values())
+
+def rows_with_gaps(count: int, seed: int = 11):
+    """Breadth rows where some days lack a close or a high/low"""
+    rows = breadth_rows("2022-01-03", count, seed)
+    for i, row in enumerate(rows):
+        if i % 17 == 5:
+            row["daily_close"] = None
+        if i % 23 == 7:
+            row["daily_high"] = row["daily_low"] = None
+    return rows
+
+def legacy_passes(conn: sqlite3.Connection):
+    """previous_close, true_range and ATR as the CSV importer computed them before NumPy"""
+    conn.execute("""
+        UPDATE market_breadth_daily
+        SET previous_close = (
+            SELECT daily_close FROM market_breadth_daily prev
+            WHERE prev.date < market_breadth_daily.date AND prev.daily_close IS NOT NULL
+            ORDER BY prev.date DESC LIMIT 1
+        )
+        WHERE daily_close IS NOT NULL
+    """)
+    conn.execute("""
+        UPDATE market_breadth_daily
+        SET true_range = MAX(
+            (daily_high - daily_low),
+            COALESCE(ABS(daily_high - previous_close), 0),
+            COALESCE(ABS(daily_low - previous_close), 0)
+        )
+        WHERE daily_high IS NOT NULL AND daily_low IS NOT NULL
+    """)
+    records = conn.execute(
+        "SELECT date, true_range FROM market_breadth_daily WHERE true_range IS NOT NULL ORDER BY date"
+    ).fetchall()
+    for i, (day, _) in enumerate(records):
+        atr_14 = sum(r[1] for r in records[i - 13:i + 1]) / 14 if i >= 13 else None
+        atr_20 = sum(r[1] for r in records[i - 19:i + 1]) / 20 if i >= 19 else None
+        conn.execute("UPDATE market_breadth_daily SET average_true_range_14 = ?, average_true_range_20 = ? "
+                     "WHERE date = ?", (atr_14, atr_20, day))
+    conn.commit()
+
+def read_table(db_path, columns=METRIC_COLUMNS):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        rows = conn.execute(f"SELECT date, {', '.join(columns)} FROM market_breadth_daily ORDER BY date").fetchall()
+    finally:
+        conn.close()
+    return {row[0]: row[1:] for row in rows}
+
+def assert_same_values(actual, expected):
+    assert list(actual) == list(expected)
+    for day, values in expected.items():
+        for value, reference in zip(actual[day], values):
+            if reference is None:
+                assert value is None, day
+            else:
+                assert value == pytest.approx(reference, rel=1e-12), day
+
+def filled_database(path, rows):
+    create_database(path)
+    insert_breadth_rows(path, rows)
+    return path
+
+def recompute(db_path, from_date=None):
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return recompute_derived_metrics(conn, from_date)
+    finally:
+        conn.close()
+
+def test_full_recompute_matches_legacy_importer(tmp_path):
+    rows = rows_with_gaps(300)
+    numpy_db = filled_database(tmp_path / "numpy.db", rows)
+    legacy_db = tmp_path / "legacy.db"
+    shutil.copy(numpy_db, legacy_db)
+
+    recompute(numpy_db)
+    conn = sqlite3.connect(str(legacy_db))
+    legacy_passes(conn)
+    conn.close()
+
+    assert_same_values(read_table(numpy_db), read_table(legacy_db))
+
+def test_appended_days_match_full_run(tmp_path):
+    rows = rows_with_gaps(300)
+    incremental = filled_database(tmp_path / "incremental.db", rows[:260])
+    recompute(incremental)
+
+    insert_breadth_rows(incremental, rows[260:])
+    stats = recompute(incremental, from_date=rows[260]["date"])
+    full = filled_database(tmp_path / "full.db", rows)
+    recompute(full)
+
+    assert stats["rows_scanned"] == 40
+    assert read_table(incremental) == read_table(full)
+    assert recompute(incremental)["rows_updated"] == 0
+
+def test_corrected_day_updates_following_windows(tmp_path):
+    rows = rows_with_gaps(200)
+    db_path = filled_database(tmp_path / "trading.db", rows)
+    recompute(db_path)
+
+    corrected = rows[150]["date"]
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("UPDATE market_breadth_daily SET daily_high = daily_high * 1.05 WHERE date = ?", (corrected,))
+    conn.commit()
+    conn.close()
+    stats = recompute(db_path, from_date=corrected)
+
+    rows[150]["daily_high"] *= 1.05
+    full = filled_database(tmp_path / "full.db", rows)
+    recompute(full)
+    assert read_table(db_path) == read_table(full)
+    assert 1 <= stats["rows_updated"] <= max(*ATR_COLUMNS, *RANK_COLUMNS)
+
+def test_caller_transaction_is_joined(tmp_path):
+    db_path = filled_database(tmp_path / "trading.db", rows_with_gaps(60))
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("BEGIN")
+    recompute_derived_metrics(conn)
+    assert conn.in_transaction
+    conn.rollback()
+    conn.close()
+
+    assert all(values[1] is None or np.isfinite(values[1]) for values in read_table(db_path).values())
+    assert all(values[2] is None for values in read_table(db_path).values())
+
+def brute_force_ranks(true_ranges, window):
+    """Percentile rank of each true range among the last window true ranges (values <= it)"""
+    ranks = [None] * len(true_ranges)
+    for i in range(window - 1, len(true_ranges)):
+        trailing = true_ranges[i - window + 1:i + 1]
+        ranks[i] = round(sum(value <= true_ranges[i] for value in trailing) * 100.0 / window, 2)
+    return ranks
+
+def brute_force_regime(rank):
+    if rank is None:
+        return None
+    return "low" if rank < 25 else "medium" if rank < 75 else "high" if rank < 95 else "extreme"
+
+def test_volatility_ranks_and_regime_match_brute_force(tmp_path):
+    db_path = filled_database(tmp_path / "trading.db", rows_with_gaps(300))
+    recompute(db_path)
+    table = read_table(db_path, ("true_range", *RANK_COLUMNS.values(), "risk_regime"))
+    with_range = [(day, values) for day, values in table.items() if values[0] is not None]
+    true_ranges = [values[0] for _, values in with_range]
+
+    expected = {window: brute_force_ranks(true_ranges, window) for window in RANK_COLUMNS}
+    for i, (day, (_, rank_20, rank_50, regime)) in enumerate(with_range):
+        assert rank_20 == expected[20][i], day
+        assert rank_50 == expected[50][i], day
+        assert regime == brute_force_regime(expected[50][i]), day
+    assert {values[3] for values in table.values()} >= {None, "low", "medium", "high", "extreme"}
+    assert all(values[1:] == (None, None, None) for values in table.values() if values[0] is None)
+
+def test_appended_days_continue_rank_windows(tmp_path):
+    columns = ("true_range", *RANK_COLUMNS.values(), "risk_regime")
+    rows = rows_with_gaps(300)
+    incremental = filled_database(tmp_path / "incremental.db", rows[:200])
+    recompute(incremental)
+    for start, end in ((200, 231), (231, 232), (232, 300)):
+        insert_breadth_rows(incremental, rows[start:end])
+        recompute(incremental, from_date=rows[start]["date"])
+
+    full = filled_database(tmp_path / "full.db", rows)
+    recompute(full)
+    assert read_table(incremental, columns) == read_table(full, columns)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the named query registry and the anchored breadth window queries
+"""
+
+import sqlite3
+
+import pytest
+
+from src.database.atr_index import AtrPercentileIndex
+from src.database.breadth_mirror import BreadthMirror
+from src.database.connection import MarketBreadthQueries
+from src.database.query_registry import NamedQuery, QueryRegistry
+
+ANCHOR = "2023-03-31"
+
+def test_named_queries_are_timed_per_name(db):
+    rows = db.execute_named("true_range_data", {"anchor_date": ANCHOR, "days": 30})
+    db.execute_named("breadth_for_date", {"date": "2022-01-04"}, single=True)
+    assert db.execute_named("breadth_for_date", {"date": "2021-01-04"}, single=True) is None
+
+    stats = db.registry.stats()
+    assert stats["true_range_data"]["calls"] == 1
+    assert stats["true_range_data"]["rows"] == len(rows) > 0
+    assert stats["breadth_for_date"]["calls"] == 2
+    assert stats["breadth_for_date"]["rows"] == 1
+    assert stats["breadth_for_date"]["avg_ms"] == pytest.approx(stats["breadth_for_date"]["total_ms"] / 2)
+
+    db.registry.reset_stats()
+    assert db.registry.stats()["true_range_data"]["calls"] == 0
+
+def test_parameters_are_checked_before_execution(db):
+    with pytest.raises(ValueError):
+        db.execute_named("true_range_data", {"days": 30})
+    with pytest.raises(ValueError):
+        db.execute_named("breadth_for_date", {"date": "2022-01-04", "days": 3})
+    with pytest.raises(KeyError):
+        db.execute_named("drop_everything")
+    assert db.registry.stats()["true_range_data"]["calls"] == 0
+
+def test_failed_queries_count_as_errors():
+    registry = QueryRegistry([NamedQuery("broken", "SELECT * FROM missing_table")])
+    conn = sqlite3.connect(":memory:")
+    with pytest.raises(sqlite3.OperationalError):
+        registry.fetch(conn, "broken")
+    conn.close()
+
+    assert registry.stats()["broken"]["errors"] == 1
+    assert registry.stats()["broken"]["calls"] == 0
+    registry.register(NamedQuery("broken", "SELECT * FROM missing_table"))
+    with pytest.raises(ValueError):
+        registry.register(NamedQuery("broken", "SELECT 1"))
+
+def test_windows_end_at_the_anchor_date(db, breadth_db_path):
+    queries = MarketBreadthQueries(db)
+    rows = queries.get_true_range_data(days=30, anchor_date=ANCHOR)
+    dates = [str(row["date"]) for row in rows]
+
+    conn = sqlite3.connect(str(breadth_db_path))
+    expected = [day for (day,) in conn.execute(
+        "SELECT date FROM market_breadth_daily WHERE date >= '2023-03-01' AND date <= ? "
+        "AND true_range IS NOT NULL ORDER BY date DESC", (ANCHOR,))]
+    conn.close()
+    assert dates == expected
+    assert dates[0] == ANCHOR
+
+    context = queries.get_volatility_context(days=30, anchor_date=ANCHOR)
+    assert context["sample_size"] == len(rows)
+    assert str(context["latest_date"]) == ANCHOR
+
+def test_mirror_answers_match_registry_queries(db):
+    sql = MarketBreadthQueries(db)
+    mirror = MarketBreadthQueries(db, mirror=BreadthMirror(db))
+    indexed = MarketBreadthQueries(db, atr_index=AtrPercentileIndex(db))
+
+    for days in (5, 30, 200):
+        assert mirror.get_true_range_data(days=days, anchor_date=ANCHOR) == \
+            sql.get_true_range_data(days=days, anchor_date=ANCHOR)
+        assert mirror.get_volatility_context(days=days, anchor_date=ANCHOR) == \
+            pytest.approx(sql.get_volatility_context(days=days, anchor_date=ANCHOR))
+        for atr in (20.0, 40.0, 60.0):
+            assert mirror.calculate_atr_percentile(atr, days, anchor_date=ANCHOR) == \
+                pytest.approx(sql.calculate_atr_percentile(atr, days, anchor_date=ANCHOR))
+            assert indexed.calculate_atr_percentile(atr, days, anchor_date=ANCHOR) == \
+                pytest.approx(sql.calculate_atr_percentile(atr, days, anchor_date=ANCHOR))
+    for day in ("2022-06-01", "2022-06-04"):
+        assert mirror.get_breadth_indicators_for_date(day) == sql.get_breadth_indicators_for_date(day)
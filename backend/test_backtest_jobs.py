@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the backtest job manager and chunked progress of MultiLayerBacktester
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from risk_management.backtest_jobs import (
+    BacktestJob, BacktestJobManager, JOB_CANCELLED, JOB_COMPLETED, JOB_FAILED, TERMINAL_STATES
+)
+from risk_management.multilayer_backtesting import MultiLayerBacktester, RunningSummary
+
+def sample_trades(count: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    entries = rng.uniform(20, 100, count)
+    exits = entries * (1 + rng.normal(0.01, 0.05, count))
+    return [{"entry_price": float(entry), "exit_price": float(exit_price), "symbol": f"T{i}"}
+            for i, (entry, exit_price) in enumerate(zip(entries, exits))]
+
+def test_running_summary_matches_full_recomputation():
+    backtester = MultiLayerBacktester()
+    returns = list(np.random.default_rng(1).normal(0.005, 0.04, 500))
+    running = RunningSummary()
+    assert running.metrics() == backtester.calculate_summary_metrics([])
+
+    for i, trade_return in enumerate(returns):
+        running.add(trade_return)
+        if i % 50 == 0 or i == len(returns) - 1:
+            assert running.metrics() == pytest.approx(backtester.calculate_summary_metrics(returns[:i + 1]))
+
+def test_progress_reports_each_chunk():
+    trades = sample_trades(95)
+    reports = []
+    result = MultiLayerBacktester().run_comprehensive_backtest(trades, progress_callback=reports.append,
+                                                               chunk_size=10)
+
+    assert [report["completed_trades"] for report in reports] == list(range(10, 100, 10)) + [95]
+    assert reports[-1]["total_return_pct"] == pytest.approx(result["performance_metrics"]["total_return_pct"])
+    assert reports[-1]["max_drawdown"] == pytest.approx(result["backtest_summary"]["max_drawdown"])
+
+def test_memory_error_is_not_reported_as_generic_failure():
+    def exhausted(metrics):
+        raise MemoryError()
+
+    with pytest.raises(MemoryError):
+        MultiLayerBacktester().run_comprehensive_backtest(sample_trades(5), progress_callback=exhausted)
+
+def test_memory_error_marks_job_failed_with_limit():
+    manager = BacktestJobManager(max_workers=1)
+    job = BacktestJob(job_id="job", total_trades=5, chunk_size=5, memory_limit_mb=64)
+    manager.jobs[job.job_id] = job
+
+    future = Future()
+    future.set_exception(MemoryError())
+    manager._on_job_done(job.job_id, future)
+
+    assert job.status == JOB_FAILED
+    assert job.error == "Memory limit of 64 MB exceeded"
+
+def test_job_runs_in_worker_pool():
+    manager = BacktestJobManager(max_workers=1)
+    try:
+        job = manager.submit(sample_trades(40), chunk_size=10)
+        deadline = time.time() + 60
+        while job.status != JOB_COMPLETED and time.time() < deadline:
+            time.sleep(0.1)
+
+        assert job.status == JOB_COMPLETED
+        assert job.result["total_trades"] == 40
+        # The final progress message can arrive just after the result
+        while job.completed_trades < 40 and time.time() < deadline:
+            time.sleep(0.1)
+        assert [entry["completed_trades"] for entry in job.progress] == [10, 20, 30, 40]
+    finally:
+        manager.shutdown()
+
+def test_cancelling_a_queued_job_returns():
+    manager = BacktestJobManager(max_workers=1)
+    try:
+        # The pool hands max_workers + 1 calls to its queue, so the fourth job stays pending
+        jobs = [manager.submit(sample_trades(50000), chunk_size=1000) for _ in range(4)]
+        assert jobs[3].future.running() is False
+
+        canceller = threading.Thread(target=manager.cancel, args=(jobs[3].job_id,), daemon=True)
+        canceller.start()
+        canceller.join(10)
+        assert not canceller.is_alive()
+        assert jobs[3].status == JOB_CANCELLED
+        assert jobs[3].finished_at is not None
+
+        for job in jobs[:3]:
+            manager.cancel(job.job_id)
+        deadline = time.time() + 60
+        while any(job.status not in TERMINAL_STATES for job in jobs) and time.time() < deadline:
+            time.sleep(0.1)
+        assert all(job.status == JOB_CANCELLED for job in jobs)
+    finally:
+        manager.shutdown()
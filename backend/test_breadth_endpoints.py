@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for the /breadth endpoints on the breadth mirror and query result cache
+"""
+
+import asyncio
+import json
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from src.database.async_queries import AsyncDatabase
+from src.database.breadth_mirror import BreadthMirror
+from src.database.connection import DatabaseConnection
+from src.database.data_version import bump_data_version
+from src.database.result_cache import QueryResultCache
+
+class LoopCheckingDatabase(DatabaseConnection):
+    """Database that records connection checkouts made on the event loop thread"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts_on_loop = 0
+
+    def get_connection(self):
+        try:
+            asyncio.get_running_loop()
+            self.checkouts_on_loop += 1
+        except RuntimeError:
+            pass
+        return super().get_connection()
+
+def import_rows(db_path, rows):
+    """Append rows like the CSV importer process: own connection, data version bumped"""
+    conn = sqlite3.connect(str(db_path))
+    try:
+        conn.executemany("INSERT INTO market_breadth_daily (date, daily_close, stocks_up_4pct_daily) VALUES (?, ?, ?)", rows)
+        conn.commit()
+        bump_data_version(conn)
+    finally:
+        conn.close()
+
+@pytest.fixture
+def breadth_db(breadth_db_path):
+    db = LoopCheckingDatabase(str(breadth_db_path), external_check_interval=0.0)
+    yield db
+    db.close()
+
+@pytest.fixture
+def client(breadth_db, monkeypatch):
+    adb = AsyncDatabase(breadth_db)
+    monkeypatch.setattr(main, "db_manager", breadth_db)
+    monkeypatch.setattr(main, "async_db", adb)
+    monkeypatch.setattr(main, "breadth_mirror", BreadthMirror(breadth_db))
+    monkeypatch.setattr(main, "query_cache", QueryResultCache(breadth_db))
+    yield TestClient(main.app)
+    adb.shutdown()
+
+def test_summary_follows_external_import(client, breadth_db, breadth_db_path):
+    before = client.get("/breadth/summary").json()
+    assert client.get("/breadth/summary").json() == before
+    assert main.query_cache.hits == 1
+
+    import_rows(breadth_db_path, [("2024-01-02", 4800.5, 321), ("2024-01-03", 4810.25, 123)])
+
+    after = client.get("/breadth/summary").json()
+    assert after["total_records"] == before["total_records"] + 2
+    assert after["date_range_end"] == "2024-01-03"
+    assert after["latest_data"]["date"] == "2024-01-03"
+    latest = client.get("/breadth/latest").json()
+    assert (latest["date"], latest["stocks_up_4pct_daily"]) == ("2024-01-03", 123)
+
+def test_version_checks_stay_off_the_event_loop(client, breadth_db, breadth_db_path):
+    for _ in range(3):
+        assert client.get("/breadth/summary").status_code == 200
+        assert client.get("/breadth/latest").status_code == 200
+    import_rows(breadth_db_path, [("2024-01-02", 4800.5, 321)])
+    assert client.get("/breadth/summary").json()["date_range_end"] == "2024-01-02"
+
+    assert breadth_db.checkouts_on_loop == 0
+
+def page_through(client, order, cursor_param, cursor_header):
+    params = {"start_date": "2022-01-01", "end_date": "2023-12-31", "limit": 37, "order": order}
+    dates = []
+    while True:
+        response = client.get("/breadth/historical", params=params)
+        assert response.status_code == 200
+        dates += [row["date"] for row in response.json()]
+        if cursor_header not in response.headers:
+            return dates
+        params[cursor_param] = response.headers[cursor_header]
+
+def test_pages_return_every_row_once_in_order(client, breadth_db_path):
+    conn = sqlite3.connect(str(breadth_db_path))
+    expected = [row[0] for row in conn.execute("SELECT date FROM market_breadth_daily ORDER BY date")]
+    conn.close()
+
+    assert page_through(client, "desc", "before_date", "X-Next-Before-Date") == expected[::-1]
+    assert page_through(client, "asc", "after_date", "X-Next-After-Date") == expected
+
+def test_streamed_formats_match_json_pages(client):
+    params = {"start_date": "2022-03-01", "end_date": "2022-06-30", "order": "asc"}
+    pages = client.get("/breadth/historical", params=dict(params, limit=1000)).json()
+
+    ndjson = client.get("/breadth/historical", params=dict(params, format="ndjson"))
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert records == [{key: page[key] for key in record} for record, page in zip(records, pages)]
+    assert len(records) == len(pages)
+
+    lines = client.get("/breadth/historical", params=dict(params, format="csv")).text.splitlines()
+    assert lines[0].startswith("date,")
+    assert [line.split(",")[0] for line in lines[1:]] == [page["date"] for page in pages]
+
+def test_cursor_headers_are_exposed_to_the_renderer(client):
+    response = client.get("/breadth/historical", params={"start_date": "2022-01-01", "limit": 5},
+                          headers={"Origin": "app://renderer"})
+    exposed = {name.strip().lower() for name in response.headers["access-control-expose-headers"].split(",")}
+
+    assert "x-next-before-date" in response.headers
+    assert {"x-next-before-date", "x-next-after-date"} <= exposed
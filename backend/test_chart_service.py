@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the headless chart service
+"""
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from risk_management.chart_service import ChartService
+from risk_management.multilayer_backtesting import MultiLayerBacktester
+
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+def sample_result():
+    trades = [{"entry_price": 20.0 + i, "exit_price": 20.5 + i * 1.01, "regime": "bull_normal"} for i in range(40)]
+    return MultiLayerBacktester().run_comprehensive_backtest(trades)
+
+def test_import_does_not_load_matplotlib():
+    code = "import sys, risk_management.chart_service; print('matplotlib' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.strip() == "False"
+
+def test_backtest_chart_is_cached_in_memory_and_on_disk(tmp_path):
+    charts = ChartService(str(tmp_path))
+    image = charts.backtest_result(sample_result())
+    assert image.startswith(PNG_MAGIC)
+    assert charts.backtest_result(sample_result()) == image
+    assert (charts.renders, charts.cache_hits) == (1, 1)
+    assert [path.suffix for path in tmp_path.iterdir()] == [".png"]
+
+    restarted = ChartService(str(tmp_path))
+    assert restarted.backtest_result(sample_result()) == image
+    assert restarted.renders == 0
+
+def test_slow_render_does_not_block_cache_hits():
+    charts = ChartService()
+    charts._cached("ready", lambda: b"ready")
+    release = threading.Event()
+
+    def slow_render():
+        release.wait(5)
+        return b"slow"
+
+    worker = threading.Thread(target=charts._cached, args=("slow", slow_render))
+    worker.start()
+    try:
+        started = time.perf_counter()
+        assert charts._cached("ready", lambda: b"other") == b"ready"
+        assert charts._cached("fast", lambda: b"fast") == b"fast"
+        assert time.perf_counter() - started < 1.0
+    finally:
+        release.set()
+        worker.join()
+
+def test_concurrent_requests_render_once():
+    charts = ChartService()
+    calls = []
+
+    def render():
+        calls.append(1)
+        time.sleep(0.2)
+        return b"image"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(charts._cached("key", render))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [b"image"] * 5
+    assert len(calls) == 1
+
+def test_failed_render_is_retried():
+    charts = ChartService()
+
+    def broken():
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        charts._cached("key", broken)
+    assert charts._cached("key", lambda: b"image") == b"image"
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar backtest result store
+"""
+
+import numpy as np
+import pytest
+
+from risk_management.columnar_store import (
+    ColumnarResultReader, ColumnarResultWriter, MANIFEST_FILE, write_trade_results
+)
+from risk_management.multilayer_backtesting import BacktestCancelled, MultiLayerBacktester
+
+def sample_trades(count: int):
+    return [{"entry_price": 50.0 + i, "exit_price": 51.0 + i * 1.01, "symbol": f"T{i}",
+             "regime": "crisis_opportunity" if i % 3 == 0 else "bull_normal"} for i in range(count)]
+
+def test_round_trip(tmp_path):
+    trades = [{"trade_id": i, "symbol": f"S{i}", "entry_price": 10.0 + i, "exit_price": 11.0 + i,
+               "return_pct": 1.5 * i, "regime": "high_vol_stress" if i % 2 else "unknown_label"}
+              for i in range(25)]
+    manifest = write_trade_results(str(tmp_path / "store"), trades, metadata={"run": 1})
+    assert manifest["rows"] == 25
+
+    reader = ColumnarResultReader(str(tmp_path / "store"))
+    assert len(reader) == 25
+    assert reader.metadata == {"run": 1}
+    np.testing.assert_array_equal(reader["entry_price"], [trade["entry_price"] for trade in trades])
+    assert list(reader.decode("regime")[:2]) == ["unknown", "high_vol_stress"]
+    assert reader.to_structured(5, 7)["symbol"].tolist() == ["S5", "S6"]
+
+def test_backtest_streams_results_to_store(tmp_path, monkeypatch):
+    monkeypatch.setattr("risk_management.multilayer_backtesting.STORE_FLUSH_ROWS", 7)
+    store = tmp_path / "store"
+    result = MultiLayerBacktester().run_comprehensive_backtest(sample_trades(30), result_store=str(store))
+
+    assert result["trade_results"] == []
+    assert result["trade_results_store"] == str(store)
+    reader = ColumnarResultReader(str(store))
+    np.testing.assert_array_equal(reader["trade_id"], np.arange(30))
+    assert reader["return_pct"].sum() == pytest.approx(result["performance_metrics"]["total_return_pct"])
+
+def test_cancelled_backtest_removes_partial_store(tmp_path, monkeypatch):
+    monkeypatch.setattr("risk_management.multilayer_backtesting.STORE_FLUSH_ROWS", 5)
+    store = tmp_path / "store"
+
+    def cancel_after_first_chunk(metrics):
+        if metrics["completed_trades"] >= 10:
+            raise BacktestCancelled("cancelled")
+
+    with pytest.raises(BacktestCancelled):
+        MultiLayerBacktester().run_comprehensive_backtest(sample_trades(30), progress_callback=cancel_after_first_chunk,
+                                                          chunk_size=10, result_store=str(store))
+    assert not store.exists()
+
+def test_failed_backtest_removes_partial_store(tmp_path):
+    store = tmp_path / "store"
+    trades = sample_trades(10) + [{"entry_price": 0.0, "exit_price": 1.0}]
+    result = MultiLayerBacktester().run_comprehensive_backtest(trades, result_store=str(store))
+
+    assert "error" in result
+    assert not store.exists()
+
+def test_aborted_writer_keeps_foreign_files(tmp_path):
+    store = tmp_path / "store"
+    store.mkdir()
+    (store / "notes.txt").write_text("keep")
+    with pytest.raises(RuntimeError):
+        with ColumnarResultWriter(str(store)) as writer:
+            writer.append_records(sample_trades(3))
+            raise RuntimeError("boom")
+
+    assert writer.closed
+    assert sorted(path.name for path in store.iterdir()) == ["notes.txt"]
+    assert not (store / MANIFEST_FILE).exists()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for the exit kernel
+"""
+
+import numpy as np
+import pytest
+
+from risk_management.exit_kernel import (
+    EXIT_OPEN, EXIT_PROFIT, EXIT_STOP, EXIT_TIME, ORDERINGS, _run_exit_kernel_loops, run_exit_kernel
+)
+
+def random_tensor(n_trades: int = 300, n_days: int = 8, seed: int = 2):
+    rng = np.random.default_rng(seed)
+    entry = rng.uniform(10, 100, n_trades)
+    close = entry[:, None] * np.cumprod(1 + rng.normal(0, 0.04, (n_trades, n_days)), axis=1)
+    high = close * (1 + rng.uniform(0, 0.05, close.shape))
+    low = close * (1 - rng.uniform(0, 0.05, close.shape))
+    close[rng.random(close.shape) < 0.1] = np.nan
+    profit_levels = entry[:, None] * np.array([1.03, 1.06, np.inf])
+    close_pct = np.tile([25.0, 75.0, 0.0], (n_trades, 1))
+    stop = entry * rng.uniform(0.9, 0.98, n_trades)
+    stop_multipliers = np.where(rng.random(close.shape) < 0.2, rng.uniform(0.7, 1.3, close.shape), 1.0)
+    max_hold_days = rng.integers(0, 7, n_trades)
+    return entry, stop, profit_levels, close_pct, high, low, close, stop_multipliers, max_hold_days
+
+def scalar_kernel(entry, stop, profit_levels, close_pct, high, low, close, stop_multipliers,
+                  ordering, max_levels_per_day, max_hold_days):
+    """Trade-by-trade loops as the Numba path runs them, here in plain Python"""
+    n = len(entry)
+    realized, remaining, last_close = np.zeros(n), np.zeros(n), np.zeros(n)
+    levels_hit, exit_day = np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+    exit_reason = np.zeros(n, dtype=np.int8)
+    _run_exit_kernel_loops(entry, stop, profit_levels, close_pct, high, low, close, stop_multipliers,
+                           ordering, max_levels_per_day, np.broadcast_to(max_hold_days, n).astype(np.int64),
+                           realized, remaining, levels_hit, exit_day, exit_reason, last_close)
+    open_pnl = np.where(exit_reason == EXIT_OPEN, (last_close - entry) / entry * (remaining / 100), 0.0)
+    return {"total_return": realized + open_pnl, "remaining_position": remaining, "levels_hit": levels_hit,
+            "exit_day": exit_day, "exit_reason": exit_reason}
+
+@pytest.mark.parametrize("ordering", list(ORDERINGS))
+@pytest.mark.parametrize("max_levels_per_day", [0, 1])
+@pytest.mark.parametrize("per_trade_hold", [False, True])
+def test_vectorized_path_matches_scalar_loops(ordering, max_levels_per_day, per_trade_hold):
+    entry, stop, profit_levels, close_pct, high, low, close, multipliers, hold = random_tensor()
+    max_hold_days = hold if per_trade_hold else 5
+
+    result = run_exit_kernel(entry, stop, profit_levels, close_pct, high, low, close, ordering=ordering,
+                             max_levels_per_day=max_levels_per_day, max_hold_days=max_hold_days,
+                             stop_multipliers=multipliers, use_numba=False)
+    expected = scalar_kernel(entry, stop, profit_levels, close_pct, high, low, close, multipliers,
+                             ORDERINGS[ordering], max_levels_per_day, max_hold_days)
+
+    for name, values in expected.items():
+        np.testing.assert_allclose(result[name], values, err_msg=name)
+    assert set(np.unique(result["exit_reason"])) <= {EXIT_OPEN, EXIT_STOP, EXIT_PROFIT, EXIT_TIME}
+
+def test_intraday_ordering_decides_bars_hitting_stop_and_target():
+    # Day 0 reaches the first target and the stop; day 1 closes above day 0
+    entry, stop = np.array([100.0]), np.array([95.0])
+    levels, pct = np.array([[104.0, np.inf]]), np.array([[50.0, 0.0]])
+    high, low = np.array([[105.0, 101.0]]), np.array([[94.0, 99.0]])
+    close = np.array([[98.0, 100.0]])
+
+    def run(ordering):
+        return run_exit_kernel(entry, stop, levels, pct, high, low, close, ordering=ordering, use_numba=False)
+
+    stop_first = run("stop_first")
+    assert stop_first["exit_reason"][0] == EXIT_STOP
+    assert stop_first["total_return"][0] == pytest.approx(-0.05)
+
+    profit_first = run("profit_first")
+    assert profit_first["exit_reason"][0] == EXIT_STOP
+    assert profit_first["levels_hit"][0] == 1
+    assert profit_first["total_return"][0] == pytest.approx(0.04 * 0.5 - 0.05 * 0.5)
+
+    # Down day against the entry price: high first, like profit_first
+    assert run("close_direction")["total_return"][0] == pytest.approx(profit_first["total_return"][0])
+
+def test_time_exit_and_open_marking():
+    entry, stop = np.array([100.0, 100.0]), np.array([90.0, 90.0])
+    levels, pct = np.full((2, 1), np.inf), np.zeros((2, 1))
+    close = np.array([[101.0, 102.0, 103.0], [101.0, np.nan, 104.0]])
+
+    result = run_exit_kernel(entry, stop, levels, pct, close + 1, close - 1, close, max_hold_days=3, use_numba=False)
+
+    assert result["exit_reason"].tolist() == [EXIT_TIME, EXIT_OPEN]
+    assert result["exit_day"].tolist() == [2, -1]
+    np.testing.assert_allclose(result["total_return"], [0.03, 0.04])
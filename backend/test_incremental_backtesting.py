@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental multi-layer backtest over the deep-dive trade CSV
+"""
+
+import shutil
+
+import pytest
+
+from risk_management.incremental_backtesting import IncrementalMultiLayerBacktester
+
+HEADER = ["Kuerzel", "Tag des Ausbruchs", "Entry", "Move 2 day", "VIX CBOE 1-day",
+          "$ Tag 1", "$ Tag 1 Low"] + [
+    column for day in range(2, 6) for column in (f"$ Tag {day}", f"$ Tag {day} High", f"$ Tag {day} Low")
+]
+
+def german(value: float) -> str:
+    return f"{value:.2f}".replace(".", ",")
+
+def trade_row(i: int, days: int = 5, entry: str = None) -> str:
+    """Deep-dive CSV row of a trade with closes for the first days"""
+    price = 20.0 + i
+    values = ["SYM%d" % i, "2024-01-%02d" % (i % 28 + 1), entry or german(price) + " €",
+              german((i % 7 - 3) * 1.5) + "%", german(12.0 + i % 30)]
+    closes = [price * (1 + 0.01 * ((i + day) % 5 - 2)) for day in range(1, 6)]
+    values += [german(closes[0]), german(closes[0] * 0.97)] if days >= 1 else ["", ""]
+    for day in range(2, 6):
+        close = closes[day - 1]
+        values += [german(close), german(close * 1.02), german(close * 0.96)] if day <= days else ["", "", ""]
+    return ";".join(values)
+
+def write_csv(path, rows):
+    path.write_text("\n".join([";".join(HEADER)] + rows) + "\n", encoding="utf-8")
+
+def full_run(csv_path, tmp_path):
+    """Fresh full backtest of a copy of the CSV (no shared cache or state)"""
+    copy_dir = tmp_path / "full"
+    shutil.rmtree(copy_dir, ignore_errors=True)
+    copy_dir.mkdir()
+    copy = copy_dir / csv_path.name
+    shutil.copy(csv_path, copy)
+    return IncrementalMultiLayerBacktester(str(copy)).run(full=True)
+
+def assert_same_layers(result, expected):
+    assert result["total_trades"] == expected["total_trades"]
+    for layer, summary in expected["layers"].items():
+        assert result["layers"][layer] == pytest.approx(summary)
+
+def test_appended_trades_are_merged(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    rows = [trade_row(i) for i in range(30)]
+    write_csv(csv_path, rows)
+    backtester = IncrementalMultiLayerBacktester(str(csv_path))
+    assert backtester.run()["mode"] == "full"
+
+    write_csv(csv_path, rows + [trade_row(i) for i in range(30, 45)])
+    result = IncrementalMultiLayerBacktester(str(csv_path)).run()
+
+    assert result["mode"] == "incremental"
+    assert result["new_trades"] == 15
+    assert_same_layers(result, full_run(csv_path, tmp_path))
+
+def test_open_trades_are_reevaluated_when_they_close(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    rows = [trade_row(i) for i in range(20)]
+    write_csv(csv_path, rows + [trade_row(20, days=2), trade_row(21)])
+    first = IncrementalMultiLayerBacktester(str(csv_path)).run()
+    assert first["total_trades"] == 22
+    assert first["pending_trades"] == 2
+
+    write_csv(csv_path, rows + [trade_row(20), trade_row(21), trade_row(22)])
+    result = IncrementalMultiLayerBacktester(str(csv_path)).run()
+
+    assert result["mode"] == "incremental"
+    assert result["pending_trades"] == 0
+    assert_same_layers(result, full_run(csv_path, tmp_path))
+
+def test_fixed_rows_are_picked_up(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    rows = [trade_row(i) for i in range(10)]
+    write_csv(csv_path, rows + [trade_row(10, entry="#DIV/0!"), trade_row(11)])
+    first = IncrementalMultiLayerBacktester(str(csv_path)).run()
+    assert first["total_trades"] == 11
+    assert first["skipped_rows"] == 1
+
+    write_csv(csv_path, rows + [trade_row(10), trade_row(11)])
+    result = IncrementalMultiLayerBacktester(str(csv_path)).run()
+
+    assert result["mode"] == "incremental"
+    assert result["skipped_rows"] == 0
+    assert_same_layers(result, full_run(csv_path, tmp_path))
+
+def test_rewritten_history_triggers_full_run(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    write_csv(csv_path, [trade_row(i) for i in range(10)])
+    IncrementalMultiLayerBacktester(str(csv_path)).run()
+
+    write_csv(csv_path, [trade_row(i + 100) for i in range(10)])
+    result = IncrementalMultiLayerBacktester(str(csv_path)).run()
+
+    assert result["mode"] == "full"
+    assert_same_layers(result, full_run(csv_path, tmp_path))
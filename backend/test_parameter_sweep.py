@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the chunked parameter sweep with early pruning
+"""
+
+import numpy as np
+import pytest
+
+from risk_management.exit_kernel import compute_exit_levels, run_exit_kernel
+from risk_management.parameter_sweep import (
+    STATUS_COMPLETE, STATUS_PRUNED_DRAWDOWN, STATUS_PRUNED_WIN_RATE, ParameterSweep, PruningRules, adjustment_grid
+)
+from risk_management.sweep_store import SweepResultStore
+from risk_management.synthetic_trades import SyntheticTradeGenerator
+
+METRICS = ("trades_evaluated", "total_return", "avg_return_per_trade", "win_rate", "sharpe_ratio", "max_drawdown")
+
+@pytest.fixture(scope="module")
+def dataset():
+    return SyntheticTradeGenerator(seed=9).generate(1200)
+
+@pytest.fixture(scope="module")
+def grid():
+    return adjustment_grid(stop_adjustments=(0.6, 1.0, 1.6), profit_adjustments=(0.8, 1.2),
+                           vix_thresholds=(None, (12, 20, 40, 45)))
+
+def full_results(dataset, grid, chunk_size=250):
+    return ParameterSweep(dataset, grid, pruning=PruningRules(None, None), chunk_size=chunk_size).run()["results"]
+
+def test_unpruned_results_match_one_pass_evaluation(dataset, grid):
+    configuration = grid[0]
+    levels = compute_exit_levels(dataset.entry, dataset.true_range, dataset.regime,
+                                 stop_adjustment=configuration["stop_adjustment"],
+                                 profit_adjustment=configuration["profit_adjustment"])
+    returns = run_exit_kernel(dataset.entry, levels["stop"], levels["profit_levels"], levels["close_pct"],
+                              dataset.high, dataset.low, dataset.close)["total_return"]
+    equity = np.cumprod(1 + returns)
+    drawdown = (equity - np.maximum.accumulate(equity)) / np.maximum.accumulate(equity)
+
+    result = full_results(dataset, grid)[0]
+    assert result["status"] == STATUS_COMPLETE
+    assert result["trades_evaluated"] == len(dataset)
+    assert result["total_return"] == pytest.approx(returns.sum())
+    assert result["win_rate"] == pytest.approx((returns > 0).mean())
+    assert result["max_drawdown"] == pytest.approx(drawdown.min())
+
+def test_chunk_size_does_not_change_results(dataset, grid):
+    for chunked, whole in zip(full_results(dataset, grid, chunk_size=37), full_results(dataset, grid, chunk_size=5000)):
+        assert {name: chunked[name] for name in METRICS} == pytest.approx({name: whole[name] for name in METRICS})
+
+def test_pruning_is_exact(dataset, grid):
+    pruning = PruningRules(max_drawdown_tolerance=55.5, min_win_rate=0.56)
+    pruned_run = ParameterSweep(dataset, grid, pruning=pruning, chunk_size=100).run()
+    full = full_results(dataset, grid)
+
+    statuses = {result["status"] for result in pruned_run["results"]}
+    assert statuses == {STATUS_COMPLETE, STATUS_PRUNED_DRAWDOWN, STATUS_PRUNED_WIN_RATE}
+    assert pruned_run["trade_evaluations"] < pruned_run["trade_evaluations_full"]
+    for result, reference in zip(pruned_run["results"], full):
+        if result["status"] == STATUS_COMPLETE:
+            assert {name: result[name] for name in METRICS} == pytest.approx({name: reference[name] for name in METRICS})
+            assert reference["max_drawdown"] >= -0.555 and reference["win_rate"] >= 0.56
+        if result["status"] == STATUS_PRUNED_DRAWDOWN:
+            assert reference["max_drawdown"] < -0.555
+        if result["status"] == STATUS_PRUNED_WIN_RATE:
+            assert reference["win_rate"] < 0.56
+
+def test_results_are_stored(dataset, grid, tmp_path):
+    store = SweepResultStore(str(tmp_path / "sweeps.db"))
+    output = ParameterSweep(dataset, grid[:4], pruning=PruningRules(None, None)).run(result_store=store, sweep_id="grid")
+
+    assert output["sweep_id"] == "grid"
+    assert store.get_sweep("grid")["result_count"] == 4
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the prepared trade dataset cache of the deep-dive CSV
+"""
+
+import threading
+
+import numpy as np
+
+from risk_management.prepared_dataset import PreparedTradeDataset, calculate_trade_true_range
+from test_incremental_backtesting import trade_row, write_csv
+
+def assert_same_dataset(actual: PreparedTradeDataset, expected: PreparedTradeDataset):
+    assert len(actual) == len(expected)
+    for name in PreparedTradeDataset.ARRAY_FIELDS + ("true_range", "regime", "vix_rank"):
+        np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name))
+
+def test_cache_round_trip(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    write_csv(csv_path, [trade_row(i) for i in range(40)])
+    cache_path = tmp_path / "trades.csv.prepared.npz"
+
+    built = PreparedTradeDataset.load(str(csv_path))
+    assert cache_path.exists()
+    cached = PreparedTradeDataset.load(str(csv_path))
+
+    assert_same_dataset(cached, built)
+    assert_same_dataset(PreparedTradeDataset.load_file(str(cache_path)), built)
+    assert dict(cached.source, version=None) == dict(built.source, version=None)
+    trade = cached.trade(3)
+    assert trade["true_range"] == calculate_trade_true_range(trade["daily_prices"])
+
+def test_appended_rows_extend_cache(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    rows = [trade_row(i) for i in range(20)]
+    write_csv(csv_path, rows)
+    PreparedTradeDataset.load(str(csv_path))
+
+    write_csv(csv_path, rows + [trade_row(i) for i in range(20, 26)])
+    extended = PreparedTradeDataset.load(str(csv_path))
+
+    assert_same_dataset(extended, PreparedTradeDataset.from_csv(str(csv_path)))
+
+def test_truncated_cache_is_rebuilt(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    write_csv(csv_path, [trade_row(i) for i in range(15)])
+    built = PreparedTradeDataset.load(str(csv_path))
+
+    cache_path = tmp_path / "trades.csv.prepared.npz"
+    data = cache_path.read_bytes()
+    cache_path.write_bytes(data[:len(data) // 2])
+
+    assert_same_dataset(PreparedTradeDataset.load(str(csv_path)), built)
+    assert_same_dataset(PreparedTradeDataset.load_file(str(cache_path)), built)
+
+def test_concurrent_saves_share_cache_path(tmp_path):
+    csv_path = tmp_path / "trades.csv"
+    write_csv(csv_path, [trade_row(i) for i in range(30)])
+    dataset = PreparedTradeDataset.from_csv(str(csv_path))
+    cache_path = tmp_path / "shared.npz"
+
+    errors = []
+
+    def save_repeatedly():
+        try:
+            for _ in range(20):
+                dataset.save(str(cache_path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save_repeatedly) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["shared.npz", "trades.csv"]
+    assert_same_dataset(PreparedTradeDataset.load_file(str(cache_path)), dataset)
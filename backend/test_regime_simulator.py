@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the regime-switching path simulator
+"""
+
+import numpy as np
+import pytest
+
+from risk_management.prepared_dataset import PRICE_DAYS
+from risk_management.regime_simulator import RegimeMarkovModel, replay_path, trades_from_paths
+
+def sample_history(n_days: int = 600, seed: int = 8):
+    rng = np.random.default_rng(seed)
+    regimes = ["bull_normal", "high_vol_stress", "low_vol_complacency"]
+    labels, state = [], 0
+    for _ in range(n_days):
+        if rng.random() < 0.1:
+            state = int(rng.integers(0, 3))
+        labels.append(regimes[state])
+    volatility = np.array([{"bull_normal": 0.01, "high_vol_stress": 0.03, "low_vol_complacency": 0.005}[label]
+                           for label in labels])
+    close = 100 * np.exp(np.cumsum(rng.normal(0, volatility)))
+    high = close * (1 + rng.uniform(0, 0.01, n_days))
+    low = close * (1 - rng.uniform(0, 0.01, n_days))
+    vix = np.where(np.array(labels) == "high_vol_stress", 35.0, 18.0)
+    return labels, close, high, low, vix
+
+@pytest.fixture
+def model():
+    labels, close, high, low, vix = sample_history()
+    return RegimeMarkovModel.fit(labels, close, high=high, low=low, vix=vix, seed=4)
+
+def test_transition_matrix_counts_consecutive_days():
+    labels = ["a", "a", "b", "a", "b", "b", "b", "a"]
+    model = RegimeMarkovModel.fit(labels, np.linspace(100, 107, 8), smoothing=0.0)
+
+    assert model.regimes == ["a", "b"]
+    # a->a 1, a->b 2, b->a 2, b->b 2
+    np.testing.assert_allclose(model.transition_matrix, [[1 / 3, 2 / 3], [0.5, 0.5]])
+    np.testing.assert_allclose(model.initial_distribution, [0.5, 0.5])
+    assert model.expected_durations() == pytest.approx({"a": 1.5, "b": 2.0})
+
+def test_chunks_are_reproducible_and_independent_of_chunking(model):
+    chunks = list(model.simulate(25, 60, chunk_size=10))
+    assert [len(chunk["close"]) for chunk in chunks] == [10, 10, 5]
+
+    again = model.simulate_chunk(5, 60, stream=2)
+    for name, values in again.items():
+        np.testing.assert_array_equal(chunks[2][name], values)
+    assert not np.array_equal(chunks[0]["close"], chunks[1]["close"])
+
+def test_simulated_days_are_historical_days_of_their_regime(model):
+    paths = model.simulate_chunk(20, 100, stream=1, start_price=50.0)
+    previous_close = np.concatenate([np.full((20, 1), 50.0), paths["close"][:, :-1]], axis=1)
+    log_return = np.log(paths["close"] / previous_close)
+
+    for code in range(len(model.regimes)):
+        history = model.samples[model.offsets[code]:model.offsets[code + 1], 0]
+        simulated = log_return[paths["regime"] == code]
+        assert np.all(np.min(np.abs(simulated[:, None] - history[None, :]), axis=1) < 1e-9)
+    assert np.all(paths["low"] <= paths["close"] + 1e-9) and np.all(paths["close"] <= paths["high"] + 1e-9)
+
+def test_long_run_frequencies_follow_the_chain(model):
+    paths = model.simulate_chunk(200, 500, stream=0)
+    frequencies = np.bincount(paths["regime"].ravel(), minlength=len(model.regimes)) / paths["regime"].size
+
+    np.testing.assert_allclose(frequencies, model.stationary_distribution(), atol=0.03)
+
+def test_fit_from_breadth_history(db):
+    model = RegimeMarkovModel.from_breadth_history(db, seed=1)
+
+    assert model.metadata["days"] == 400
+    assert model.metadata["start_date"] == "2022-01-03"
+    assert set(model.regimes) <= {"low_vol_complacency", "bull_normal", "high_vol_stress", "crisis_opportunity"}
+    np.testing.assert_allclose(model.transition_matrix.sum(axis=1), 1.0)
+
+def test_paths_feed_trades_and_the_risk_manager(model):
+    paths = model.simulate_chunk(3, 40, stream=5)
+    dataset = trades_from_paths(paths, model.regimes, entry_interval=5)
+
+    assert len(dataset) == 3 * len(range(0, 40 - PRICE_DAYS, 5))
+    np.testing.assert_allclose(dataset.entry[1], paths["close"][0, 5])
+    np.testing.assert_allclose(dataset.close[1], paths["close"][0, 6:6 + PRICE_DAYS])
+
+    # Entries on days 0, 5, ..., 35; the last one is still open at the end of the path
+    performance = replay_path(paths, path=0, entry_interval=5)
+    assert performance["total_trades"] + performance["active_positions"] == 8
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the declarative rule spec and the live manager running on its compiled rules
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from risk_management.dynamic_regime_system import AdaptiveStopManager, DynamicRegimeManager, MarketState
+from risk_management.integrated_overlay_system import IntegratedRiskOverlay
+from risk_management.prepared_dataset import PRICE_DAYS, PreparedTradeDataset
+from risk_management.rule_spec import RuleSpec
+from risk_management.ultimate_implementation import UltimateRiskManager
+
+def random_trades(count: int, seed: int):
+    rng = np.random.default_rng(seed)
+    trades = []
+    for i in range(count):
+        entry = float(rng.uniform(10, 100))
+        price, days = entry, []
+        for _ in range(PRICE_DAYS):
+            price *= np.exp(rng.normal(0, 0.04))
+            days.append({"high": price * (1 + rng.uniform(0, 0.03)), "low": price * (1 - rng.uniform(0, 0.03)),
+                         "close": price})
+        trades.append({"symbol": f"S{i}", "entry_price": entry, "daily_prices": days, "move_2_day": 0.0,
+                       "vix": float(rng.uniform(9, 70)), "t2108": float(rng.uniform(5, 95)),
+                       "momentum_ratio": float(rng.uniform(0.1, 3))})
+    return trades
+
+def replay(manager: UltimateRiskManager, trades, true_ranges):
+    """Feed each trade through open_position/update_position at a constant VIX"""
+    for trade, true_range in zip(trades, true_ranges):
+        manager.open_position(trade["symbol"], trade["entry_price"],
+                              {"vix": trade["vix"], "t2108": trade["t2108"],
+                               "momentum_ratio": trade["momentum_ratio"], "true_range": float(true_range)})
+        for bar in trade["daily_prices"]:
+            if manager.update_position(trade["symbol"], bar, {"vix": trade["vix"]})["position_status"] == "CLOSED":
+                break
+
+def test_json_round_trip(tmp_path):
+    spec = RuleSpec.default()
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(spec.to_dict()))
+
+    loaded = RuleSpec.load(str(path))
+    assert loaded == spec
+    assert any(np.isinf(rule.vix_range[1]) for rule in loaded.regimes.values())
+
+def test_invalid_specs_are_rejected():
+    spec = RuleSpec.default()
+    spec.regimes["bull_normal"].position_scaling = [50, 25, 100]
+    with pytest.raises(ValueError):
+        spec.compile()
+
+    spec = RuleSpec.default()
+    spec.stop_bounds = (-2.0, -25.0)
+    with pytest.raises(ValueError):
+        spec.compile()
+
+    spec = RuleSpec.default()
+    spec.default_regime = "sideways"
+    with pytest.raises(ValueError):
+        spec.compile()
+
+def test_entry_levels_match_overlay_and_adaptive_stop():
+    """open_position reproduces the overlay + AdaptiveStopManager computation it replaced"""
+    rng = np.random.default_rng(3)
+    manager = UltimateRiskManager()
+    regime_manager = DynamicRegimeManager()
+    stop_manager = AdaptiveStopManager(regime_manager)
+    overlay = IntegratedRiskOverlay()
+    previous = None
+    transitions = 0
+
+    for k in range(300):
+        vix, t2108, momentum = rng.uniform(9, 70), rng.uniform(5, 95), rng.uniform(0.1, 3)
+        true_range, entry = rng.uniform(0.3, 5), rng.uniform(10, 100)
+        symbol = f"S{k % 7}"
+        manager.active_positions.pop(symbol, None)
+        opened = manager.open_position(symbol, entry, {"vix": vix, "t2108": t2108, "momentum_ratio": momentum,
+                                                       "true_range": true_range})
+
+        state = MarketState(vix_level=vix, t2108_level=t2108, momentum_ratio=momentum, day=1)
+        regime = overlay.classify_regime(vix)
+        _, _, adjustment = regime_manager.detect_regime_transition(state, previous)
+        rules = regime_manager.apply_dynamic_adjustments(overlay.regime_configurations[regime], adjustment)
+        stop = stop_manager.calculate_adaptive_stop(symbol, entry, true_range, rules, state, previous)
+        targets = overlay.calculate_dynamic_profits(entry, rules, true_range)
+        previous = state
+        transitions += opened["regime_transition_detected"]
+
+        assert opened["regime"] == regime
+        assert opened["stop_level"] == pytest.approx(stop["stop_level"])
+        assert opened["profit_targets"] == pytest.approx([target["price"] for target in targets])
+        assert opened["expected_hold_days"] == rules.get("max_hold_override", 3)
+    assert transitions > 0
+
+def test_batch_run_matches_live_manager():
+    trades = random_trades(400, seed=4)
+    dataset = PreparedTradeDataset.from_trades(trades)
+    manager = UltimateRiskManager()
+    batch = manager.rules.run(dataset, chunk_size=64)
+    replay(manager, trades, dataset.true_range)
+
+    assert manager.active_positions == {}
+    np.testing.assert_allclose(manager.performance_history, batch["total_return"])
+    assert len(np.unique(batch["exit_reason"])) > 1
+
+def test_per_regime_hold_limit_reaches_live_positions(tmp_path):
+    spec = RuleSpec.default()
+    spec.regimes["bull_normal"].max_hold_days = 2
+    config = tmp_path / "config.json"
+    config.write_text(json.dumps({"rule_spec": spec.to_dict()}))
+    manager = UltimateRiskManager(str(config))
+
+    manager.open_position("SPY", 100.0, {"vix": 18.0, "true_range": 0.5})
+    assert manager.update_position("SPY", {"high": 100.5, "low": 99.5, "close": 100.2},
+                                   {"vix": 18.0})["position_status"] == "ACTIVE"
+    result = manager.update_position("SPY", {"high": 100.5, "low": 99.5, "close": 100.4}, {"vix": 18.0})
+
+    assert result["position_status"] == "CLOSED"
+    assert result["actions"][-1]["action"] == "TIME_BASED_EXIT"
+    assert manager.performance_history == [pytest.approx(0.004)]
+
+def legacy_stop_action(position) -> dict:
+    """STOP_LOSS_EXECUTED as the pre-kernel manager built it, with the closed size recorded before zeroing"""
+    closed = position.remaining_position
+    return {
+        'action': 'STOP_LOSS_EXECUTED',
+        'price': position.stop_level,
+        'position_closed': closed,
+        'pnl': ((position.stop_level - position.entry_price) / position.entry_price) * (closed / 100),
+        'reason': 'stop_loss_triggered'
+    }
+
+@pytest.mark.parametrize("take_profit_first", [False, True])
+def test_stop_action_reports_closed_size(take_profit_first):
+    manager = UltimateRiskManager()
+    manager.open_position("SPY", 100.0, {"vix": 18.0, "true_range": 1.0})
+    position = manager.active_positions["SPY"]
+    actions = []
+    if take_profit_first:
+        actions += manager.update_position("SPY", {"high": 112.5, "low": 100.0, "close": 111.0},
+                                           {"vix": 18.0})["actions"]
+    expected = legacy_stop_action(position)
+
+    result = manager.update_position("SPY", {"high": 101.0, "low": 80.0, "close": 85.0}, {"vix": 18.0})
+    actions += result["actions"]
+
+    assert result["position_status"] == "CLOSED"
+    assert result["actions"] == [pytest.approx(expected)]
+    assert expected["position_closed"] == (75.0 if take_profit_first else 100.0)
+    assert sum(action["position_closed"] for action in actions) == pytest.approx(100.0)
+    assert position.remaining_position == 0
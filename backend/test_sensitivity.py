@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched parameter sensitivity report
+"""
+
+import math
+
+import pytest
+
+from risk_management.parameter_sweep import ParameterSweep, PruningRules
+from risk_management.sensitivity import SensitivityAnalysis
+from risk_management.synthetic_trades import SyntheticTradeGenerator
+
+@pytest.fixture(scope="module")
+def analysis():
+    return SensitivityAnalysis(SyntheticTradeGenerator(seed=6).generate(600), chunk_size=250)
+
+def changed_values(base, perturbed, prefix=""):
+    """Dotted names of the values that differ between two nested rule dicts"""
+    changed = []
+    for key, value in base.items():
+        other = perturbed[key]
+        if isinstance(value, dict):
+            changed += changed_values(value, other, f"{prefix}{key}.")
+        elif isinstance(value, (list, tuple)):
+            changed += [f"{prefix}{key}[{i}]" for i, (a, b) in enumerate(zip(value, other)) if a != b]
+        elif value != other:
+            changed.append(f"{prefix}{key}")
+    return changed
+
+def test_each_perturbation_moves_one_parameter(analysis):
+    perturbations = analysis.perturbations()
+    names = [perturbation["parameter"] for perturbation in perturbations]
+    assert len(names) == len(set(names))
+
+    for perturbation in perturbations:
+        assert perturbation["minus_value"] <= perturbation["base_value"] <= perturbation["plus_value"]
+        assert perturbation["minus_value"] < perturbation["plus_value"]
+        for configuration in perturbation["configurations"]:
+            changed = changed_values(analysis.regime_configurations, configuration["regime_configurations"]) + \
+                changed_values(analysis.transition_thresholds, configuration["transition_thresholds"])
+            assert changed == [perturbation["parameter"]]
+
+    assert not any(math.isinf(perturbation["base_value"]) for perturbation in perturbations)
+    for regime, config in analysis.regime_configurations.items():
+        assert f"{regime}.position_scaling[{len(config['position_scaling']) - 1}]" not in names
+
+def test_batched_report_matches_separate_runs(analysis):
+    report = analysis.run()
+    perturbations = {perturbation["parameter"]: perturbation for perturbation in analysis.perturbations()}
+
+    responses = [(entry["return_response"], entry["drawdown_response"]) for entry in report["parameters"]]
+    assert responses == sorted(responses, reverse=True)
+    assert report["configurations"] == 1 + 2 * len(perturbations)
+
+    for entry in report["parameters"][:3] + report["parameters"][-2:]:
+        separate = ParameterSweep(analysis.dataset, perturbations[entry["parameter"]]["configurations"],
+                                  regime_configurations=analysis.regime_configurations,
+                                  pruning=PruningRules(None, None), chunk_size=1000).run()["results"]
+        assert entry["total_return_minus"] == pytest.approx(separate[0]["total_return"])
+        assert entry["total_return_plus"] == pytest.approx(separate[1]["total_return"])
+        assert entry["max_drawdown_plus"] == pytest.approx(separate[1]["max_drawdown"])
+        width = entry["plus_value"] - entry["minus_value"]
+        assert entry["total_return_slope"] == pytest.approx(
+            (separate[1]["total_return"] - separate[0]["total_return"]) / width)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the shadow strategy book and the /shadow-strategies endpoints
+"""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from risk_management.shadow_strategies import ShadowBook, ShadowStrategy
+from risk_management.ultimate_implementation import UltimateRiskManager
+
+def bar(price: float) -> dict:
+    return {"high": price * 1.01, "low": price * 0.99, "close": price}
+
+def run_live_feed(manager: UltimateRiskManager, n_positions: int, seed: int, vix_shocks: bool = False):
+    """Random walks through the live manager until every shadow position is closed"""
+    rng = np.random.default_rng(seed)
+    for k in range(n_positions):
+        symbol = f"S{k}"
+        vix = float(rng.choice([12, 18, 25, 35, 45]))
+        manager.open_position(symbol, 50.0, {"vix": vix, "true_range": 1.5})
+        price = 50.0
+        while manager.shadow_book.is_open(symbol):
+            price *= np.exp(rng.normal(0, 0.03))
+            shock = float(rng.choice([0, 20, -10])) if vix_shocks else 0.0
+            manager.update_position(symbol, bar(price), {"vix": vix + shock})
+
+def test_baseline_exits_at_day_two_close():
+    book = ShadowBook()
+    book.open("SPY", 100.0, 2.0, 20.0, "bull_normal")
+
+    assert book.update("SPY", bar(80.0))["baseline"]["position_status"] == "ACTIVE"
+    statuses = book.update("SPY", bar(104.0))
+
+    assert statuses["baseline"]["position_status"] == "CLOSED"
+    assert book.returns["baseline"] == [pytest.approx(0.04)]
+    assert book.returns["stop_only"] and book.returns["stop_only"][0] < 0
+    assert not book.is_open("SPY")
+
+@pytest.mark.parametrize("vix_shocks", [False, True])
+def test_live_rules_in_shadow_match_live_manager(vix_shocks):
+    manager = UltimateRiskManager()
+    manager.enable_shadow_strategies([ShadowStrategy("live")])
+    run_live_feed(manager, 30, seed=2, vix_shocks=vix_shocks)
+
+    assert len(manager.performance_history) == 30
+    np.testing.assert_allclose(manager.shadow_book.returns["live"], manager.performance_history)
+    assert manager.shadow_book.performance()["live"]["total_trades"] == 30
+
+def test_added_strategy_applies_from_next_entry():
+    book = ShadowBook([ShadowStrategy("live")])
+    book.open("A", 50.0, 1.5, 20.0, "bull_normal")
+    book.add_strategy(ShadowStrategy("wide", stop_adjustment=2.0))
+    book.open("B", 50.0, 1.5, 20.0, "bull_normal")
+
+    assert set(book.update("A", bar(50.5))) == {"live"}
+    assert set(book.update("B", bar(50.5))) == {"live", "wide"}
+    assert book.open_positions("wide") == 1
+    with pytest.raises(ValueError):
+        book.add_strategy(ShadowStrategy("wide"))
+    with pytest.raises(ValueError):
+        book.add_strategy(ShadowStrategy("thresholds", vix_thresholds=(15.0, 25.0)))
+
+def test_shadow_strategy_endpoints(monkeypatch):
+    manager = UltimateRiskManager()
+    manager.enable_shadow_strategies()
+    monkeypatch.setattr(main, "risk_manager", manager)
+    client = TestClient(main.app)
+
+    response = client.post("/shadow-strategies", json={"name": "candidate",
+                                                       "configuration": {"stop_adjustment": 1.5}})
+    assert response.status_code == 200
+    assert response.json()["stop_adjustment"] == 1.5
+    assert client.post("/shadow-strategies", json={"name": "candidate"}).status_code == 400
+
+    run_live_feed(manager, 3, seed=5)
+    strategies = {strategy["name"]: strategy for strategy in client.get("/shadow-strategies").json()}
+    assert set(strategies) == {"baseline", "stop_only", "profit_only", "candidate"}
+    assert strategies["candidate"]["performance"]["total_trades"] == 3
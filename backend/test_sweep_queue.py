@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for the sharded sweep queue
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from risk_management.parameter_sweep import ParameterSweep, PruningRules, adjustment_grid
+from risk_management.sweep_queue import SweepQueue, SweepWorker, load_dataset
+from risk_management.sweep_store import SweepResultStore
+
+DATASET = {"synthetic": {"seed": 3, "n_trades": 400}}
+SETTINGS = {"chunk_size": 100, "pruning": {"max_drawdown_tolerance": None, "min_win_rate": None}}
+
+@pytest.fixture
+def grid():
+    return adjustment_grid(stop_adjustments=(0.8, 1.0, 1.2), profit_adjustments=(0.9, 1.1),
+                           vix_thresholds=(None, (14, 25, 40, 45)))
+
+def make_queue(tmp_path, grid):
+    return SweepQueue.create(str(tmp_path / "queue"), grid, DATASET, unit_size=5, sweep_id="sharded", settings=SETTINGS)
+
+def stored_returns(store):
+    return sorted(round(result["total_return"], 10) for result in store.query_results("sharded", limit=1000))
+
+def test_workers_cover_every_unit_once(tmp_path, grid):
+    queue = make_queue(tmp_path, grid)
+    finished = []
+    workers = [SweepWorker(queue, worker_id=f"worker-{i}") for i in range(3)]
+    threads = [threading.Thread(target=lambda worker=worker: finished.extend(worker.run())) for worker in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(finished) == queue.manifest()["units"]
+    assert queue.status()["done"] == 3
+
+    store = SweepResultStore(str(tmp_path / "sweeps.db"))
+    assert queue.collect(store) == len(grid)
+    assert queue.collect(store) == 0
+    reference = ParameterSweep(load_dataset(DATASET), grid, pruning=PruningRules(None, None), chunk_size=100).run()
+    assert stored_returns(store) == sorted(round(result["total_return"], 10) for result in reference["results"])
+
+def test_expired_claim_is_taken_over(tmp_path, grid):
+    queue = make_queue(tmp_path, grid)
+    crashed = queue.claim("crashed-worker", lease_seconds=60)
+    assert crashed == "unit-000000"
+
+    # A live lease is respected
+    assert SweepWorker(queue, worker_id="early", lease_seconds=60).run() == ["unit-000001", "unit-000002"]
+    assert queue.status(lease_seconds=60)["running"] == 1
+
+    stale = time.time() - 120
+    os.utime(queue._claim_path(crashed), (stale, stale))
+    assert SweepWorker(queue, worker_id="rescue", lease_seconds=60).run() == [crashed]
+    assert not queue.heartbeat(crashed, "crashed-worker")
+    assert queue.status(lease_seconds=60)["done"] == 3
+
+def test_create_resumes_existing_queue(tmp_path, grid):
+    queue = make_queue(tmp_path, grid)
+    SweepWorker(queue, worker_id="first").run(max_units=1)
+
+    resumed = SweepQueue.create(str(tmp_path / "queue"), grid[:2], {"synthetic": {"n_trades": 1}}, sweep_id="other")
+    assert resumed.manifest()["sweep_id"] == "sharded"
+    assert resumed.manifest()["configurations"] == len(grid)
+    assert resumed.status()["done"] == 1
+    assert SweepWorker(resumed, worker_id="second").run() == ["unit-000001", "unit-000002"]
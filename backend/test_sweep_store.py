@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the sweep result store and the /sweeps endpoints
+"""
+
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from risk_management.sweep_store import SweepResultStore, pareto_frontier
+
+def sample_results(count: int, seed: int = 3):
+    rng = np.random.default_rng(seed)
+    return [{
+        "configuration": {"stop_multiplier": round(float(stop), 3), "index": i},
+        "status": "complete" if i % 10 else "pruned",
+        "trades_evaluated": 100,
+        "total_return": float(total_return),
+        "avg_return_per_trade": float(total_return) / 100,
+        "win_rate": float(win_rate),
+        "sharpe_ratio": float(sharpe),
+        "max_drawdown": float(drawdown)
+    } for i, (stop, total_return, win_rate, sharpe, drawdown) in enumerate(zip(
+        rng.uniform(1, 3, count), rng.normal(0.2, 0.1, count), rng.uniform(0.3, 0.7, count),
+        rng.normal(1, 0.5, count), -rng.uniform(0.01, 0.3, count)
+    ))]
+
+def brute_force_frontier(results):
+    return {
+        result["configuration"]["index"] for result in results
+        if not any(other["total_return"] >= result["total_return"] and other["max_drawdown"] >= result["max_drawdown"]
+                   and (other["total_return"], other["max_drawdown"]) != (result["total_return"], result["max_drawdown"])
+                   for other in results)
+    }
+
+@pytest.fixture
+def store(tmp_path):
+    store = SweepResultStore(str(tmp_path / "sweeps.db"))
+    store.create_sweep("sweep", description="test", total_trades=100)
+    store.add_results("sweep", sample_results(300))
+    return store
+
+def test_frontier_matches_brute_force(store):
+    complete = [result for result in sample_results(300) if result["status"] == "complete"]
+    frontier = store.frontier("sweep")
+
+    assert {result["configuration"]["index"] for result in frontier} == brute_force_frontier(complete)
+    returns = [result["total_return"] for result in frontier]
+    assert returns == sorted(returns, reverse=True)
+
+    indices = pareto_frontier([result["total_return"] for result in complete],
+                              [result["max_drawdown"] for result in complete])
+    assert {complete[i]["configuration"]["index"] for i in indices} == brute_force_frontier(complete)
+
+def test_query_results_filters_and_orders(store):
+    results = store.query_results("sweep", {"min_win_rate": 0.5}, order_by="sharpe_ratio", limit=1000)
+    expected = sorted((result for result in sample_results(300)
+                       if result["status"] == "complete" and result["win_rate"] >= 0.5),
+                      key=lambda result: -result["sharpe_ratio"])
+
+    assert [result["configuration"]["index"] for result in results] == \
+        [result["configuration"]["index"] for result in expected]
+    with pytest.raises(ValueError):
+        store.query_results("sweep", {"min_unknown": 1})
+
+def test_results_are_replaced_on_reevaluation(store):
+    updated = dict(sample_results(300)[5], total_return=9.0)
+    store.add_results("sweep", [updated])
+
+    assert store.get_sweep("sweep")["result_count"] == 300
+    assert store.query_results("sweep", limit=1)[0]["total_return"] == 9.0
+
+class LoopCheckingStore(SweepResultStore):
+    """Store that records whether its reads ran on the event loop thread"""
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self.calls_on_loop = []
+
+    def _record(self, name: str):
+        try:
+            asyncio.get_running_loop()
+            self.calls_on_loop.append(name)
+        except RuntimeError:
+            pass
+
+    def list_sweeps(self):
+        self._record("list_sweeps")
+        return super().list_sweeps()
+
+    def get_sweep(self, sweep_id):
+        self._record("get_sweep")
+        return super().get_sweep(sweep_id)
+
+    def query_results(self, *args, **kwargs):
+        self._record("query_results")
+        return super().query_results(*args, **kwargs)
+
+def test_sweep_endpoints_read_off_the_event_loop(tmp_path, monkeypatch):
+    store = LoopCheckingStore(str(tmp_path / "sweeps.db"))
+    store.create_sweep("sweep")
+    store.add_results("sweep", sample_results(50))
+    monkeypatch.setattr(main, "sweep_store", store)
+    client = TestClient(main.app)
+
+    assert [sweep["sweep_id"] for sweep in client.get("/sweeps").json()] == ["sweep"]
+    response = client.get("/sweeps/sweep/results", params={"order_by": "win_rate", "limit": 5})
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert client.get("/sweeps/sweep/frontier").status_code == 200
+    assert client.get("/sweeps/missing/results").status_code == 404
+    assert client.get("/sweeps/sweep/results", params={"order_by": "symbol"}).status_code == 400
+
+    assert store.calls_on_loop == []
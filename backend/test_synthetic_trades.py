@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the synthetic trade generator
+"""
+
+import numpy as np
+
+from risk_management.columnar_store import REGIME_CATEGORIES
+from risk_management.integrated_overlay_system import IntegratedRiskOverlay
+from risk_management.prepared_dataset import PreparedTradeDataset
+from risk_management.synthetic_trades import SyntheticTradeGenerator, read_columnar_dataset
+
+def assert_same_dataset(actual: PreparedTradeDataset, expected: PreparedTradeDataset):
+    assert len(actual) == len(expected)
+    for name in PreparedTradeDataset.ARRAY_FIELDS + ("regime",):
+        np.testing.assert_array_equal(getattr(actual, name), getattr(expected, name))
+
+def test_streams_are_reproducible_and_independent():
+    generator = SyntheticTradeGenerator(seed=7)
+    first = generator.generate(500, stream=3)
+
+    assert_same_dataset(SyntheticTradeGenerator(seed=7).generate(500, stream=3), first)
+    assert not np.array_equal(generator.generate(500, stream=4).entry, first.entry)
+    assert not np.array_equal(SyntheticTradeGenerator(seed=8).generate(500, stream=3).entry, first.entry)
+
+def test_price_paths_are_consistent_bars():
+    dataset = SyntheticTradeGenerator(seed=1).generate(5000)
+
+    assert np.all(dataset.low > 0)
+    assert np.all(dataset.low <= dataset.close) and np.all(dataset.close <= dataset.high)
+    np.testing.assert_allclose(dataset.baseline_return, dataset.close[:, 1] / dataset.entry - 1)
+    assert np.all((dataset.t2108 >= 0) & (dataset.t2108 <= 100))
+
+def test_vix_classifies_back_into_drawn_regime():
+    dataset = SyntheticTradeGenerator(seed=5).generate(4000)
+    overlay = IntegratedRiskOverlay()
+    classified = [REGIME_CATEGORIES.index(overlay.classify_regime(vix)) for vix in dataset.vix]
+
+    np.testing.assert_array_equal(dataset.regime, classified)
+    shares = np.bincount(dataset.regime, minlength=len(REGIME_CATEGORIES)) / len(dataset)
+    assert shares[REGIME_CATEGORIES.index("bull_normal")] > 0.4
+
+def test_symbols_and_dates_follow_trade_ids():
+    generator = SyntheticTradeGenerator(start_date="2024-01-05", trades_per_day=2)
+    dataset = generator.generate(5, start_id=41)
+
+    assert dataset.symbols.tolist() == ["SYN00000041", "SYN00000042", "SYN00000043", "SYN00000044", "SYN00000045"]
+    # Trade 41 falls on business day 20 counted from Friday 2024-01-05 (day 0)
+    assert dataset.breakout_dates.tolist() == ["2024-02-02", "2024-02-05", "2024-02-05", "2024-02-06", "2024-02-06"]
+
+def test_columnar_store_matches_chunked_generation(tmp_path):
+    generator = SyntheticTradeGenerator(seed=11)
+    manifest = generator.write_columnar(str(tmp_path / "synthetic"), 2500, chunk_size=1000)
+    assert manifest["rows"] == 2500
+
+    middle = read_columnar_dataset(str(tmp_path / "synthetic"), 1000, 2000)
+    assert_same_dataset(middle, generator.generate(1000, stream=1, start_id=1000))
+    tail = read_columnar_dataset(str(tmp_path / "synthetic"), 2000)
+    assert_same_dataset(tail, generator.generate(500, stream=2, start_id=2000))
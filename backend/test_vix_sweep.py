@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the prefix-sum VIX threshold sweep
+"""
+
+import numpy as np
+import pytest
+
+from risk_management.incremental_backtesting import evaluate_trade_layers
+from risk_management.integrated_overlay_system import IntegratedRiskOverlay
+from risk_management.prepared_dataset import PreparedTradeDataset
+from risk_management.vix_sweep import VixThresholdSweep, threshold_grid, thresholds_to_regime_configurations
+from test_incremental_backtesting import german, write_csv
+
+def volatile_row(i: int, rng) -> str:
+    """Deep-dive CSV row of a trade volatile enough to hit stops and profit levels"""
+    entry = float(rng.uniform(10, 80))
+    closes = entry * np.cumprod(1 + rng.normal(0, 0.06, 5))
+    values = [f"V{i}", "2024-02-%02d" % (i % 28 + 1), german(entry) + " €",
+              german((closes[1] / entry - 1) * 100) + "%", german(float(rng.uniform(10, 60)))]
+    values += [german(closes[0]), german(min(entry, closes[0]) * (1 - rng.uniform(0, 0.08)))]
+    for close in closes[1:]:
+        values += [german(close), german(close * (1 + rng.uniform(0, 0.06))), german(close * (1 - rng.uniform(0, 0.08)))]
+    return ";".join(values)
+
+@pytest.fixture
+def dataset(tmp_path):
+    rng = np.random.default_rng(4)
+    csv_path = tmp_path / "trades.csv"
+    write_csv(csv_path, [volatile_row(i, rng) for i in range(80)])
+    return PreparedTradeDataset.from_csv(str(csv_path))
+
+def reclassified_returns(dataset, thresholds, regime_configurations):
+    """Combined-layer returns with every trade reclassified under the threshold tuple"""
+    overlay = IntegratedRiskOverlay()
+    overlay.regime_configurations = thresholds_to_regime_configurations(thresholds, regime_configurations)
+    returns = []
+    for index in range(len(dataset)):
+        trade = dataset.trade(index)
+        trade["regime"] = None
+        returns.append(evaluate_trade_layers(trade, overlay)["combined"][0])
+    return np.array(returns)
+
+def test_scores_match_reclassification(dataset):
+    sweep = VixThresholdSweep(dataset)
+    tuples = [(15, 30, 50, 50), (14, 20, 25, 35), (18, 18, 30, 33), (20, 25, 40, 45)]
+    scores = sweep.score(tuples)
+
+    for k, thresholds in enumerate(tuples):
+        returns = reclassified_returns(dataset, thresholds, sweep.overlay_system.regime_configurations)
+        assert scores["total_return"][k] == pytest.approx(returns.sum())
+        assert scores["avg_return_per_trade"][k] == pytest.approx(returns.mean())
+        assert scores["win_rate"][k] == pytest.approx((returns > 0).mean())
+        assert scores["volatility"][k] == pytest.approx(returns.std())
+        assert scores["band_trades"][k].sum() == len(dataset)
+
+def test_unordered_thresholds_score_nan(dataset):
+    scores = VixThresholdSweep(dataset).score([(30, 20, 40, 50), (15, 30, 50, 50)])
+
+    assert np.isnan(scores["total_return"][0])
+    assert not np.isnan(scores["total_return"][1])
+
+def test_best_is_sorted_by_metric(dataset):
+    sweep = VixThresholdSweep(dataset)
+    grid = threshold_grid([12, 15, 18], [20, 25, 30], [30, 40], [40, 50])
+    assert grid.shape == (36, 4)
+
+    best = sweep.best(grid, metric="total_return", top_n=5)
+    returns = [entry["total_return"] for entry in best]
+    assert returns == sorted(returns, reverse=True)
+    assert returns[0] == pytest.approx(np.nanmax(sweep.score(grid)["total_return"]))
@@ -2,8 +2,6 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 class MultiLayerBacktester:
     def __init__(self, trade_data_file: str):
@@ -456,6 +454,9 @@ class MultiLayerBacktester:
     def plot_performance_comparison(self):
         """Erstellt Visualisierung der Performance-Vergleiche"""
         try:
+            # Plotting libraries only load here, not on every import of the backtester
+            import matplotlib.pyplot as plt
+            
             fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
             
             strategies = list(self.layer_results.keys())